@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+"""
+Multi-shot driver for the game encoding
+
+Grounds the ``base`` program once and then the ``step(t)`` program one turn at a time, solving after every turn.
+The solver keeps its state between turns, so each turn only grounds (and the solver only learns) what is new,
+instead of instantiating every time-indexed predicate for the whole horizon up front.
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import *
+
+import clingo
+
+
+class StepStatistics(NamedTuple):
+    turn: int
+    result: str  # SAT, UNSAT or UNKNOWN
+    models: int
+    ground_seconds: float
+    solve_seconds: float
+    # Added by this turn
+    atoms: int
+    rules: int
+    bodies: int
+    # Of the whole program so far
+    total_atoms: int
+    total_rules: int
+    total_variables: int
+    total_constraints: int
+
+
+def log_clingo_message(code: clingo.MessageCode, message: str):
+    logging.debug('%s: %s', code.name, message.strip())
+
+
+def solve_result(result: clingo.SolveResult) -> str:
+    if result.satisfiable:
+        return 'SAT'
+    if result.unsatisfiable:
+        return 'UNSAT'
+    return 'UNKNOWN'
+
+
+def ground_incrementally(file_paths: Iterable[Path], turns: int, models: int = 1,
+                         on_model: Optional[Callable[[int, clingo.Model], None]] = None,
+                         stop_on_unsat: bool = False, arguments: Sequence[str] = ()) -> Iterator[StepStatistics]:
+    """
+    Grounds and solves the encoding turn by turn, reusing the solver between turns
+
+    :param file_paths: The encoding and instance files
+    :param turns: The number of turns to ground
+    :param models: The number of models to compute after each turn (0 for all)
+    :param on_model: Called with the turn and each model found
+    :param stop_on_unsat: Whether to stop after the first unsatisfiable turn
+        (later turns cannot be satisfiable, since turns only add constraints)
+    :param arguments: Further clingo command line options
+    :return: The statistics of each turn, as soon as it is solved
+    """
+    control = clingo.Control([str(models), *arguments], logger=log_clingo_message)
+    for file_path in file_paths:
+        control.load(str(file_path))
+
+    started = time.perf_counter()
+    control.ground([('base', [])])
+    logging.info('Grounded base program in %.3fs', time.perf_counter() - started)
+
+    for turn in range(1, turns + 1):
+        started = time.perf_counter()
+        control.ground([('step', [clingo.Number(turn)])])
+        ground_seconds = time.perf_counter() - started
+
+        model_count = 0
+
+        def count_model(model: clingo.Model):
+            nonlocal model_count
+            model_count += 1
+            if on_model is not None:
+                on_model(turn, model)
+
+        started = time.perf_counter()
+        result = control.solve(on_model=count_model)
+        solve_seconds = time.perf_counter() - started
+
+        problem = control.statistics['problem']
+        yield StepStatistics(
+            turn=turn,
+            result=solve_result(result),
+            models=model_count,
+            ground_seconds=ground_seconds,
+            solve_seconds=solve_seconds,
+            atoms=int(problem['lpStep']['atoms']),
+            rules=int(problem['lpStep']['rules']),
+            bodies=int(problem['lpStep']['bodies']),
+            total_atoms=int(problem['lp']['atoms']),
+            total_rules=int(problem['lp']['rules']),
+            total_variables=int(problem['generator']['vars']),
+            total_constraints=int(problem['generator']['constraints']),
+        )
+
+        if stop_on_unsat and result.unsatisfiable:
+            return
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description='Ground and solve the game encoding one turn at a time')
+    parser.add_argument('files', metavar='FILES', nargs='+', type=Path,
+                        help='The .lp files to load (the encoding and an instance)')
+    parser.add_argument('--turns', metavar='N', type=int, default=5,
+                        help='The number of turns to ground (default: %(default)s)')
+    parser.add_argument('--models', metavar='N', type=int, default=1,
+                        help='The number of models to compute after each turn, 0 for all (default: %(default)s)')
+    parser.add_argument('--show-models', action='store_true',
+                        help='Print the shown atoms of every model')
+    parser.add_argument('--stop-on-unsat', action='store_true',
+                        help='Stop after the first turn without a model')
+    parser.add_argument('--statistics', metavar='STATISTICS_FILE', type=argparse.FileType('w'),
+                        help='Also write the statistics of every turn as JSON')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Log the grounder\'s messages')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    def print_model(turn: int, model: clingo.Model):
+        print(f'  Turn {turn} model {model.number}: {" ".join(map(str, model.symbols(shown=True)))}')
+
+    print(f'{"Turn":>4} {"Result":>7} {"Models":>6} {"Ground":>9} {"Solve":>9} '
+          f'{"+Atoms":>8} {"+Rules":>8} {"Atoms":>9} {"Rules":>9}')
+    all_statistics = []
+    for statistics in ground_incrementally(args.files, args.turns, args.models,
+                                           print_model if args.show_models else None, args.stop_on_unsat):
+        print(f'{statistics.turn:>4} {statistics.result:>7} {statistics.models:>6} '
+              f'{statistics.ground_seconds:>8.3f}s {statistics.solve_seconds:>8.3f}s '
+              f'{statistics.atoms:>8} {statistics.rules:>8} {statistics.total_atoms:>9} {statistics.total_rules:>9}')
+        sys.stdout.flush()
+        all_statistics.append(statistics._asdict())
+
+    if args.statistics is not None:
+        with args.statistics as statistics_file:
+            json.dump(all_statistics, statistics_file, indent=2)
+            statistics_file.write('\n')
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 
+import hashlib
+import json
+import os
 import re
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import *
 from typing import TextIO
@@ -27,12 +32,31 @@ predicate_re = re.compile(r'([a-z]\S*)\((.+)\)')
 predicate_annotation_re = re.compile(r'^%\s*([a-z]\S*)\((.+)\)\.')
 predicate_argument_re = re.compile(r'(".*?[^\\]"|".*?\\"|\d+|\w+),?')
 
+# Increment whenever the scan results change for the same file contents
+scan_cache_version = 2
+
 
 class Predicate(NamedTuple):
     name: str
     arguments: Sequence[str]
 
 
+# Predicate name and arity
+Signature = Tuple[str, int]
+
+
+class FileScan(NamedTuple):
+    annotations: Sequence[Predicate]
+    # The line number of each predicate found, in order
+    usage_lines: Sequence[int]
+    # The indices into usage_lines of the predicates with each signature
+    usages: Mapping[Signature, Sequence[int]]
+
+
+def parse_arguments(arguments: str) -> Tuple[str, ...]:
+    return tuple(argument.group(1) for argument in predicate_argument_re.finditer(arguments))
+
+
 def match_predicate_annotation(string: str) -> Optional[Predicate]:
     """
     Finds a single predicate annotation
@@ -43,9 +67,7 @@ def match_predicate_annotation(string: str) -> Optional[Predicate]:
     match = predicate_annotation_re.search(string)
     if match:
         name, arguments = match.groups()
-        arguments = predicate_argument_re.finditer(arguments)
-        arguments = (argument.group(1) for argument in arguments)
-        return Predicate(name=name, arguments=tuple(arguments))
+        return Predicate(name=name, arguments=parse_arguments(arguments))
     else:
         return None
 
@@ -58,11 +80,70 @@ def match_predicates(file: TextIO) -> Iterator[Tuple[int, Predicate]]:
     :return: The predicates and the line number on which they are found
     """
     for line_number, line in enumerate(file, start=1):
+        # Directives such as "#program step(t)." are not predicates
+        if line.startswith('#'):
+            continue
+        for match in predicate_re.finditer(line):
+            name, arguments = match.groups()
+            yield line_number, Predicate(name=name, arguments=parse_arguments(arguments))
+
+
+def scan_lines(lines: Iterable[str]) -> FileScan:
+    """
+    Finds predicate annotations and predicates in a single pass
+    (equivalent to :func:`match_predicate_annotation` on every line followed by :func:`match_predicates`)
+
+    :param lines: The lines to search
+    :return: The annotations in order, and the predicates grouped by signature
+    """
+    annotations: List[Predicate] = []
+    usage_lines: List[int] = []
+    usages: Dict[Signature, List[int]] = {}
+    for line_number, line in enumerate(lines, start=1):
+        # Skip the regexes on lines where they cannot match, and directives
+        if '(' not in line or line.startswith('#'):
+            continue
+
+        if line.startswith('%'):
+            annotation = match_predicate_annotation(line)
+            if annotation:
+                annotations.append(annotation)
+
         for match in predicate_re.finditer(line):
             name, arguments = match.groups()
-            arguments = predicate_argument_re.finditer(arguments)
-            arguments = (argument.group(1) for argument in arguments)
-            yield line_number, Predicate(name=name, arguments=tuple(arguments))
+            arity = sum(1 for _ in predicate_argument_re.finditer(arguments))
+            usages.setdefault((name, arity), []).append(len(usage_lines))
+            usage_lines.append(line_number)
+
+    return FileScan(annotations=annotations, usage_lines=usage_lines, usages=usages)
+
+
+def scan_file(file_path: Path) -> FileScan:
+    with open(file_path) as file:
+        return scan_lines(file)
+
+
+def find_violations(file_scan: FileScan, predicate_signatures: Mapping[str, Sequence[str]]) \
+        -> Iterator[Tuple[int, Signature, Optional[int]]]:
+    """
+    Checks the arity of every predicate of a file (once per signature rather than once per predicate)
+
+    :param file_scan: The scanned file
+    :param predicate_signatures: The annotated arguments of each predicate name
+    :return: The line number, signature and expected arity (None if not annotated) of each violation, in file order
+    """
+    violations: List[Tuple[int, Signature, Optional[int]]] = []
+    for (name, arity), usage_indices in file_scan.usages.items():
+        try:
+            expected_arity: Optional[int] = len(predicate_signatures[name])
+        except KeyError:
+            expected_arity = None
+        if expected_arity != arity:
+            violations.extend((usage_index, (name, arity), expected_arity) for usage_index in usage_indices)
+
+    violations.sort()
+    for usage_index, signature, expected_arity in violations:
+        yield file_scan.usage_lines[usage_index], signature, expected_arity
 
 
 def print_message(message: str, file_name: str, line_number: int):
@@ -76,51 +157,162 @@ def print_message(message: str, file_name: str, line_number: int):
     print(f'{colorful.violet(file_name)}:{colorful.blue(line_number)}: {message}')
 
 
+# Cache
+
+
+def file_digest(file_path: Path) -> str:
+    with open(file_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def load_scan_cache(cache_path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    :param cache_path: The cache file
+    :return: The cached scan of each file (by resolved path), or nothing if the cache is missing or from another version
+    """
+    try:
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != scan_cache_version:
+        return {}
+    return cache.get('files', {})
+
+
+def save_scan_cache(cache_path: Path, entries: Mapping[str, Mapping[str, Any]]):
+    """
+    Atomically writes the scan cache
+    """
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=cache_path.parent, prefix=cache_path.name, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'w') as cache_file:
+            json.dump({'version': scan_cache_version, 'files': entries}, cache_file)
+        # Temporary files are only readable by their owner; give the cache the usual permissions
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary_path, 0o666 & ~umask)
+        os.replace(temporary_path, cache_path)
+
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def scan_to_entry(file_scan: FileScan) -> Dict[str, Any]:
+    return {
+        'annotations': [[predicate.name, list(predicate.arguments)] for predicate in file_scan.annotations],
+        'usage_lines': list(file_scan.usage_lines),
+        'usages': [[name, arity, list(usage_indices)] for (name, arity), usage_indices in file_scan.usages.items()],
+    }
+
+
+def entry_to_scan(entry: Mapping[str, Any]) -> FileScan:
+    return FileScan(annotations=[Predicate(name, tuple(arguments)) for name, arguments in entry['annotations']],
+                    usage_lines=entry['usage_lines'],
+                    usages={(name, arity): usage_indices for name, arity, usage_indices in entry['usages']})
+
+
+def scan_files(file_paths: Sequence[Path], cache: Optional[Dict[str, Dict[str, Any]]] = None,
+               jobs: Optional[int] = None) -> List[FileScan]:
+    """
+    Scans many files, in parallel, reusing the cached scans of unchanged files
+
+    A file is unchanged if its modification time and size match the cache, or failing that, its SHA-256 does
+
+    :param file_paths: The files to scan
+    :param cache: The cached scans (see :func:`load_scan_cache`), updated in place with the new scans
+    :param jobs: The number of processes (defaults to the number of CPUs; 1 scans in this process)
+    :return: The scan of each file, in order
+    """
+    scans: List[Optional[FileScan]] = [None] * len(file_paths)
+    stale: Dict[int, Optional[Dict[str, Any]]] = {}
+    for index, file_path in enumerate(file_paths):
+        if cache is None:
+            stale[index] = None
+            continue
+
+        stat = os.stat(file_path)
+        file_info = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+        entry = cache.get(str(Path(file_path).resolve()))
+        if entry is not None and all(entry[key] == value for key, value in file_info.items()):
+            scans[index] = entry_to_scan(entry)
+            continue
+
+        # Touched, but possibly unchanged
+        file_info['sha256'] = file_digest(file_path)
+        if entry is not None and entry['sha256'] == file_info['sha256']:
+            entry.update(file_info)
+            scans[index] = entry_to_scan(entry)
+        else:
+            stale[index] = file_info
+
+    stale_paths = [file_paths[index] for index in stale]
+    if jobs == 1 or len(stale_paths) <= 1:
+        new_scans = map(scan_file, stale_paths)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            new_scans = list(executor.map(scan_file, stale_paths))
+
+    for (index, file_info), file_scan in zip(stale.items(), new_scans):
+        scans[index] = file_scan
+        if cache is not None:
+            cache[str(Path(file_paths[index]).resolve())] = {**file_info, **scan_to_entry(file_scan)}
+
+    return scans
+
+
 if __name__ == '__main__':
     import argparse
 
     parser = argparse.ArgumentParser(description='Compute an optimal deck given a set of booster packs')
     parser.add_argument('files', metavar='FILES', nargs='+', type=Path,
                         help='The .lp files to lint')
+    parser.add_argument('--jobs', '-j', metavar='N', type=int,
+                        help='The number of processes to scan files in (default: the number of CPUs)')
+    parser.add_argument('--cache-file', metavar='CACHE_FILE', type=Path, default='.lint_predicates_cache.json',
+                        help='Where to cache the scan of each file, so that only changed files are rescanned '
+                             '(default: %(default)s)')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help='Always scan every file instead of using (and refreshing) the cache')
 
     args = parser.parse_args()
 
+    # Scan every file once for both annotations and predicates
+    scan_cache = load_scan_cache(args.cache_file) if args.use_cache else None
+    file_scans = scan_files(args.files, scan_cache, args.jobs)
+    if scan_cache is not None:
+        try:
+            save_scan_cache(args.cache_file, scan_cache)
+        except OSError as error:
+            print(f'Could not write the cache "{args.cache_file}": {error}', file=sys.stderr)
+
     # Since this program's purpose is to check predicate arity,
     # assume there is only one predicate per identifier
     predicate_signatures: Dict[str, Sequence[str]] = {}
 
-    # Scan for predicate annotations
-    for file_path in args.files:
-        with open(file_path) as file:
-            for line in file:
-                predicate = match_predicate_annotation(line)
-                if predicate:
-                    predicate_signatures[predicate.name] = predicate.arguments
+    # Collect predicate annotations
+    for file_scan in file_scans:
+        for predicate in file_scan.annotations:
+            predicate_signatures[predicate.name] = predicate.arguments
 
-    # Scan codebase for violations
+    # Check the codebase for violations
     violations_found = False
-    for file_path in args.files:
-        with open(file_path) as file:
-            for line_number, predicate in match_predicates(file):
-                actual_arity = len(predicate.arguments)
-                try:
-                    expected_arity = len(predicate_signatures[predicate.name])
-                    assert expected_arity == actual_arity
-
-                except KeyError:
-                    # Missing annotation
-                    predicate_signature = colorful.bold_yellow(f'{predicate.name}/{actual_arity}')
-                    print_message(colorful.yellow(f'Missing annotation for {predicate_signature}'),
-                                  file_name=file_path, line_number=line_number)
-                    violations_found = True
-
-                except AssertionError:
-                    # Annotation violation
-                    actual_signature = colorful.bold_red(f'{predicate.name}/{actual_arity}')
-                    expected_signature = colorful.bold_red(f'{predicate.name}/{expected_arity}')
-                    print_message(colorful.red(f'{actual_signature} should be {expected_signature}'),
-                                  file_name=file_path, line_number=line_number)
-                    violations_found = True
+    for file_path, file_scan in zip(args.files, file_scans):
+        for line_number, (name, actual_arity), expected_arity in find_violations(file_scan, predicate_signatures):
+            if expected_arity is None:
+                # Missing annotation
+                predicate_signature = colorful.bold_yellow(f'{name}/{actual_arity}')
+                print_message(colorful.yellow(f'Missing annotation for {predicate_signature}'),
+                              file_name=file_path, line_number=line_number)
+
+            else:
+                # Annotation violation
+                actual_signature = colorful.bold_red(f'{name}/{actual_arity}')
+                expected_signature = colorful.bold_red(f'{name}/{expected_arity}')
+                print_message(colorful.red(f'{actual_signature} should be {expected_signature}'),
+                              file_name=file_path, line_number=line_number)
+            violations_found = True
 
     if violations_found:
         sys.exit(1)
@@ -5,6 +5,7 @@ Magic: The Gathering Tournament Deck Optimizer
 """
 
 import logging
+import math
 import operator
 import random
 from collections import defaultdict
@@ -185,6 +186,18 @@ class CardTypes(NamedTuple):
     instants: Mapping[CardFaceId, Instant]
 
 
+class CardContribution(NamedTuple):
+    """
+    What a single copy of a card adds to the deck counts of :func:`summarize_deck`
+    """
+    land_counts: Sequence[Tuple[ManaColor, float]]
+    # Includes colors counted zero times (e.g. a {0} cost), since every mentioned color joins the color identity
+    mana_symbol_counts: Sequence[Tuple[ManaColor, float]]
+    converted_mana_cost_index: Optional[Index]  # None if beyond the evaluated mana curve
+    archetypes: AbstractSet[Archetype]
+    is_dud: bool
+
+
 class SetInfo(NamedTuple):
     cards: Mapping[CardNumber, Card]
     card_types: CardTypes
@@ -192,6 +205,11 @@ class SetInfo(NamedTuple):
     ratings: Mapping[Decimal, AbstractSet[CardNumber]]
     guilds: Mapping[Guild, AbstractSet[CardNumber]]
     archetypes: Mapping[Archetype, AbstractSet[CardNumber]]
+    contributions: Mapping[CardNumber, CardContribution]
+
+
+# For the purposes of deck evaluation, we are only considering the converted mana cost <= 5
+converted_mana_cost_buckets = 6
 
 
 class DeckSummary(NamedTuple):
@@ -214,6 +232,23 @@ class DeckEvaluation(NamedTuple):
     mana_symbol_penalty: float
     deck_color_penalty: float
     archetype_penalty: float
+    # Optional: only computed when requested, by castability.CastabilityEvaluator
+    castability_penalty: float = 0.
+
+
+class CardName:
+    """
+    Formats the name of a card (joining the names of its faces) only when it is actually printed,
+    so that log messages which are not emitted cost nothing to format
+    """
+
+    __slots__ = ('card',)
+
+    def __init__(self, card: Card):
+        self.card = card
+
+    def __str__(self) -> str:
+        return ' // '.join(face.name for face in self.card.faces)
 
 
 def generate_booster_pack(set_info: SetInfo) -> Iterator[CardNumber]:
@@ -249,7 +284,73 @@ def generate_booster_pack(set_info: SetInfo) -> Iterator[CardNumber]:
     rare_weights = repeat(7, len(rares))
     mythic_rare_weights = repeat(1, len(mythic_rares))
 
-    yield from random.choices((*rares, *mythic_rares), cum_weights=(*rare_weights, *mythic_rare_weights))
+    yield from random.choices((*rares, *mythic_rares), weights=(*rare_weights, *mythic_rare_weights))
+
+
+def compute_card_contribution(card_number: CardNumber, card: Card,
+                              lands: Mapping[CardFaceId, Land]) -> CardContribution:
+    """
+    Computes what a single copy of a card adds to the deck counts, checking that the card can be evaluated
+
+    :param card_number: The card's number in its set
+    :param card: The card
+    :param lands: The land faces of the card's set
+    :return: The card's contribution
+    """
+    if not card.faces:
+        raise ValueError(f'Card {card_number} has no faces')
+    if card.converted_mana_cost < 0:
+        raise ValueError(f'Card {card_number} ("{CardName(card)}") has a negative converted mana cost')
+
+    # Lands
+    land_counts: DefaultDict[ManaColor, float] = defaultdict(float)
+    for face_index, _ in enumerate(card.faces):
+        try:
+            mana_colors = lands[card_number, face_index].possible_colors
+        except KeyError:
+            pass
+        else:
+            for mana_color in mana_colors:
+                # In the case of a dual land, count 0.5 for each color
+                land_counts[mana_color] += 1 / len(mana_colors)
+            break  # Only count one land per card
+
+    # Mana symbols
+    mana_symbol_counts: DefaultDict[ManaColor, float] = defaultdict(float)
+    for face in card.faces:
+        for mana_colors, mana_quantity in face.mana_cost.items():
+            if not mana_colors or mana_quantity < 0:
+                raise ValueError(f'Card {card_number} ("{CardName(card)}") has an invalid mana cost')
+            for mana_color in mana_colors:
+                # In the case of a split mana symbol, count 0.5 for each half
+                mana_symbol_counts[mana_color] += mana_quantity / len(mana_colors)
+
+    # Converted mana cost
+    if card.converted_mana_cost < converted_mana_cost_buckets:
+        converted_mana_cost_index: Optional[Index] = card.converted_mana_cost
+    else:
+        logging.debug('Ignoring CMC of card %d ("%s"), since its CMC = %d', card_number, CardName(card),
+                      card.converted_mana_cost)
+        converted_mana_cost_index = None
+
+    # Sorted by color so that equal cards have equal contributions
+    mana_color_order = tuple(ManaColor).index
+    return CardContribution(land_counts=tuple(sorted(land_counts.items(),
+                                                     key=lambda item: mana_color_order(item[0]))),
+                            mana_symbol_counts=tuple(sorted(mana_symbol_counts.items(),
+                                                            key=lambda item: mana_color_order(item[0]))),
+                            converted_mana_cost_index=converted_mana_cost_index,
+                            archetypes=frozenset(card.archetypes),
+                            is_dud=card.rating <= 1)
+
+
+def compute_set_contributions(set_info: SetInfo) -> Dict[CardNumber, CardContribution]:
+    """
+    :param set_info: The set
+    :return: The contribution of every card in the set
+    """
+    return {card_number: compute_card_contribution(card_number, card, set_info.card_types.lands)
+            for card_number, card in set_info.cards.items()}
 
 
 def summarize_deck(deck: Deck, set_infos: Mapping[SetId, SetInfo]) -> DeckSummary:
@@ -268,55 +369,37 @@ def summarize_deck(deck: Deck, set_infos: Mapping[SetId, SetInfo]) -> DeckSummar
     total_cards: int = 0
     land_counts: DefaultDict[ManaColor, float] = defaultdict(float)
     mana_symbol_counts: DefaultDict[ManaColor, float] = defaultdict(float)
-    converted_mana_cost_counts: List[int] = [0] * 6
+    converted_mana_cost_counts: List[int] = [0] * converted_mana_cost_buckets
     archetype_counts: DefaultDict[Archetype, int] = defaultdict(int)
     dud_count: int = 0
 
+    # A weighted sum of the cards' precomputed contributions
     for (set_id, card_number), card_quantity in deck.items():
-        cards = set_infos[set_id].cards
-        lands = set_infos[set_id].card_types.lands
-
-        card = cards[card_number]
+        contribution = set_infos[set_id].contributions[card_number]
 
         # Total cards
         total_cards += card_quantity
 
         # Lands
-        for face_index, _ in enumerate(card.faces):
-            try:
-                mana_colors = lands[card_number, face_index].possible_colors
-            except KeyError:
-                pass
-            else:
-                for mana_color in mana_colors:
-                    # In the case of a dual land, count 0.5 for each color
-                    land_counts[mana_color] += card_quantity / len(mana_colors)
-                break  # Only count one land per card
+        for mana_color, land_count in contribution.land_counts:
+            land_counts[mana_color] += land_count * card_quantity
 
         # Mana symbols
-        for face in card.faces:
-            for mana_colors, mana_quantity in face.mana_cost.items():
-                for mana_color in mana_colors:
-                    # In the case of a split mana symbol, count 0.5 for each half
-                    mana_symbol_counts[mana_color] += mana_quantity * card_quantity / len(mana_colors)
+        for mana_color, mana_symbol_count in contribution.mana_symbol_counts:
+            mana_symbol_counts[mana_color] += mana_symbol_count * card_quantity
 
         # Converted mana cost
-        try:
-            # Leaves index 0 unoccupied - Allowed for code elegance
-            converted_mana_cost_counts[card.converted_mana_cost] += card_quantity
-        except IndexError:
-            # For the purposes of deck evaluation, we are only considering the converted mana cost <= 5
-            logging.debug('Ignoring CMC of card %d ("%s") from set "%s", since its CMC = %d', card_number,
-                          ' // '.join(face.name for face in card.faces), set_id, card.converted_mana_cost)
+        if contribution.converted_mana_cost_index is not None:
+            converted_mana_cost_counts[contribution.converted_mana_cost_index] += card_quantity
 
         # Archetypes
-        for archetype in card.archetypes:
+        for archetype in contribution.archetypes:
             archetype_counts[archetype] += card_quantity
 
         # Duds
-        if card.rating <= 1:
+        if contribution.is_dud:
             logging.debug('Counting card %d ("%s") from set "%s" as a dud', card_number,
-                          ' // '.join(face.name for face in card.faces), set_id)
+                          CardName(set_infos[set_id].cards[card_number]), set_id)
             dud_count += card_quantity
 
     # Summarize mana curve
@@ -382,9 +465,10 @@ def evaluate_deck(deck: DeckSummary) -> DeckEvaluation:
         land_ratio_penalty *= 1000
 
     # Evaluate land color percentage
-    mana_symbol_penalty: float = sum(abs(mana_symbol_probability_mass - land_probability_mass)
-                                     for _, (mana_symbol_probability_mass, land_probability_mass)
-                                     in zip_dict(deck.mana_symbol_pmf, deck.land_color_pmf))
+    # (fsum keeps the result independent of the iteration order of the common colors)
+    mana_symbol_penalty: float = math.fsum(abs(mana_symbol_probability_mass - land_probability_mass)
+                                           for _, (mana_symbol_probability_mass, land_probability_mass)
+                                           in zip_dict(deck.mana_symbol_pmf, deck.land_color_pmf))
 
     # Evaluate color identity
     deck_color_penalty = max(2 - len(deck.dominant_mana_colors), 2) + len(deck.splash_mana_colors)
@@ -427,15 +511,11 @@ def evaluate_deck(deck: DeckSummary) -> DeckEvaluation:
     return penalties
 
 
-def parse_cards_csv(cards_csv: Iterable[Sequence[str]]) -> Dict[SetId, SetInfo]:
+def create_set_info() -> SetInfo:
     """
-    Load a spreadsheet of cards and generate necessary data structures to contain them
-
-    :param cards_csv: The spreadsheet to parse
-    :return: The populated data structures
+    :return: A set with no cards, ready to be populated by :func:`add_card`
     """
-    # Initialize data structure
-    set_infos: Dict[SetId, SetInfo] = defaultdict(lambda: SetInfo(
+    return SetInfo(
         cards={},
         card_types=CardTypes(
             lands={},
@@ -450,7 +530,167 @@ def parse_cards_csv(cards_csv: Iterable[Sequence[str]]) -> Dict[SetId, SetInfo]:
         ratings=defaultdict(set),
         guilds=defaultdict(set),
         archetypes=defaultdict(set),
-    ))
+        contributions={},
+    )
+
+
+def parse_mana_cost(mana_cost: str) -> Dict[FrozenSet[ManaColor], Count]:
+    """
+    :param mana_cost: A mana cost such as ``{2}{W}{W/U}`` (possibly empty)
+    :return: The quantity of each mana symbol
+    """
+    mana_cost_text: str = mana_cost.upper()
+    mana_cost_text = mana_cost_text.strip('{}')
+    mana_cost: DefaultDict[FrozenSet[ManaColor], Count] = defaultdict(int)
+    for mana_cost_symbol in mana_cost_text.split('}{'):
+        try:
+            assert mana_cost_symbol
+            mana_cost_symbol = int(mana_cost_symbol)
+
+        except AssertionError:
+            # No mana symbol
+            continue
+
+        except ValueError:
+            mana_quantity = 1
+            try:
+                left_mana_symbol, right_mana_symbol = mana_cost_symbol.split('/')
+
+            except ValueError:
+                # Single-color mana
+                mana_colors = ManaColor(mana_cost_symbol),
+
+            else:
+                # Split mana
+                left_mana_symbol, right_mana_symbol = \
+                    ManaColor(left_mana_symbol), ManaColor(right_mana_symbol)
+                mana_colors = left_mana_symbol, right_mana_symbol
+
+        else:
+            # Any mana
+            mana_colors = ManaColor.ANY,
+            mana_quantity = mana_cost_symbol
+
+        mana_colors = frozenset(mana_colors)
+        mana_cost[mana_colors] += mana_quantity
+
+    return mana_cost
+
+
+def parse_card_type(card_type: str) -> CardType:
+    """
+    :param card_type: A type line such as ``Legendary Creature - Elf Warrior``
+    :return: The first card type on the type line
+    """
+    card_type, *_ = card_type.split(' - ')
+    for word in card_type.split():
+        word = word.capitalize()
+        try:
+            return CardType(word)
+
+        except ValueError:
+            pass
+
+    raise ValueError('Cannot parse card type')
+
+
+# Where the type info of each card type is kept in CardTypes
+card_type_fields: Mapping[CardType, str] = {
+    CardType.LAND: 'lands',
+    CardType.ENCHANTMENT: 'enchantments',
+    CardType.ARTIFACT: 'artifacts',
+    CardType.PLANESWALKER: 'planeswalkers',
+    CardType.CREATURE: 'creatures',
+    CardType.SORCERY: 'sorceries',
+    CardType.INSTANT: 'instants',
+}
+
+
+def default_card_type_info(card_type: CardType) -> NamedTuple:
+    """
+    :param card_type: The type of a card face
+    :return: Type info for a face whose details are unknown
+    """
+    # TODO: Implement
+    if card_type == CardType.LAND:
+        return Land(possible_colors=set())
+
+    elif card_type == CardType.ENCHANTMENT:
+        return Enchantment(possible_target_types=set())
+
+    elif card_type == CardType.ARTIFACT:
+        return Artifact()
+
+    elif card_type == CardType.PLANESWALKER:
+        return Planeswalker(loyalty=0, actions=())
+
+    elif card_type == CardType.CREATURE:
+        return Creature(power=0, toughness=0, keywords=set())
+
+    elif card_type == CardType.SORCERY:
+        return Sorcery()
+
+    elif card_type == CardType.INSTANT:
+        return Instant()
+
+    raise ValueError(f'Unknown card type {card_type}')
+
+
+def get_card_type_infos(set_info: SetInfo, card_number: CardNumber) -> List[Optional[NamedTuple]]:
+    """
+    :param set_info: The set containing the card
+    :param card_number: The card's number in the set
+    :return: The type info of each face of the card (as accepted by :func:`add_card`)
+    """
+    return [getattr(set_info.card_types, card_type_fields[face.type]).get((card_number, face_index))
+            for face_index, face in enumerate(set_info.cards[card_number].faces)]
+
+
+def add_card(set_info: SetInfo, card_number: CardNumber, card: Card,
+             type_infos: Optional[Sequence[Optional[NamedTuple]]] = None):
+    """
+    Adds a card to a set created by :func:`create_set_info`, populating every lookup structure
+
+    :param set_info: The set to add to
+    :param card_number: The card's number in the set
+    :param card: The card
+    :param type_infos: The type info of each face (defaults to :func:`default_card_type_info` for missing faces)
+    """
+    # __setitem__(...) is only defined in MutableMapping, not Mapping.
+    # Mutate anyway and ignore type warnings
+
+    # Card type info
+    for face_index, face in enumerate(card.faces):
+        type_info = type_infos[face_index] if type_infos is not None and face_index < len(type_infos) else None
+        if type_info is None:
+            type_info = default_card_type_info(face.type)
+        getattr(set_info.card_types, card_type_fields[face.type])[card_number, face_index] = type_info
+
+    # Populate forward data structure
+    set_info.cards[card_number] = card
+
+    # Populate backward data structures
+    # add(...) is only defined in MutableSet, not AbstractSet.
+    # Mutate anyway and ignore type warnings
+    set_info.rarities[card.rarity].add(card_number)
+    set_info.ratings[card.rating].add(card_number)
+    set_info.guilds[card.guild].add(card_number)
+    for archetype in card.archetypes:
+        set_info.archetypes[archetype].add(card_number)
+
+    # Validate the card once here rather than on every evaluation
+    set_info.contributions[card_number] = compute_card_contribution(card_number, card, set_info.card_types.lands)
+
+
+def parse_cards_csv(cards_csv: Iterable[Sequence[str]]) -> Dict[SetId, SetInfo]:
+    """
+    Load a spreadsheet of cards and generate necessary data structures to contain them
+
+    :param cards_csv: The spreadsheet to parse
+    :return: The populated data structures
+    """
+    # Initialize data structure
+    set_infos: Dict[SetId, SetInfo] = defaultdict(create_set_info)
 
     for card_csv_line in cards_csv:
         # Unpack cell data
@@ -475,89 +715,14 @@ def parse_cards_csv(cards_csv: Iterable[Sequence[str]]) -> Dict[SetId, SetInfo]:
 
         # Card faces
         card_faces: List[CardFace] = []
-        for face_index, (card_name, mana_cost, card_type) in enumerate(zip(*(string.split('//')
-                                                                             for string in
-                                                                             (card_name, mana_cost, card_type)))):
+        for card_name, mana_cost, card_type in zip(*(string.split('//')
+                                                     for string in (card_name, mana_cost, card_type))):
             # Trim whitespace
             card_name, mana_cost, card_type = card_name.strip(), mana_cost.strip(), card_type.strip()
 
-            # Mana cost
-            mana_cost_text: str = mana_cost.upper()
-            mana_cost_text = mana_cost_text.strip('{}')
-            mana_cost: DefaultDict[FrozenSet[ManaColor], Count] = defaultdict(int)
-            for mana_cost_symbol in mana_cost_text.split('}{'):
-                try:
-                    assert mana_cost_symbol
-                    mana_cost_symbol = int(mana_cost_symbol)
-
-                except AssertionError:
-                    # No mana symbol
-                    continue
-
-                except ValueError:
-                    mana_quantity = 1
-                    try:
-                        left_mana_symbol, right_mana_symbol = mana_cost_symbol.split('/')
-
-                    except ValueError:
-                        # Single-color mana
-                        mana_colors = ManaColor(mana_cost_symbol),
-
-                    else:
-                        # Split mana
-                        left_mana_symbol, right_mana_symbol = \
-                            ManaColor(left_mana_symbol), ManaColor(right_mana_symbol)
-                        mana_colors = left_mana_symbol, right_mana_symbol
-
-                else:
-                    # Any mana
-                    mana_colors = ManaColor.ANY,
-                    mana_quantity = mana_cost_symbol
-
-                mana_colors = frozenset(mana_colors)
-                mana_cost[mana_colors] += mana_quantity
-
-            # Card type
-            card_type, *_ = card_type.split(' - ')
-            for word in card_type.split():
-                word = word.capitalize()
-                try:
-                    card_type: CardType = CardType(word)
-                    break
-
-                except ValueError:
-                    pass
-            else:
-                raise ValueError('Cannot parse card type')
-
-            # Card type info
-            # __setitem__(...) is only defined in MutableMapping, not Mapping.
-            # Mutate anyway and ignore type warnings
-            # TODO: Implement
-            if card_type == CardType.LAND:
-                set_info.card_types.lands[card_number, face_index] = Land(possible_colors=set())
-
-            elif card_type == CardType.ENCHANTMENT:
-                set_info.card_types.enchantments[card_number, face_index] = Enchantment(possible_target_types=set())
-
-            elif card_type == CardType.ARTIFACT:
-                set_info.card_types.artifacts[card_number, face_index] = Artifact()
-
-            elif card_type == CardType.PLANESWALKER:
-                set_info.card_types.planeswalkers[card_number, face_index] = Planeswalker(loyalty=0, actions=())
-
-            elif card_type == CardType.CREATURE:
-                set_info.card_types.creatures[card_number, face_index] = Creature(power=0, toughness=0,
-                                                                                  keywords=set())
-
-            elif card_type == CardType.SORCERY:
-                set_info.card_types.sorceries[card_number, face_index] = Sorcery()
-
-            elif card_type == CardType.INSTANT:
-                set_info.card_types.instants[card_number, face_index] = Instant()
-
             # Consolidate
-            card_faces.append(CardFace(name=card_name, mana_cost=mana_cost, type=card_type))
+            card_faces.append(CardFace(name=card_name, mana_cost=parse_mana_cost(mana_cost),
+                                       type=parse_card_type(card_type)))
 
         # Important: Keep this tuple in sync with the definition order of the Archetype Enum
         archetypes: Tuple[str, ...] = (bomb, removal, combat_trick, evasive, counter, card_draw, mana_fixing)
@@ -567,10 +732,7 @@ def parse_cards_csv(cards_csv: Iterable[Sequence[str]]) -> Dict[SetId, SetInfo]:
 
         image_url: ParseResult = urlparse(image_url)
 
-        # Populate forward data structure
-        # __setitem__(...) is only defined in MutableMapping, not Mapping.
-        # Mutate anyway and ignore type warning
-        set_info.cards[card_number] = Card(
+        add_card(set_info, card_number, Card(
             faces=card_faces,
             converted_mana_cost=cmc,
             archetypes=archetypes,
@@ -578,16 +740,7 @@ def parse_cards_csv(cards_csv: Iterable[Sequence[str]]) -> Dict[SetId, SetInfo]:
             rating=rating,
             guild=guild,
             image_url=image_url,
-        )
-
-        # Populate backward data structures
-        # add(...) is only defined in MutableSet, not AbstractSet.
-        # Mutate anyway and ignore type warnings
-        set_info.rarities[rarity].add(card_number)
-        set_info.ratings[rating].add(card_number)
-        set_info.guilds[guild].add(card_number)
-        for archetype in archetypes:
-            set_info.archetypes[archetype].add(card_number)
+        ))
 
     return set_infos
 
@@ -631,24 +784,240 @@ basic_land_info = SetInfo(cards={card_number: Card(
                       rarities={basic_land_rarity: basic_land_card_numbers},
                       ratings={basic_land_rating: basic_land_card_numbers},
                       guilds={},
-                      archetypes={})
+                      archetypes={},
+                      contributions={})
+basic_land_info = basic_land_info._replace(contributions=compute_set_contributions(basic_land_info))
 
 
-if __name__ == '__main__':
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    Command line interface
+
+    :param argv: The command line arguments (defaults to ``sys.argv``)
+    """
     import argparse
-    import csv
+    from contextlib import ExitStack
+    from pathlib import Path
+
+    import instrumentation
 
     parser = argparse.ArgumentParser(description='Compute an optimal deck given a set of booster packs')
-    parser.add_argument('cards', metavar='RATING', type=argparse.FileType('r'),
-                        help='The ratings list as a CSV')
-    args = parser.parse_args()
-
-    # Read in CSV file
-    with args.cards as cards_file:
-        cards_csv: Iterator[List[str]] = csv.reader(cards_file)
-        _ = next(cards_csv)  # Skip header row
-        set_infos = parse_cards_csv(cards_csv)
-
-    set_infos.update({
-        None: basic_land_info,
-    })
+    parser.add_argument('cards', metavar='RATING', type=Path, nargs='+',
+                        help='Ratings lists as CSVs, or directories of them (sets are only parsed when used)')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help='Always parse the CSVs instead of using (and refreshing) their compiled caches')
+    parser.add_argument('--compact', action='store_true',
+                        help='Store the cards of each set column by column, which takes less memory')
+    parser.add_argument('--pool', metavar='POOL_FILE', type=argparse.FileType('r'),
+                        help='A YAML file listing the sealed pool (default: open booster packs)')
+    parser.add_argument('--set', metavar='SET_CODE', dest='set_id',
+                        help='The set to open booster packs from (default: the alphabetically first set code)')
+    parser.add_argument('--packs', metavar='N', type=int, default=6,
+                        help='The number of booster packs to open (default: %(default)s)')
+    parser.add_argument('--iterations', metavar='N', type=int,
+                        help='The number of candidate decks to try')
+    parser.add_argument('--time-limit', metavar='SECONDS', type=float, default=10.,
+                        help='How long to search when --iterations is not given (default: %(default)s)')
+    parser.add_argument('--seed', type=int,
+                        help='Seeds pack generation and the search for reproducibility')
+    parser.add_argument('--restarts', metavar='N', type=int, default=1,
+                        help='The number of independent searches, each with the full budget (default: %(default)s)')
+    parser.add_argument('--workers', metavar='N', type=int,
+                        help='The number of processes to run restarts in (default: the number of CPUs)')
+    parser.add_argument('--top', metavar='K', type=int, default=1,
+                        help='The number of distinct decks to report (default: %(default)s)')
+    parser.add_argument('--castability', action='store_true',
+                        help='Also penalize decks by the expected number of spells they cannot cast on curve '
+                             '(not with --exact)')
+    parser.add_argument('--no-evaluation-cache', dest='use_evaluation_cache', action='store_false',
+                        help='Evaluate every candidate deck of the search, even decks it has seen before')
+    parser.add_argument('--complete', metavar='SPELLS_FILE', type=argparse.FileType('r'),
+                        help='Instead of searching, complete a YAML list of spells (in the format of --pool) into a '
+                             '40-card deck with the best basic lands')
+    parser.add_argument('--exact', action='store_true',
+                        help='Search for the provably best deck by branch-and-bound (within --time-limit, '
+                             'exploring at most --iterations nodes)')
+    parser.add_argument('--genetic', action='store_true',
+                        help='Evolve a population of decks (for --iterations generations, or within --time-limit)')
+    parser.add_argument('--population', metavar='N', type=int, default=200,
+                        help='The number of decks in each generation of --genetic (default: %(default)s)')
+    parser.add_argument('--pareto', metavar='FRONT_FILE', type=argparse.FileType('w'),
+                        help='Also write every deck of the search that no other deck beats on every penalty as JSON '
+                             '(not with --exact, --restarts or --top)')
+    parser.add_argument('--instrument', metavar='STATISTICS_FILE', type=argparse.FileType('w'),
+                        help='Count and time calls of the hot path functions and write the statistics as JSON')
+    parser.add_argument('--profile', metavar='PROFILE_FILE',
+                        help='Run under cProfile and save the profile (view it with python -m pstats)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Trace memory allocations and print the largest allocation sites')
+    args = parser.parse_args(argv)
+    if args.exact and args.genetic:
+        parser.error('--exact cannot be combined with --genetic')
+    if (args.exact or args.genetic) and args.castability:
+        parser.error('--castability cannot be combined with --exact or --genetic')
+    if args.pareto is not None and (args.exact or args.restarts != 1 or args.top != 1):
+        parser.error('--pareto cannot be combined with --exact, --restarts or --top')
+
+    with ExitStack() as stack:
+        if args.profile is not None:
+            stack.enter_context(instrumentation.profiled(args.profile))
+        if args.trace_memory:
+            stack.enter_context(instrumentation.traced_memory())
+        if args.instrument is not None:
+            stack.enter_context(instrumentation.instrumented())
+
+        optimize(args, parser)
+
+    if args.instrument is not None:
+        with args.instrument as statistics_file:
+            instrumentation.dump(statistics_file)
+
+
+def print_penalties(evaluation: DeckEvaluation, lower_bound: Optional[float] = None, castability: bool = False):
+    """
+    Prints each penalty of a deck and their total
+
+    :param evaluation: The deck's penalties
+    :param lower_bound: A lower bound on the total penalty of every deck of the pool, if known
+    :param castability: Whether the castability penalty was computed (it is left out otherwise)
+    """
+    print('Penalties:')
+    for penalty_name, penalty in evaluation._asdict().items():
+        if penalty_name != 'castability_penalty' or castability:
+            print(f'  {penalty_name}: {penalty:.4f}')
+    print(f'  Total: {sum(evaluation):.4f}' + ('' if lower_bound is None else f' (lower bound: {lower_bound:.4f})'))
+    print()
+
+
+def optimize(args, parser):
+    """
+    Finds the best deck for the pool described by the command line arguments and prints it
+
+    :param args: The parsed command line arguments (see :func:`main`)
+    :param parser: The command line parser, which reports invalid input files
+    """
+    from deck_search import anneal_deck, format_deck, generate_sealed_pool, load_pool, parallel_search
+    from lazy_loading import LazySetInfos
+
+    # Index the CSV files; each set is parsed the first time it is used
+    all_set_infos = LazySetInfos(args.cards, use_cache=args.use_cache, compact=args.compact)
+
+    if args.complete is not None:
+        from mana_base import solve_mana_base
+
+        with args.complete as spells_file:
+            spells = load_pool(spells_file)
+        set_infos = all_set_infos.subset({set_id for set_id, _ in spells})
+        try:
+            mana_base = solve_mana_base(spells, set_infos)
+        except ValueError as error:
+            parser.error(f'--complete: {error}')
+
+        print('Deck:')
+        for line in format_deck(mana_base.deck, set_infos):
+            print(f'  {line}')
+        print()
+
+        print_penalties(mana_base.evaluation)
+        return
+
+    random.seed(args.seed)
+
+    # Determine the pool
+    if args.pool is not None:
+        with args.pool as pool_file:
+            pool = load_pool(pool_file)
+    else:
+        set_id = args.set_id or min(set_id for set_id in all_set_infos.keys() if set_id is not None)
+        pool = generate_sealed_pool(set_id, all_set_infos[set_id], packs=args.packs)
+
+    # Only the sets in the pool are needed (and sent to worker processes)
+    set_infos = all_set_infos.subset({set_id for set_id, _ in pool})
+
+    print(f'Pool: {sum(pool.values())} cards')
+    for line in format_deck(pool, set_infos):
+        print(f'  {line}')
+    print()
+
+    pareto_front = None
+    if args.pareto is not None:
+        from pareto import DeckFront
+
+        pareto_front = DeckFront()
+
+    def write_pareto_front():
+        if pareto_front is not None:
+            import json
+
+            with args.pareto as front_file:
+                json.dump(pareto_front.to_json(set_infos), front_file, indent=2)
+                front_file.write('\n')
+            print(f'Pareto front: {len(pareto_front)} decks')
+
+    # Search
+    if args.exact:
+        from exact_search import exact_deck_search
+
+        result = exact_deck_search(pool, set_infos, time_limit=args.time_limit, node_limit=args.iterations,
+                                   seed=args.seed)
+        print(f'Deck ({result.nodes} nodes in {result.elapsed_seconds:.1f}s, '
+              f'{"optimal" if result.optimal else f"stopped early, gap {result.gap:.4f}"}):')
+        for line in format_deck(result.deck, set_infos):
+            print(f'  {line}')
+        print()
+
+        print_penalties(result.evaluation, lower_bound=result.lower_bound)
+        return
+
+    if args.genetic:
+        from genetic_search import genetic_search
+
+        best_penalties = []
+
+        def print_generation(statistics):
+            # Only report generations which improve on the best deck
+            if not best_penalties or statistics.best_penalty < best_penalties[-1]:
+                print(f'Generation {statistics.generation:>5} ({statistics.elapsed_seconds:6.1f}s): '
+                      f'best {statistics.best_penalty:.4f}, mean {statistics.mean_penalty:.4f}, '
+                      f'{statistics.distinct_decks} distinct decks')
+            best_penalties.append(statistics.best_penalty)
+
+        genetic_result = genetic_search(pool, set_infos, population_size=args.population, generations=args.iterations,
+                                        time_limit=args.time_limit, seed=args.seed, on_generation=print_generation,
+                                        pareto_front=pareto_front)
+        print()
+        print(f'Deck ({len(genetic_result.generations) - 1} generations in {genetic_result.elapsed_seconds:.1f}s):')
+        for line in format_deck(genetic_result.deck, set_infos):
+            print(f'  {line}')
+        print()
+
+        print_penalties(genetic_result.evaluation)
+        write_pareto_front()
+        return
+
+    if args.restarts == 1 and args.top == 1:
+        results = [anneal_deck(pool, set_infos, iterations=args.iterations, time_limit=args.time_limit,
+                               seed=args.seed, castability=args.castability, pareto_front=pareto_front,
+                               use_evaluation_cache=args.use_evaluation_cache)]
+    else:
+        results = parallel_search(pool, set_infos, restarts=args.restarts, workers=args.workers, top_k=args.top,
+                                  seed=args.seed, iterations=args.iterations, time_limit=args.time_limit,
+                                  castability=args.castability, use_evaluation_cache=args.use_evaluation_cache)
+
+    for rank, result in enumerate(results, start=1):
+        print(f'Deck #{rank} ({result.iterations} candidates in {result.elapsed_seconds:.1f}s, '
+              f'{result.iterations / result.elapsed_seconds:.0f}/s):')
+        for line in format_deck(result.deck, set_infos):
+            print(f'  {line}')
+        print()
+
+        print_penalties(result.evaluation, castability=args.castability)
+
+    write_pareto_front()
+
+
+if __name__ == '__main__':
+    # Run from the importable module so that helper modules share its class definitions
+    from algorithm import main
+
+    main()
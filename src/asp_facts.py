@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+"""
+ASP fact generator
+
+Writes the input predicates of ``game-logic/base_encoding.lp`` (``card/3``, ``card_mana_cost/3``, ``land/2``,
+``creature/3``, ``card_archetype/2``, ``starting_deck/3``, ``turn/2``, ...) for the decks of any number of players.
+Facts are generated one at a time, and the facts of a card are written only once, the first time any deck
+contains it, so instances with many players drawing from the same sets stay small.
+
+Cards are identified by ``(SetId, CardNumber)`` tuples such as ``("RNA",12)``; basic lands belong to the set
+``basic``. Every card face contributes its type facts to its card. Mana costs are summed over faces, and split mana
+symbols are listed under each of their colors.
+"""
+
+import re
+from collections import defaultdict
+from typing import *
+
+from algorithm import Archetype, CardId, CardType, Count, Deck, Keyword, ManaColor, Rarity, SetId, SetInfo, \
+    get_card_type_infos
+
+Term = Union[str, int]
+
+# The set of basic lands in the encoding (basic lands have no set in the data model)
+basic_land_set_term = 'basic'
+
+# The encoding names rarities after the color of their set symbol
+rarity_terms: Mapping[Rarity, str] = {
+    Rarity.COMMON: 'black',
+    Rarity.UNCOMMON: 'gray',
+    Rarity.RARE: 'yellow',
+    Rarity.MYTHIC_RARE: 'red',
+}
+mana_color_terms: Mapping[ManaColor, str] = {mana_color: mana_color.name.lower() for mana_color in ManaColor}
+keyword_terms: Mapping[Keyword, str] = {keyword: keyword.name.lower() for keyword in Keyword}
+archetype_terms: Mapping[Archetype, str] = {archetype: archetype.name.lower() for archetype in Archetype}
+card_type_terms: Mapping[CardType, str] = {card_type: card_type.name.lower() for card_type in CardType}
+
+# Facts are listed in definition order
+mana_color_order = {mana_color: index for index, mana_color in enumerate(ManaColor)}.__getitem__
+keyword_order = {keyword: index for index, keyword in enumerate(Keyword)}.__getitem__
+archetype_order = {archetype: index for index, archetype in enumerate(Archetype)}.__getitem__
+card_type_order = {card_type: index for index, card_type in enumerate(CardType)}.__getitem__
+
+constant_re = re.compile(r"[a-z_][A-Za-z0-9_']*")
+
+
+def format_string(string: str) -> str:
+    escaped = string.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'"{escaped}"'
+
+
+def format_term(value: Term) -> str:
+    """
+    :param value: An integer, or a string which is written as a constant if it is one and quoted otherwise
+    :return: The ASP term
+    """
+    if isinstance(value, int):
+        return str(value)
+    return value if constant_re.fullmatch(value) else format_string(value)
+
+
+def format_set_id(set_id: SetId) -> str:
+    return basic_land_set_term if set_id is None else format_string(set_id)
+
+
+def format_card_id(card_id: CardId) -> str:
+    set_id, card_number = card_id
+    return f'({format_set_id(set_id)},{card_number})'
+
+
+def generate_card_facts(card_id: CardId, set_info: SetInfo) -> Iterator[str]:
+    """
+    :param card_id: The card
+    :param set_info: The card's set
+    :return: The facts describing the card (without the facts of its set)
+    """
+    _, card_number = card_id
+    card = set_info.cards[card_number]
+    card_term = format_card_id(card_id)
+
+    yield f'card({card_term},{format_set_id(card_id[0])},{rarity_terms[card.rarity]}).'
+
+    mana_cost: DefaultDict[ManaColor, Count] = defaultdict(int)
+    for face in card.faces:
+        for mana_colors, mana_quantity in face.mana_cost.items():
+            for mana_color in mana_colors:
+                mana_cost[mana_color] += mana_quantity
+    for mana_color in sorted(mana_cost, key=mana_color_order):
+        yield f'card_mana_cost({card_term},{mana_color_terms[mana_color]},{mana_cost[mana_color]}).'
+
+    for face, type_info in zip(card.faces, get_card_type_infos(set_info, card_number)):
+        if face.type == CardType.LAND:
+            for mana_color in sorted(type_info.possible_colors, key=mana_color_order):
+                yield f'land({card_term},{mana_color_terms[mana_color]}).'
+        elif face.type == CardType.ENCHANTMENT:
+            for card_type in sorted(type_info.possible_target_types, key=card_type_order):
+                yield f'enchantment({card_term},{card_type_terms[card_type]}).'
+        elif face.type == CardType.ARTIFACT:
+            yield f'artifact({card_term}).'
+        elif face.type == CardType.PLANESWALKER:
+            yield f'planeswalker({card_term},{type_info.loyalty}).'
+            for loyalty_effect in type_info.actions:
+                yield f'planeswalker_action({card_term},{loyalty_effect}).'
+        elif face.type == CardType.CREATURE:
+            yield f'creature({card_term},{type_info.power},{type_info.toughness}).'
+            for keyword in sorted(type_info.keywords, key=keyword_order):
+                yield f'creature_ability({card_term},{keyword_terms[keyword]}).'
+        elif face.type == CardType.SORCERY:
+            yield f'sorcery({card_term}).'
+        elif face.type == CardType.INSTANT:
+            yield f'instant({card_term}).'
+
+    for archetype in sorted(card.archetypes, key=archetype_order):
+        yield f'card_archetype({card_term},{archetype_terms[archetype]}).'
+
+
+class FactGenerator:
+    """
+    Generates facts for many decks, remembering which sets and cards have been described already
+    """
+
+    def __init__(self, set_infos: Mapping[SetId, SetInfo]):
+        """
+        :param set_infos: Information about the sets the decks are drawn from (looked up only for the cards used)
+        """
+        self.set_infos = set_infos
+        self.described_sets: Set[SetId] = set()
+        self.described_cards: Set[CardId] = set()
+
+    def generate_set_facts(self, set_id: SetId) -> Iterator[str]:
+        if set_id not in self.described_sets:
+            self.described_sets.add(set_id)
+            yield f'set({format_set_id(set_id)}).'
+
+    def generate_card_facts(self, card_id: CardId) -> Iterator[str]:
+        """
+        :param card_id: The card
+        :return: The facts of the card and its set, unless already generated
+        """
+        if card_id in self.described_cards:
+            return
+        self.described_cards.add(card_id)
+
+        set_id, _ = card_id
+        yield from self.generate_set_facts(set_id)
+        yield from generate_card_facts(card_id, self.set_infos[set_id])
+
+    def generate_deck_facts(self, player: Term, deck: Deck) -> Iterator[str]:
+        """
+        :param player: The player whose starting deck this is
+        :param deck: The deck
+        :return: The facts of the player, of the deck and of its cards not yet described
+        """
+        player_term = format_term(player)
+        yield f'player({player_term}).'
+        for card_id, quantity in sorted(deck.items(), key=lambda item: (item[0][0] or '', item[0][1])):
+            if quantity <= 0:
+                continue
+            yield from self.generate_card_facts(card_id)
+            yield f'starting_deck({player_term},{format_card_id(card_id)},{quantity}).'
+
+    def generate_catalog_facts(self, set_ids: Optional[Iterable[SetId]] = None) -> Iterator[str]:
+        """
+        :param set_ids: The sets whose cards to describe (defaults to every set)
+        :return: The facts of every card of the sets not yet described
+        """
+        for set_id in (self.set_infos.keys() if set_ids is None else set_ids):
+            yield from self.generate_set_facts(set_id)
+            for card_number in sorted(self.set_infos[set_id].cards):
+                yield from self.generate_card_facts((set_id, card_number))
+
+
+def generate_turn_order(players: Sequence[Term]) -> Iterator[str]:
+    """
+    :param players: The players in the order they take turns
+    :return: The ``turn/2`` fact giving the first player the first turn, and the ``turn_order/2`` facts,
+        each player going after the previous one and the first after the last
+    """
+    if not players:
+        return
+    yield f'turn(1,{format_term(players[0])}).'
+    if len(players) < 2:
+        return
+    for previous_player, next_player in zip(players, (*players[1:], players[0])):
+        yield f'turn_order({format_term(previous_player)},{format_term(next_player)}).'
+
+
+def generate_facts(set_infos: Mapping[SetId, SetInfo], decks: Iterable[Tuple[Term, Deck]],
+                   catalog: Optional[Iterable[SetId]] = None) -> Iterator[str]:
+    """
+    Generates an instance for ``base_encoding.lp``
+
+    :param set_infos: Information about the sets the decks are drawn from
+    :param decks: The starting deck of each player, in turn order
+    :param catalog: Sets whose every card to describe, used in a deck or not
+    :return: One fact per line, starting with ``#program base.``
+    """
+    yield '#program base.'
+    generator = FactGenerator(set_infos)
+    players: List[Term] = []
+    for player, deck in decks:
+        players.append(player)
+        yield from generator.generate_deck_facts(player, deck)
+    yield from generate_turn_order(players)
+    if catalog is not None:
+        yield from generator.generate_catalog_facts(catalog)
+
+
+def write_facts(out_file: TextIO, facts: Iterable[str], chunk_size: int = 4096):
+    """
+    Writes facts one per line, a chunk at a time
+    """
+    chunk: List[str] = []
+    for fact in facts:
+        chunk.append(fact)
+        if len(chunk) >= chunk_size:
+            out_file.write('\n'.join(chunk) + '\n')
+            chunk.clear()
+    if chunk:
+        out_file.write('\n'.join(chunk) + '\n')
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from pathlib import Path
+
+    from deck_search import load_pool
+    from lazy_loading import LazySetInfos
+
+    def player_deck(string: str) -> Tuple[str, Path]:
+        player, separator, deck_path = string.partition('=')
+        if not separator or not player or not deck_path:
+            raise argparse.ArgumentTypeError(f'expected PLAYER=DECK_FILE, not "{string}"')
+        return player, Path(deck_path)
+
+    parser = argparse.ArgumentParser(description='Write clingo facts describing the starting decks of players')
+    parser.add_argument('cards', metavar='RATING', type=Path, nargs='+',
+                        help='Ratings lists as CSVs, or directories of them')
+    parser.add_argument('--deck', metavar='PLAYER=DECK_FILE', dest='decks', type=player_deck, action='append',
+                        default=[], help='A player and a YAML file listing their deck, in the format of --pool of '
+                                         'algorithm.py (repeat for each player, in turn order)')
+    parser.add_argument('--catalog', metavar='SET_CODE', nargs='*',
+                        help='Also describe every card of these sets (every set if none are given)')
+    parser.add_argument('--output', '-o', metavar='FACTS_FILE', type=argparse.FileType('w'), default=sys.stdout,
+                        help='Where to write the facts (default: standard output)')
+    args = parser.parse_args()
+
+    all_set_infos = LazySetInfos(args.cards)
+
+    player_decks: List[Tuple[str, Deck]] = []
+    for deck_player, player_deck_path in args.decks:
+        with open(player_deck_path) as deck_file:
+            player_decks.append((deck_player, load_pool(deck_file)))
+
+    catalog_set_ids: Optional[Iterable[SetId]] = args.catalog
+    if catalog_set_ids is not None and not catalog_set_ids:
+        catalog_set_ids = [set_id for set_id in all_set_infos if set_id is not None]
+
+    with args.output as facts_file:
+        write_facts(facts_file, generate_facts(all_set_infos, player_decks, catalog_set_ids))
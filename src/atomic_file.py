@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+"""
+Atomic file writes
+
+Caches and downloaded databases are written to a temporary file next to their destination and then renamed over
+it, so that readers (and interrupted writers) never see a partial file.
+"""
+
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import *
+
+# The process's umask, which can only be read by setting it
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+def new_file_mode(path: Path) -> int:
+    """
+    :param path: The file about to be replaced
+    :return: The permissions of the file, or those a newly created file would get (0666 less the umask)
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_umask
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = 'w') -> Iterator[IO]:
+    """
+    Writes a file so that readers see either the old or the new contents, never a partial write.
+    The file keeps its permissions (temporary files are only readable by their owner)
+
+    :param path: The file to write
+    :param mode: ``'w'`` to write text or ``'wb'`` to write bytes
+    :return: The temporary file to write to, which replaces ``path`` once closed without an exception
+    """
+    path = Path(path)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, mode) as out_file:
+            yield out_file
+        os.chmod(temporary_path, new_file_mode(path))
+        os.replace(temporary_path, path)
+
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
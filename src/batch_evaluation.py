@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""
+Vectorized deck evaluation
+
+Compiles every card of every set into a row of a feature matrix so that many decks can be summarized at once as a
+single ``(decks × cards) @ (cards × features)`` product and then scored with array arithmetic.
+The scoring mirrors :func:`algorithm.summarize_deck` and :func:`algorithm.evaluate_deck`.
+"""
+
+from typing import *
+
+import numpy as np
+
+from algorithm import Archetype, CardId, Deck, DeckEvaluation, Index, ManaColor, SetId, SetInfo, \
+    converted_mana_cost_buckets
+
+# Column order of the color and archetype blocks
+mana_colors: Tuple[ManaColor, ...] = tuple(ManaColor)
+archetypes: Tuple[Archetype, ...] = tuple(Archetype)
+
+# Feature matrix layout
+total_cards_column = 0
+converted_mana_cost_columns = slice(1, 1 + converted_mana_cost_buckets)
+land_color_columns = slice(converted_mana_cost_columns.stop, converted_mana_cost_columns.stop + len(mana_colors))
+mana_symbol_columns = slice(land_color_columns.stop, land_color_columns.stop + len(mana_colors))
+# Whether a card mentions a mana color at all (even a {0} cost creates an entry in summarize_deck)
+mana_symbol_presence_columns = slice(mana_symbol_columns.stop, mana_symbol_columns.stop + len(mana_colors))
+archetype_columns = slice(mana_symbol_presence_columns.stop, mana_symbol_presence_columns.stop + len(archetypes))
+dud_column = archetype_columns.stop
+feature_count = dud_column + 1
+
+expected_converted_mana_cost_cdf = np.array((0.05, 0.31, 0.52, 0.73, 0.89))
+
+
+class FeatureMatrix(NamedTuple):
+    card_ids: Sequence[CardId]
+    card_indices: Mapping[CardId, Index]
+    features: np.ndarray
+
+
+def card_features(card_number: int, set_info: SetInfo) -> np.ndarray:
+    """
+    Computes the contribution of a single copy of a card to the deck summary
+
+    :param card_number: The card to describe
+    :param set_info: The set the card belongs to
+    :return: A row of the feature matrix
+    """
+    contribution = set_info.contributions[card_number]
+    row = np.zeros(feature_count)
+
+    # Total cards
+    row[total_cards_column] = 1
+
+    # Lands
+    for mana_color, land_count in contribution.land_counts:
+        row[land_color_columns.start + mana_colors.index(mana_color)] = land_count
+
+    # Mana symbols
+    for mana_color, mana_symbol_count in contribution.mana_symbol_counts:
+        column = mana_colors.index(mana_color)
+        row[mana_symbol_columns.start + column] = mana_symbol_count
+        row[mana_symbol_presence_columns.start + column] = 1
+
+    # Converted mana cost
+    if contribution.converted_mana_cost_index is not None:
+        row[converted_mana_cost_columns.start + contribution.converted_mana_cost_index] = 1
+
+    # Archetypes
+    for archetype in contribution.archetypes:
+        row[archetype_columns.start + archetypes.index(archetype)] = 1
+
+    # Duds
+    if contribution.is_dud:
+        row[dud_column] = 1
+
+    return row
+
+
+def compile_feature_matrix(set_infos: Mapping[SetId, SetInfo]) -> FeatureMatrix:
+    """
+    Compiles every card of every set into a feature matrix (one row per card)
+
+    :param set_infos: The sets to compile
+    :return: The feature matrix and the mapping between cards and rows
+    """
+    card_ids: List[CardId] = [(set_id, card_number)
+                              for set_id, set_info in set_infos.items()
+                              for card_number in set_info.cards.keys()]
+    card_indices: Dict[CardId, Index] = {card_id: index for index, card_id in enumerate(card_ids)}
+
+    features = np.zeros((len(card_ids), feature_count))
+    for index, (set_id, card_number) in enumerate(card_ids):
+        features[index] = card_features(card_number, set_infos[set_id])
+
+    return FeatureMatrix(card_ids=card_ids, card_indices=card_indices, features=features)
+
+
+def deck_count_matrix(decks: Iterable[Deck], feature_matrix: FeatureMatrix) -> np.ndarray:
+    """
+    Converts decks into a count matrix with one row per deck and one column per card
+
+    :param decks: The decks to convert
+    :param feature_matrix: Determines the column of each card
+    :return: The card quantities of each deck
+    """
+    card_indices = feature_matrix.card_indices
+    rows: List[np.ndarray] = []
+    for deck in decks:
+        row = np.zeros(len(card_indices))
+        for card_id, card_quantity in deck.items():
+            row[card_indices[card_id]] += card_quantity
+        rows.append(row)
+
+    return np.array(rows).reshape((len(rows), len(card_indices)))
+
+
+def evaluate_decks(deck_counts: np.ndarray, feature_matrix: FeatureMatrix) -> DeckEvaluation:
+    """
+    Evaluates many decks at once.
+    Equivalent to ``evaluate_deck(summarize_deck(deck, set_infos))`` for each row of ``deck_counts``,
+    except that degenerate decks (no cards or no cards with CMC <= 5) evaluate to NaN instead of raising
+
+    :param deck_counts: The card quantities of each deck (see :func:`deck_count_matrix`)
+    :param feature_matrix: The compiled cards
+    :return: Each penalty as an array with one value per deck
+    """
+    summed_features = np.asarray(deck_counts, dtype=float) @ feature_matrix.features
+
+    total_cards = summed_features[:, total_cards_column]
+    converted_mana_cost_counts = summed_features[:, converted_mana_cost_columns]
+    land_counts = summed_features[:, land_color_columns]
+    mana_symbol_counts = summed_features[:, mana_symbol_columns]
+    mana_symbol_present = summed_features[:, mana_symbol_presence_columns] > 0
+    archetype_counts = summed_features[:, archetype_columns]
+    dud_count = summed_features[:, dud_column]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Summarize mana curve
+        total_converted_mana_cost_count = converted_mana_cost_counts.sum(axis=1, keepdims=True)
+        converted_mana_cost_cdf = np.cumsum(converted_mana_cost_counts / total_converted_mana_cost_count, axis=1)
+
+        # Summarize land percentage
+        total_land_count = land_counts.sum(axis=1, keepdims=True)
+        total_land_ratio = total_land_count[:, 0] / total_cards
+
+        # Summarize land color percentage
+        mana_symbol_pmf = mana_symbol_counts / mana_symbol_counts.sum(axis=1, keepdims=True)
+        land_color_pmf = land_counts / total_land_count
+
+    # Summarize color identity
+    land_color_present = land_counts > 0
+    dominant_mana_colors = mana_symbol_present & (mana_symbol_pmf >= 0.05)
+    splash_mana_colors = mana_symbol_present & ~dominant_mana_colors
+    color_identity_size = mana_symbol_present.sum(axis=1)
+
+    # Evaluate deck size
+    number_of_cards_penalty = (40 - total_cards) ** 2
+
+    # Evaluate mana curve
+    mana_curve_penalty = np.abs(expected_converted_mana_cost_cdf -
+                                converted_mana_cost_cdf[:, :len(expected_converted_mana_cost_cdf)]).sum(axis=1)
+
+    # Evaluate land percentage
+    land_ratio_penalty = np.where((16 / 40 <= total_land_ratio) & (total_land_ratio <= 18 / 40),
+                                  0, 20 * np.abs(17 / 40 - total_land_ratio))
+    land_ratio_penalty = np.where(total_land_ratio >= .75, land_ratio_penalty * 1000, land_ratio_penalty)
+
+    # Evaluate land color percentage (only colors present in both distributions are compared)
+    mana_symbol_penalty = np.where(mana_symbol_present & land_color_present,
+                                   np.abs(mana_symbol_pmf - land_color_pmf), 0).sum(axis=1)
+
+    # Evaluate color identity
+    deck_color_penalty = np.maximum(2 - dominant_mana_colors.sum(axis=1), 2) + splash_mana_colors.sum(axis=1)
+
+    # Evaluate card archetypes
+    bombs = archetype_counts[:, archetypes.index(Archetype.BOMB)]
+    removals = archetype_counts[:, archetypes.index(Archetype.REMOVAL)]
+    evasive_count = archetype_counts[:, archetypes.index(Archetype.EVASIVE)]
+    mana_fixing_count = archetype_counts[:, archetypes.index(Archetype.MANA_FIXING)]
+
+    archetype_penalty = np.where(bombs == 0, 10, 0)
+    archetype_penalty = archetype_penalty + 10 * np.maximum(2 - removals, 0)
+    archetype_penalty = archetype_penalty + 10 * np.maximum(2 - evasive_count, 0)
+    archetype_penalty = archetype_penalty + dud_count * 5
+    archetype_penalty = archetype_penalty + np.where(color_identity_size > 1,
+                                                     10 * np.maximum(2 * color_identity_size - mana_fixing_count, 0),
+                                                     0)
+
+    return DeckEvaluation(
+        number_of_cards_penalty=number_of_cards_penalty,
+        mana_curve_penalty=mana_curve_penalty,
+        land_ratio_penalty=land_ratio_penalty,
+        mana_symbol_penalty=mana_symbol_penalty,
+        deck_color_penalty=deck_color_penalty,
+        archetype_penalty=archetype_penalty,
+        castability_penalty=np.zeros_like(number_of_cards_penalty, dtype=float))
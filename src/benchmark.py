@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks for the hot paths of the deck optimizer
+
+To run the benchmarks, run::
+
+    cd src/
+    python3 benchmark.py --output benchmark_results.json
+
+Each benchmark reports operations per second (best of several repeats) and the peak memory allocated by a
+single call. Compare the JSON output of two runs to see the effect of a change.
+"""
+
+import csv
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import *
+
+from algorithm import CardId, Deck, SetId, SetInfo, basic_land_info, evaluate_deck, generate_booster_pack, \
+    parse_cards_csv, summarize_deck, zip_dict
+from asp_facts import generate_facts, write_facts
+from castability import CastabilityEvaluator
+from evaluation_cache import EvaluationCache
+from goldfish import simulate_goldfish
+
+# CSV columns
+(set_column, card_number_column,
+ rarity_column, cmc_column, rating_column, guild_column,
+ card_name_column, mana_cost_column, card_type_column) = range(9)
+archetype_columns = slice(9, 16)
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    operations_per_second: float
+    seconds_per_operation: float
+    peak_memory_bytes: int
+    parameters: Mapping[str, Any]
+
+
+def measure(name: str, operation: Callable[[], Any], minimum_seconds: float = 0.2, repeats: int = 5,
+            batch_size: int = 1, **parameters) -> BenchmarkResult:
+    """
+    Times an operation
+
+    :param name: The name of the benchmark
+    :param operation: The operation to time (called with no arguments)
+    :param minimum_seconds: Each repeat calls the operation enough times to take at least this long
+    :param repeats: The number of repeats (the fastest one is reported)
+    :param batch_size: The number of operations performed by each call of ``operation``
+    :param parameters: Describes the benchmark's inputs in the report
+    :return: The measurements
+    """
+    # Peak memory of one call
+    tracemalloc.start()
+    operation()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Calibrate the number of calls per repeat
+    number = 1
+    while True:
+        start_time = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed_seconds = time.perf_counter() - start_time
+        if elapsed_seconds >= minimum_seconds:
+            break
+        number *= 2 if elapsed_seconds <= 0 else max(2, int(minimum_seconds / elapsed_seconds * 1.2))
+
+    best_seconds = elapsed_seconds
+    for _ in range(repeats - 1):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            operation()
+        best_seconds = min(best_seconds, time.perf_counter() - start_time)
+
+    seconds_per_operation = best_seconds / (number * batch_size)
+    return BenchmarkResult(name=name, operations_per_second=1 / seconds_per_operation,
+                           seconds_per_operation=seconds_per_operation, peak_memory_bytes=peak_memory,
+                           parameters=parameters)
+
+
+def read_csv_rows(csv_path: Path) -> List[List[str]]:
+    with open(csv_path, newline='') as cards_file:
+        cards_csv = csv.reader(cards_file)
+        _ = next(cards_csv)  # Skip header row
+        return list(cards_csv)
+
+
+def synthesize_cards_csv(template_rows: Sequence[Sequence[str]], sets: int, cards_per_set: int,
+                         rng: random.Random) -> List[List[str]]:
+    """
+    Generates card rows which follow the distributions of real cards.
+    Rarities are drawn with the frequencies of the template; each card then copies the rules-related columns
+    (CMC, name, mana cost, type) of a random template card of that rarity and, independently, the rating, guild and
+    archetype columns of another template card of that rarity
+
+    :param template_rows: Real card rows (without the header)
+    :param sets: The number of sets to generate
+    :param cards_per_set: The number of cards per set
+    :param rng: The source of randomness
+    :return: The generated rows (without a header)
+    """
+    rows_by_rarity: DefaultDict[str, List[Sequence[str]]] = defaultdict(list)
+    for row in template_rows:
+        rows_by_rarity[row[rarity_column]].append(row)
+    template_rarities = [row[rarity_column] for row in template_rows]
+
+    rows: List[List[str]] = []
+    for set_index in range(sets):
+        set_id = f'S{set_index:03d}'
+        for card_number in range(1, cards_per_set + 1):
+            rarity = rng.choice(template_rarities)
+            rules_row = rng.choice(rows_by_rarity[rarity])
+            rating_row = rng.choice(rows_by_rarity[rarity])
+
+            row = list(rules_row)
+            row[set_column] = set_id
+            row[card_number_column] = str(card_number)
+            row[rating_column] = rating_row[rating_column]
+            row[guild_column] = rating_row[guild_column]
+            row[archetype_columns] = rating_row[archetype_columns]
+            rows.append(row)
+
+    return rows
+
+
+def random_decks(set_infos: Mapping[SetId, SetInfo], count: int, rng: random.Random) -> List[Deck]:
+    """
+    Generates plausible 40-card decks: 23 random cards of one set plus 17 basic lands
+    """
+    decks: List[Deck] = []
+    for _ in range(count):
+        set_id = rng.choice([set_id for set_id in set_infos.keys() if set_id is not None])
+        deck: DefaultDict[CardId, int] = defaultdict(int)
+        for card_number in rng.choices(tuple(set_infos[set_id].cards.keys()), k=23):
+            deck[set_id, card_number] += 1
+        for card_number in rng.choices(tuple(basic_land_info.cards.keys()), k=17):
+            deck[None, card_number] += 1
+        decks.append(deck)
+    return decks
+
+
+def run_benchmarks(csv_path: Path, synthetic_sets: Sequence[int], cards_per_set: int, minimum_seconds: float,
+                   seed: int) -> Iterator[BenchmarkResult]:
+    rng = random.Random(seed)
+    template_rows = read_csv_rows(csv_path)
+
+    # parse_cards_csv
+    yield measure('parse_cards_csv', lambda: parse_cards_csv(template_rows), minimum_seconds,
+                  csv=csv_path.name, cards=len(template_rows))
+    for sets in synthetic_sets:
+        rows = synthesize_cards_csv(template_rows, sets, cards_per_set, rng)
+        yield measure('parse_cards_csv', lambda: parse_cards_csv(rows), minimum_seconds,
+                      csv='synthetic', sets=sets, cards=len(rows))
+
+        # Facts for the whole catalog
+        catalog = dict(parse_cards_csv(rows))
+        yield measure('generate_facts', lambda: write_facts(io.StringIO(), generate_facts(catalog, (), catalog)),
+                      minimum_seconds, csv='synthetic', sets=sets, cards=len(rows))
+
+    set_infos = parse_cards_csv(template_rows)
+    set_infos.update({
+        None: basic_land_info,
+    })
+
+    # summarize_deck and evaluate_deck
+    decks = random_decks(set_infos, 100, rng)
+    summaries = [summarize_deck(deck, set_infos) for deck in decks]
+    yield measure('summarize_deck', lambda: [summarize_deck(deck, set_infos) for deck in decks], minimum_seconds,
+                  batch_size=len(decks), deck_size=40)
+    yield measure('evaluate_deck', lambda: [evaluate_deck(summary) for summary in summaries], minimum_seconds,
+                  batch_size=len(summaries))
+
+    # Memoized evaluation (every lookup hits)
+    cache = EvaluationCache(set_infos)
+    for deck in decks:
+        cache.evaluate(deck)
+    yield measure('EvaluationCache.evaluate', lambda: [cache.evaluate(deck) for deck in decks], minimum_seconds,
+                  batch_size=len(decks), deck_size=40, hit_rate=1.)
+
+    # Castability (probability tables and card requirements already memoized)
+    castability = CastabilityEvaluator(set_infos)
+    for deck in decks:
+        castability.penalty(deck)
+    yield measure('CastabilityEvaluator.penalty', lambda: [castability.penalty(deck) for deck in decks],
+                  minimum_seconds, batch_size=len(decks), deck_size=40)
+
+    # Goldfish simulation
+    yield measure('simulate_goldfish', lambda: simulate_goldfish(decks[0], set_infos, turns=8, simulations=1000),
+                  minimum_seconds, simulations=1000, turns=8, deck_size=40)
+
+    # generate_booster_pack
+    set_id = min(set_id for set_id in set_infos.keys() if set_id is not None)
+    yield measure('generate_booster_pack', lambda: tuple(generate_booster_pack(set_infos[set_id])),
+                  minimum_seconds, set=set_id)
+
+    # zip_dict
+    mana_symbol_pmf, land_color_pmf = summaries[0].mana_symbol_pmf, summaries[0].land_color_pmf
+    yield measure('zip_dict', lambda: [tuple(values) for _, values in zip_dict(mana_symbol_pmf, land_color_pmf)],
+                  minimum_seconds, keys=len(mana_symbol_pmf.keys() | land_color_pmf.keys()))
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(('git', 'rev-parse', 'HEAD'), capture_output=True, check=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the deck optimizer hot paths')
+    parser.add_argument('--cards', metavar='RATING', type=Path, default=Path('RNA.csv'),
+                        help='The ratings list to benchmark with and derive synthetic sets from '
+                             '(default: %(default)s)')
+    parser.add_argument('--synthetic-sets', metavar='N', type=int, nargs='*', default=[10, 50],
+                        help='Benchmark parsing synthetic CSVs with these numbers of sets (default: %(default)s)')
+    parser.add_argument('--cards-per-set', metavar='N', type=int, default=250,
+                        help='The number of cards in each synthetic set (default: %(default)s)')
+    parser.add_argument('--minimum-seconds', metavar='SECONDS', type=float, default=0.2,
+                        help='The minimum duration of each timed repeat (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seeds the synthetic data (default: %(default)s)')
+    parser.add_argument('--output', '-o', metavar='RESULTS_FILE', type=argparse.FileType('w'),
+                        help='Where to write the results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    for result in run_benchmarks(args.cards, args.synthetic_sets, args.cards_per_set, args.minimum_seconds,
+                                 args.seed):
+        parameters = ', '.join(f'{key}={value}' for key, value in result.parameters.items())
+        print(f'{result.name:<28} {result.operations_per_second:>12.1f} ops/s '
+              f'{result.peak_memory_bytes / 1024:>10.1f} KiB peak  ({parameters})')
+        results.append(result._asdict())
+
+    if args.output is not None:
+        with args.output as results_file:
+            json.dump({
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'git_revision': git_revision(),
+                'python': sys.version,
+                'platform': platform.platform(),
+                'results': results,
+            }, results_file, indent=2)
+            results_file.write('\n')
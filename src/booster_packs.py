@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""
+Batch booster pack generation
+
+Draws many booster packs at once with the same layout as :func:`algorithm.generate_booster_pack`
+(a foil slot, 10 or 9 commons, 3 uncommons and a rare or mythic rare weighted 7:1 per card).
+"""
+
+import copy
+from typing import *
+
+import numpy as np
+
+from algorithm import Rarity, SetInfo
+
+booster_pack_size = 14
+common_slots = 10
+uncommon_slots = 3
+
+# Roughly 1 in 7 packs has a foil in place of a common
+foil_chance = 1 / 7
+rare_weight = 7
+mythic_rare_weight = 1
+
+# Bounds the memory used for shuffling commons
+chunk_size = 1 << 15
+
+
+class BoosterPackGenerator:
+    """
+    Precomputes the rarity pools of a set once, then emits booster packs as rows of a NumPy array of card numbers.
+    The first ``common_slots`` columns are the foil slot followed by commons, then the uncommons, then the rare
+    """
+
+    def __init__(self, set_info: SetInfo, seed: Union[None, int, np.random.SeedSequence] = None):
+        self.all_cards = np.array(sorted(set_info.cards.keys()))
+        self.commons = np.array(sorted(set_info.rarities[Rarity.COMMON]))
+        self.uncommons = np.array(sorted(set_info.rarities[Rarity.UNCOMMON]))
+
+        rares = sorted(set_info.rarities[Rarity.RARE])
+        mythic_rares = sorted(set_info.rarities[Rarity.MYTHIC_RARE])
+        self.rares = np.array((*rares, *mythic_rares))
+        rare_weights = np.array((*(rare_weight,) * len(rares), *(mythic_rare_weight,) * len(mythic_rares)))
+        self.rare_cumulative_probabilities = np.cumsum(rare_weights) / rare_weights.sum()
+        self.rare_cumulative_probabilities[-1] = 1  # Guard against rounding
+
+        if len(self.commons) < common_slots:
+            raise ValueError(f'A booster pack needs at least {common_slots} distinct commons')
+
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+
+    def spawn(self, streams: int) -> List['BoosterPackGenerator']:
+        """
+        Creates independent generators over the same set, e.g. one per worker process.
+        The streams are determined by this generator's seed, so they are reproducible
+
+        :param streams: The number of generators
+        :return: The generators
+        """
+        generators = []
+        for seed_sequence in self.seed_sequence.spawn(streams):
+            generator = copy.copy(self)
+            generator.seed_sequence = seed_sequence
+            generator.rng = np.random.default_rng(seed_sequence)
+            generators.append(generator)
+        return generators
+
+    def generate(self, count: int) -> np.ndarray:
+        """
+        :param count: The number of booster packs
+        :return: An array of shape ``(count, 14)`` holding the card numbers of each pack
+        """
+        packs = np.empty((count, booster_pack_size), dtype=self.all_cards.dtype)
+        for start in range(0, count, chunk_size):
+            self._generate_into(packs[start:start + chunk_size])
+        return packs
+
+    def _generate_into(self, packs: np.ndarray):
+        count = len(packs)
+        rng = self.rng
+
+        # Commons (distinct within a pack): the smallest random keys pick a random subset
+        common_keys = rng.random((count, len(self.commons)))
+        common_indices = np.argpartition(common_keys, common_slots - 1, axis=1)[:, :common_slots]
+        packs[:, :common_slots] = self.commons[common_indices]
+
+        # Foil (any card) in place of the first common
+        foils = rng.random(count) < foil_chance
+        packs[foils, 0] = rng.choice(self.all_cards, size=int(foils.sum()))
+
+        # Uncommons (repetition allowed)
+        packs[:, common_slots:common_slots + uncommon_slots] = rng.choice(self.uncommons,
+                                                                          size=(count, uncommon_slots))
+
+        # Rare or mythic rare
+        rare_indices = np.searchsorted(self.rare_cumulative_probabilities, rng.random(count), side='right')
+        packs[:, common_slots + uncommon_slots] = self.rares[rare_indices]
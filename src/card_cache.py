@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Compiled card database cache
+
+Stores the result of :func:`algorithm.parse_cards_csv` in a binary file next to the CSV so that later runs can skip
+parsing. The cache is keyed by a hash of the CSV's contents and is rebuilt automatically whenever the CSV changes.
+"""
+
+import csv
+import hashlib
+import io
+import logging
+import pickle
+import struct
+from pathlib import Path
+from typing import *
+
+from algorithm import SetId, SetInfo, parse_cards_csv
+from atomic_file import atomic_write
+
+cache_magic = b'MTGCARDS'
+# Increment whenever the layout of SetInfo (or anything it contains) changes
+cache_format_version = 3
+
+# Magic, format version, SHA-256 of the CSV
+cache_header = struct.Struct(f'<{len(cache_magic)}sH32s')
+
+
+def default_cache_path(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.name + '.cache')
+
+
+def read_cache(cache_path: Path, csv_digest: bytes) -> Optional[Dict[SetId, SetInfo]]:
+    """
+    Loads a compiled card database if it is current
+
+    :param cache_path: The cache file
+    :param csv_digest: The SHA-256 of the CSV the cache must have been compiled from
+    :return: The set infos, or None if the cache is missing, stale or from another format version
+    """
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            magic, version, digest = cache_header.unpack(cache_file.read(cache_header.size))
+            if (magic, version, digest) != (cache_magic, cache_format_version, csv_digest):
+                return None
+            return pickle.load(cache_file)
+
+    except (OSError, struct.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as error:
+        logging.debug('Ignoring card cache "%s": %s', cache_path, error)
+        return None
+
+
+def write_cache(cache_path: Path, csv_digest: bytes, set_infos: Mapping[SetId, SetInfo]):
+    """
+    Atomically writes a compiled card database
+
+    :param cache_path: The cache file
+    :param csv_digest: The SHA-256 of the CSV the set infos were parsed from
+    :param set_infos: The parsed set infos
+    """
+    with atomic_write(cache_path, 'wb') as cache_file:
+        cache_file.write(cache_header.pack(cache_magic, cache_format_version, csv_digest))
+        pickle.dump(dict(set_infos), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_cards_csv(csv_path: Path, cache_path: Optional[Path] = None, use_cache: bool = True) \
+        -> Dict[SetId, SetInfo]:
+    """
+    Like :func:`algorithm.parse_cards_csv` on a CSV file with a header row,
+    except that the result is loaded from a compiled cache when the CSV has not changed
+
+    :param csv_path: The ratings list
+    :param cache_path: Where to store the compiled cache (defaults to next to the CSV)
+    :param use_cache: Whether to read and write the cache at all
+    :return: The populated data structures
+    """
+    csv_path = Path(csv_path)
+    csv_bytes = csv_path.read_bytes()
+
+    if use_cache:
+        cache_path = default_cache_path(csv_path) if cache_path is None else Path(cache_path)
+        csv_digest = hashlib.sha256(csv_bytes).digest()
+        set_infos = read_cache(cache_path, csv_digest)
+        if set_infos is not None:
+            return set_infos
+
+    with io.StringIO(csv_bytes.decode('utf-8'), newline='') as cards_file:
+        cards_csv: Iterator[List[str]] = csv.reader(cards_file)
+        _ = next(cards_csv)  # Skip header row
+        # parse_cards_csv returns a defaultdict with an unpicklable default factory
+        set_infos = dict(parse_cards_csv(cards_csv))
+
+    if use_cache:
+        try:
+            write_cache(cache_path, csv_digest, set_infos)
+        except OSError as error:
+            logging.warning('Could not write card cache "%s": %s', cache_path, error)
+
+    return set_infos
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+"""
+Downloaded card database converter
+
+Converts the YAML database written by ``download_card_database.py`` into :class:`algorithm.SetInfo` structures.
+The YAML is read as a stream of parser events and only one card entry is built at a time, so memory use does not
+grow with the size of the file. Land colors, creature power and toughness and keywords come from the download;
+ratings, guilds and archetypes are joined in from a ratings list (in the format of :func:`algorithm.parse_cards_csv`)
+by set and card number.
+"""
+
+import csv
+import logging
+from decimal import Decimal
+from pathlib import Path
+from typing import *
+from urllib.parse import urlparse
+
+from yaml import MappingEndEvent, MappingStartEvent, SafeLoader, StreamEndEvent
+
+from algorithm import Archetype, Card, CardFace, CardId, CardNumber, CardType, Creature, Guild, Keyword, Land, \
+    ManaColor, Rarity, SetId, SetInfo, add_card, create_set_info, parse_card_type, parse_mana_cost
+
+# Cards missing from the ratings list are loaded with this rating (the middle of the 0 to 5 scale)
+unrated_rating = Decimal('2.5')
+
+# The MTG API spells out rarities which the ratings lists abbreviate
+api_rarities: Mapping[str, Rarity] = {
+    'Common': Rarity.COMMON,
+    'Uncommon': Rarity.UNCOMMON,
+    'Rare': Rarity.RARE,
+    'Mythic': Rarity.MYTHIC_RARE,
+    'Mythic Rare': Rarity.MYTHIC_RARE,
+}
+
+# A card with the type info of each of its faces
+StoredCard = Tuple[CardNumber, Card, Sequence[Optional[NamedTuple]]]
+
+
+class CardRating(NamedTuple):
+    rating: Decimal
+    guild: Optional[Guild]
+    archetypes: AbstractSet[Archetype]
+
+
+def load_ratings(csv_path: Path) -> Dict[CardId, CardRating]:
+    """
+    Reads the ratings, guilds and archetypes of a ratings list (the other columns are ignored)
+
+    :param csv_path: The ratings list, with a header row
+    :return: The rating of each card
+    """
+    ratings: Dict[CardId, CardRating] = {}
+    with open(csv_path, newline='') as cards_file:
+        cards_csv: Iterator[List[str]] = csv.reader(cards_file)
+        _ = next(cards_csv)  # Skip header row
+        for card_set, card_number, _, _, rating, guild, _, _, _, *archetype_flags, _ in cards_csv:
+            try:
+                guild: Optional[Guild] = Guild(guild)
+            except ValueError:
+                guild = None
+
+            ratings[card_set, int(card_number)] = CardRating(
+                rating=Decimal(rating),
+                guild=guild,
+                # In the definition order of the Archetype Enum
+                archetypes={archetype for flag, archetype in zip(archetype_flags, Archetype) if flag == '1'},
+            )
+    return ratings
+
+
+def card_from_entry(card_number: CardNumber, entry: Mapping[str, Any],
+                    rating: Optional[CardRating] = None) -> StoredCard:
+    """
+    Converts an entry of the downloaded YAML database (see ``download_card_database.generate_card_entry``)
+
+    :param card_number: The card's number in its set
+    :param entry: The card's entry
+    :param rating: The card's rating, guild and archetypes (if rated)
+    :return: The card and the type info of its face
+    """
+    card_type = parse_card_type(entry['Type'])
+    face = CardFace(name=entry['Name'], mana_cost=parse_mana_cost(entry.get('Mana cost') or ''), type=card_type)
+
+    type_info: Optional[NamedTuple] = None
+    if card_type == CardType.LAND:
+        type_info = Land(possible_colors={ManaColor(color) for color in entry.get('Land colors') or ()})
+    elif card_type == CardType.CREATURE:
+        type_info = Creature(power=entry.get('Creature power', 0), toughness=entry.get('Creature toughness', 0),
+                             keywords={Keyword[keyword.upper().replace(' ', '_')]
+                                       for keyword in entry.get('Keywords') or ()})
+
+    image_url = entry.get('Image URL')
+    card = Card(faces=(face,),
+                converted_mana_cost=entry['CMC'],
+                rarity=api_rarities[entry['Rarity']],
+                rating=rating.rating if rating is not None else unrated_rating,
+                guild=rating.guild if rating is not None else None,
+                image_url=urlparse(image_url) if image_url is not None else None,
+                archetypes=set(rating.archetypes) if rating is not None else set())
+    return card_number, card, (type_info,)
+
+
+def iter_card_db(card_db_file: TextIO) -> Iterator[Tuple[str, CardNumber, Dict[str, Any]]]:
+    """
+    Streams the card entries of a downloaded database, building one entry at a time
+
+    :param card_db_file: The YAML database (``{set code: {'Cards': {card number: entry}}}``)
+    :return: The set code, card number and entry of each card, in file order
+    """
+    loader = SafeLoader(card_db_file)
+    try:
+        def construct_next():
+            # construct_document also forgets the objects constructed so far
+            return loader.construct_document(loader.compose_node(None, None))
+
+        def skip_next():
+            loader.compose_node(None, None)
+
+        loader.get_event()  # Stream start
+        if loader.check_event(StreamEndEvent):
+            return
+        loader.get_event()  # Document start
+        if not loader.check_event(MappingStartEvent):
+            skip_next()  # An empty database
+            return
+
+        loader.get_event()  # Sets
+        while not loader.check_event(MappingEndEvent):
+            set_code = str(construct_next())
+            if not loader.check_event(MappingStartEvent):
+                skip_next()
+                continue
+
+            loader.get_event()  # Set entry
+            while not loader.check_event(MappingEndEvent):
+                key = construct_next()
+                if key != 'Cards' or not loader.check_event(MappingStartEvent):
+                    skip_next()
+                    continue
+
+                loader.get_event()  # Cards
+                while not loader.check_event(MappingEndEvent):
+                    card_number = int(construct_next())
+                    yield set_code, card_number, construct_next()
+                loader.get_event()
+            loader.get_event()
+
+    finally:
+        loader.dispose()
+
+
+def convert_cards(entries: Iterable[Tuple[str, CardNumber, Mapping[str, Any]]],
+                  ratings: Mapping[CardId, CardRating]) -> Iterator[Tuple[SetId, StoredCard]]:
+    """
+    Converts downloaded card entries one at a time (cards with an unknown rarity or type are skipped)
+
+    :param entries: (set code, card number, entry) triples, as streamed by :func:`iter_card_db`
+    :param ratings: The rating of each card; unrated cards get ``unrated_rating``
+    :return: The set code and the converted card
+    """
+    for set_code, card_number, entry in entries:
+        rating = ratings.get((set_code, card_number))
+        if rating is None:
+            logging.debug('No rating for card %d of set "%s"', card_number, set_code)
+        try:
+            yield set_code, card_from_entry(card_number, entry, rating)
+        except (KeyError, ValueError) as error:
+            logging.warning('Skipping card %d of set "%s": %s', card_number, set_code, error)
+
+
+def convert_card_db(card_db_file: TextIO, ratings: Mapping[CardId, CardRating]) -> Dict[SetId, SetInfo]:
+    """
+    Like :func:`algorithm.parse_cards_csv`, but for a downloaded database joined with ratings
+
+    :param card_db_file: The YAML database
+    :param ratings: The rating of each card (see :func:`load_ratings`)
+    :return: The populated data structures
+    """
+    set_infos: Dict[SetId, SetInfo] = {}
+    for set_code, (card_number, card, type_infos) in convert_cards(iter_card_db(card_db_file), ratings):
+        try:
+            set_info = set_infos[set_code]
+        except KeyError:
+            set_info = set_infos[set_code] = create_set_info()
+        add_card(set_info, card_number, card, type_infos)
+    return set_infos
+
+
+if __name__ == '__main__':
+    import argparse
+    from itertools import groupby
+
+    from card_store import CardStore
+
+    parser = argparse.ArgumentParser(description='Convert a downloaded card database into a card store')
+    parser.add_argument('card_db', metavar='DATABASE_FILE', type=Path,
+                        help='The YAML database written by download_card_database.py')
+    parser.add_argument('store', metavar='STORE_FILE', type=Path,
+                        help='The SQLite card store to write the sets to (created if missing)')
+    parser.add_argument('--ratings', metavar='RATING', type=Path, action='append', default=[],
+                        help='Ratings lists to join in (cards missing from them are unrated)')
+    args = parser.parse_args()
+
+    card_ratings: Dict[CardId, CardRating] = {}
+    for ratings_path in args.ratings:
+        card_ratings.update(load_ratings(ratings_path))
+
+    with open(args.card_db) as in_file, CardStore(args.store) as store:
+        # The cards of a set are contiguous in the file, so each set is written as it streams past
+        for mtg_set, set_cards in groupby(convert_cards(iter_card_db(in_file), card_ratings),
+                                          key=lambda item: item[0]):
+            card_count = store.upsert_set(mtg_set, (stored_card for _, stored_card in set_cards))
+            print(f'{mtg_set}: {card_count} cards')
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+"""
+SQLite card store
+
+Keeps the card database in an indexed SQLite file so that one set can be read or replaced without parsing the
+whole catalog. Sets are loaded into the same :class:`algorithm.SetInfo` structures :func:`algorithm.parse_cards_csv`
+builds, streaming rows from the database one card at a time.
+
+Cards can be imported from a ratings list (CSV) or from the YAML database written by ``download_card_database.py``
+(which has no ratings, guilds or archetypes).
+"""
+
+import csv
+import logging
+import sqlite3
+from decimal import Decimal
+from itertools import groupby
+from pathlib import Path
+from typing import *
+from urllib.parse import urlparse
+
+from algorithm import Archetype, Card, CardFace, CardNumber, CardType, Count, Creature, Guild, Keyword, Land, \
+    ManaColor, Rarity, SetId, SetInfo, add_card, create_set_info, get_card_type_infos, parse_cards_csv
+from card_db_converter import StoredCard, card_from_entry, unrated_rating
+
+schema = '''
+CREATE TABLE IF NOT EXISTS sets (
+    set_id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS cards (
+    set_id INTEGER NOT NULL REFERENCES sets ON DELETE CASCADE,
+    card_number INTEGER NOT NULL,
+    rarity TEXT NOT NULL,
+    converted_mana_cost INTEGER NOT NULL,
+    rating TEXT,  -- Decimal as text; NULL is loaded as unrated_rating
+    guild TEXT,
+    image_url TEXT,
+    PRIMARY KEY (set_id, card_number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS faces (
+    set_id INTEGER NOT NULL,
+    card_number INTEGER NOT NULL,
+    face_index INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    land_colors TEXT,  -- Comma-separated ManaColor names
+    power INTEGER,
+    toughness INTEGER,
+    keywords TEXT,  -- Comma-separated Keyword names
+    PRIMARY KEY (set_id, card_number, face_index),
+    FOREIGN KEY (set_id, card_number) REFERENCES cards ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS mana_symbols (
+    set_id INTEGER NOT NULL,
+    card_number INTEGER NOT NULL,
+    face_index INTEGER NOT NULL,
+    colors TEXT NOT NULL,  -- Comma-separated ManaColor names (two for split mana)
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (set_id, card_number, face_index, colors),
+    FOREIGN KEY (set_id, card_number, face_index) REFERENCES faces ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS archetypes (
+    set_id INTEGER NOT NULL,
+    card_number INTEGER NOT NULL,
+    archetype TEXT NOT NULL,
+    PRIMARY KEY (set_id, card_number, archetype),
+    FOREIGN KEY (set_id, card_number) REFERENCES cards ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS faces_by_name ON faces (name);
+'''
+
+
+def _join_names(enums: Iterable[Any]) -> str:
+    return ','.join(sorted(enum.name for enum in enums))
+
+
+def _split_names(enum_type: type, names: Optional[str]) -> Set[Any]:
+    return {enum_type[name] for name in names.split(',')} if names else set()
+
+
+class CardStore:
+    """
+    An SQLite database of cards
+    """
+
+    def __init__(self, database_path: Union[str, Path] = ':memory:'):
+        self.connection = sqlite3.connect(str(database_path))
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(schema)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> 'CardStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def set_codes(self) -> List[str]:
+        return [code for code, in self.connection.execute('SELECT code FROM sets ORDER BY code')]
+
+    def _set_id(self, set_code: str) -> int:
+        self.connection.execute('INSERT OR IGNORE INTO sets (code) VALUES (?)', (set_code,))
+        set_id, = self.connection.execute('SELECT set_id FROM sets WHERE code = ?', (set_code,)).fetchone()
+        return set_id
+
+    def upsert_set(self, set_code: str, cards: Iterable[StoredCard], replace: bool = True) -> int:
+        """
+        Writes the cards of a set in one transaction
+
+        :param set_code: The set
+        :param cards: The cards (consumed lazily)
+        :param replace: Whether to delete the set's other cards first (otherwise cards are inserted or updated)
+        :return: The number of cards written
+        """
+        with self.connection:
+            set_id = self._set_id(set_code)
+            if replace:
+                self.connection.execute('DELETE FROM cards WHERE set_id = ?', (set_id,))
+            return self._insert_cards(set_id, cards)
+
+    def _insert_cards(self, set_id: int, cards: Iterable[StoredCard]) -> int:
+        card_rows, face_rows, mana_symbol_rows, archetype_rows = [], [], [], []
+        count = 0
+
+        def flush():
+            # Deleting a card cascades to its faces, mana symbols and archetypes
+            self.connection.executemany('DELETE FROM cards WHERE set_id = ? AND card_number = ?',
+                                        (card_row[:2] for card_row in card_rows))
+            self.connection.executemany('INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)', card_rows)
+            self.connection.executemany('INSERT INTO faces VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', face_rows)
+            self.connection.executemany('INSERT INTO mana_symbols VALUES (?, ?, ?, ?, ?)', mana_symbol_rows)
+            self.connection.executemany('INSERT INTO archetypes VALUES (?, ?, ?)', archetype_rows)
+            for rows in (card_rows, face_rows, mana_symbol_rows, archetype_rows):
+                rows.clear()
+
+        for card_number, card, type_infos in cards:
+            card_rows.append((set_id, card_number, card.rarity.value, card.converted_mana_cost,
+                              None if card.rating is None else str(card.rating),
+                              None if card.guild is None else card.guild.value,
+                              None if card.image_url is None else card.image_url.geturl()))
+
+            for face_index, face in enumerate(card.faces):
+                type_info = type_infos[face_index] if face_index < len(type_infos) else None
+                land_colors = _join_names(type_info.possible_colors) if isinstance(type_info, Land) else None
+                power, toughness, keywords = (type_info.power, type_info.toughness,
+                                              _join_names(type_info.keywords)) \
+                    if isinstance(type_info, Creature) else (None, None, None)
+                face_rows.append((set_id, card_number, face_index, face.name, face.type.value, land_colors, power,
+                                  toughness, keywords))
+
+                for mana_colors, mana_quantity in face.mana_cost.items():
+                    mana_symbol_rows.append((set_id, card_number, face_index, _join_names(mana_colors),
+                                             mana_quantity))
+
+            for archetype in card.archetypes:
+                archetype_rows.append((set_id, card_number, archetype.name))
+
+            count += 1
+            if len(card_rows) >= 1000:
+                flush()
+
+        flush()
+        return count
+
+    def import_set_infos(self, set_infos: Mapping[SetId, SetInfo]):
+        """
+        Imports sets parsed by :func:`algorithm.parse_cards_csv` (each set replaces any stored set of that code)
+        """
+        for set_code, set_info in set_infos.items():
+            if set_code is None:
+                continue  # Basic lands are built in
+
+            def stored_cards() -> Iterator[StoredCard]:
+                for card_number, card in set_info.cards.items():
+                    yield card_number, card, get_card_type_infos(set_info, card_number)
+
+            self.upsert_set(set_code, stored_cards())
+
+    def import_csv(self, csv_path: Path):
+        """
+        Imports a ratings list (in the format of :func:`algorithm.parse_cards_csv`, with a header row)
+        """
+        with open(csv_path, newline='') as cards_file:
+            cards_csv: Iterator[List[str]] = csv.reader(cards_file)
+            _ = next(cards_csv)  # Skip header row
+            self.import_set_infos(parse_cards_csv(cards_csv))
+
+    def import_card_db(self, card_db: Mapping[str, Any]):
+        """
+        Imports the contents of the YAML database written by ``download_card_database.py``
+        (cards with an unknown rarity or type are skipped)
+        """
+        for set_code, set_entry in card_db.items():
+            def stored_cards() -> Iterator[StoredCard]:
+                for card_number, entry in set_entry['Cards'].items():
+                    try:
+                        yield card_from_entry(int(card_number), entry)
+                    except (KeyError, ValueError) as error:
+                        logging.warning('Skipping card %s of set "%s": %s', card_number, set_code, error)
+
+            self.upsert_set(str(set_code), stored_cards())
+
+    def iter_cards(self, set_code: str) -> Iterator[StoredCard]:
+        """
+        Streams the cards of a set in card number order
+
+        :param set_code: The set
+        :return: Each card with the type info of its faces
+        """
+        key = 'set_id = (SELECT set_id FROM sets WHERE code = ?)'
+        order = 'ORDER BY card_number'
+        card_rows = self.connection.execute(
+            f'SELECT card_number, rarity, converted_mana_cost, rating, guild, image_url FROM cards '
+            f'WHERE {key} {order}', (set_code,))
+        face_groups = groupby(self.connection.execute(
+            f'SELECT card_number, face_index, name, type, land_colors, power, toughness, keywords FROM faces '
+            f'WHERE {key} {order}, face_index', (set_code,)), key=lambda row: row[0])
+        mana_symbol_groups = groupby(self.connection.execute(
+            f'SELECT card_number, face_index, colors, quantity FROM mana_symbols WHERE {key} {order}, face_index',
+            (set_code,)), key=lambda row: row[0])
+        archetype_groups = groupby(self.connection.execute(
+            f'SELECT card_number, archetype FROM archetypes WHERE {key} {order}', (set_code,)),
+            key=lambda row: row[0])
+
+        # Merge the ordered rows of each table
+        groups = [face_groups, mana_symbol_groups, archetype_groups]
+        pending: List[Optional[Tuple[CardNumber, Iterator[Tuple]]]] = [next(group, None) for group in groups]
+
+        def rows_of(table_index: int, card_number: CardNumber) -> List[Tuple]:
+            group = pending[table_index]
+            if group is None or group[0] != card_number:
+                return []
+            rows = list(group[1])  # Before advancing, which invalidates the group
+            pending[table_index] = next(groups[table_index], None)
+            return rows
+
+        for card_number, rarity, converted_mana_cost, rating, guild, image_url in card_rows:
+            face_rows = rows_of(0, card_number)
+            mana_symbol_rows = rows_of(1, card_number)
+            archetype_rows = rows_of(2, card_number)
+
+            mana_costs: Dict[int, Dict[FrozenSet[ManaColor], Count]] = {}
+            for _, face_index, colors, quantity in mana_symbol_rows:
+                mana_costs.setdefault(face_index, {})[frozenset(_split_names(ManaColor, colors))] = quantity
+
+            faces, type_infos = [], []
+            for _, face_index, name, card_type, land_colors, power, toughness, keywords in face_rows:
+                card_type = CardType(card_type)
+                faces.append(CardFace(name=name, mana_cost=mana_costs.get(face_index, {}), type=card_type))
+                if card_type == CardType.LAND and land_colors is not None:
+                    type_infos.append(Land(possible_colors=_split_names(ManaColor, land_colors)))
+                elif card_type == CardType.CREATURE and power is not None:
+                    type_infos.append(Creature(power=power, toughness=toughness,
+                                               keywords=_split_names(Keyword, keywords)))
+                else:
+                    type_infos.append(None)
+
+            card = Card(faces=faces,
+                        converted_mana_cost=converted_mana_cost,
+                        rarity=Rarity(rarity),
+                        rating=Decimal(rating) if rating is not None else unrated_rating,
+                        guild=Guild(guild) if guild is not None else None,
+                        image_url=urlparse(image_url) if image_url is not None else None,
+                        archetypes={Archetype[archetype] for _, archetype in archetype_rows})
+            yield card_number, card, type_infos
+
+    def load_set_info(self, set_code: str) -> SetInfo:
+        """
+        :param set_code: The set
+        :return: The set, as :func:`algorithm.parse_cards_csv` would build it
+        """
+        set_info = create_set_info()
+        for card_number, card, type_infos in self.iter_cards(set_code):
+            add_card(set_info, card_number, card, type_infos)
+        return set_info
+
+    def load_set_infos(self, set_codes: Optional[Iterable[str]] = None) -> Dict[SetId, SetInfo]:
+        """
+        :param set_codes: The sets to load (defaults to every set)
+        :return: The sets, as :func:`algorithm.parse_cards_csv` would build them
+        """
+        return {set_code: self.load_set_info(set_code)
+                for set_code in (self.set_codes() if set_codes is None else set_codes)}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from yaml import safe_load
+
+    parser = argparse.ArgumentParser(description='Import cards into an SQLite card store')
+    parser.add_argument('store', metavar='STORE_FILE', type=Path,
+                        help='The SQLite database (created if missing)')
+    parser.add_argument('--csv', metavar='RATING', type=Path, action='append', default=[],
+                        help='Import a ratings list')
+    parser.add_argument('--card-db', metavar='DATABASE_FILE', type=Path, action='append', default=[],
+                        help='Import a YAML database written by download_card_database.py')
+    args = parser.parse_args()
+
+    with CardStore(args.store) as store:
+        for csv_path in args.csv:
+            store.import_csv(csv_path)
+        for card_db_path in args.card_db:
+            with open(card_db_path) as card_db_file:
+                store.import_card_db(safe_load(card_db_file) or {})
+
+        for set_code in store.set_codes():
+            card_count, = store.connection.execute(
+                'SELECT COUNT(*) FROM cards JOIN sets USING (set_id) WHERE code = ?', (set_code,)).fetchone()
+            print(f'{set_code}: {card_count} cards')
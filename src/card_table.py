@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+"""
+Columnar card storage
+
+A :class:`CardTable` stores the cards of a set in typed arrays (one entry per card or per face) instead of one
+:class:`algorithm.Card` per card. It is a ``Mapping[CardNumber, Card]``, so it can replace ``SetInfo.cards``:
+looking up a card returns a :class:`CardView` that reads the arrays on demand.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left
+from decimal import Decimal
+from typing import *
+from urllib.parse import ParseResult, urlparse
+
+from algorithm import Archetype, Card, CardFace, CardNumber, CardType, Count, Guild, ManaColor, Rarity, SetId, \
+    SetInfo
+
+# Code tables for the enum columns
+rarities: Tuple[Rarity, ...] = tuple(Rarity)
+guilds: Tuple[Guild, ...] = tuple(Guild)
+archetypes: Tuple[Archetype, ...] = tuple(Archetype)
+card_types: Tuple[CardType, ...] = tuple(CardType)
+
+no_guild = -1
+
+# Ratings are stored in hundredths
+rating_scale = 100
+
+ManaCost = Mapping[FrozenSet[ManaColor], Count]
+
+
+class CardTable(Mapping[CardNumber, Card]):
+    """
+    The cards of one set, stored column by column.
+    Rows are sorted by card number; the faces of row ``i`` are ``face_offsets[i]:face_offsets[i + 1]``.
+    Mana costs are interned, so every face with the same cost shares one mapping (do not mutate it)
+    """
+
+    def __init__(self, cards: Mapping[CardNumber, Card]):
+        self.card_numbers = array('l')
+        self.converted_mana_costs = array('H')
+        self.rarities = array('B')
+        self.ratings = array('l')
+        self.guilds = array('b')
+        self.archetypes = array('B')
+        self.face_offsets = array('L', [0])
+        self.image_urls: List[Optional[str]] = []
+
+        self.face_names: List[str] = []
+        self.face_types = array('B')
+        self.face_mana_costs = array('H')
+
+        self.mana_costs: List[ManaCost] = []
+        mana_cost_indices: Dict[FrozenSet[Tuple[FrozenSet[ManaColor], Count]], int] = {}
+
+        for card_number in sorted(cards.keys()):
+            card = cards[card_number]
+
+            rating = card.rating * rating_scale
+            if rating != int(rating):
+                raise ValueError(f'Card {card_number} has a rating ({card.rating}) with more than two decimal places')
+
+            self.card_numbers.append(card_number)
+            self.converted_mana_costs.append(card.converted_mana_cost)
+            self.rarities.append(rarities.index(card.rarity))
+            self.ratings.append(int(rating))
+            self.guilds.append(no_guild if card.guild is None else guilds.index(card.guild))
+            self.archetypes.append(sum(1 << archetypes.index(archetype) for archetype in card.archetypes))
+            self.image_urls.append(None if card.image_url is None else sys.intern(card.image_url.geturl()))
+
+            for face in card.faces:
+                mana_cost_key = frozenset(face.mana_cost.items())
+                try:
+                    mana_cost_index = mana_cost_indices[mana_cost_key]
+                except KeyError:
+                    mana_cost_index = mana_cost_indices[mana_cost_key] = len(self.mana_costs)
+                    self.mana_costs.append(dict(face.mana_cost))
+
+                self.face_names.append(sys.intern(face.name))
+                self.face_types.append(card_types.index(face.type))
+                self.face_mana_costs.append(mana_cost_index)
+
+            self.face_offsets.append(len(self.face_names))
+
+        # Decimals are shared between cards of the same rating
+        self._decimal_ratings: Dict[int, Decimal] = {}
+        # Faces are built the first time a card is looked at, then shared by every view of the card
+        self._faces: List[Optional[Tuple[CardFace, ...]]] = [None] * len(self.card_numbers)
+
+    def row(self, card_number: CardNumber) -> int:
+        """
+        :param card_number: The card to find
+        :return: The index of the card's entry in the card columns
+        """
+        row = bisect_left(self.card_numbers, card_number)
+        if row == len(self.card_numbers) or self.card_numbers[row] != card_number:
+            raise KeyError(card_number)
+        return row
+
+    def rating(self, row: int) -> Decimal:
+        fixed_point_rating = self.ratings[row]
+        try:
+            return self._decimal_ratings[fixed_point_rating]
+        except KeyError:
+            rating = self._decimal_ratings[fixed_point_rating] = \
+                (Decimal(fixed_point_rating) / rating_scale).normalize()
+            return rating
+
+    def faces(self, row: int) -> Tuple[CardFace, ...]:
+        faces = self._faces[row]
+        if faces is None:
+            faces = self._faces[row] = tuple(CardFace(name=self.face_names[face],
+                                                      mana_cost=self.mana_costs[self.face_mana_costs[face]],
+                                                      type=card_types[self.face_types[face]])
+                                             for face in range(self.face_offsets[row], self.face_offsets[row + 1]))
+        return faces
+
+    def __getitem__(self, card_number: CardNumber) -> 'CardView':
+        return CardView(self, self.row(card_number))
+
+    def __iter__(self) -> Iterator[CardNumber]:
+        return iter(self.card_numbers)
+
+    def __len__(self) -> int:
+        return len(self.card_numbers)
+
+    def __contains__(self, card_number: object) -> bool:
+        try:
+            self.row(card_number)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+
+class CardView:
+    """
+    Read-only access to one row of a :class:`CardTable` with the same attributes as :class:`algorithm.Card`
+    """
+
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table: CardTable, row: int):
+        self.table = table
+        self.row = row
+
+    @property
+    def faces(self) -> Sequence[CardFace]:
+        return self.table.faces(self.row)
+
+    @property
+    def converted_mana_cost(self) -> int:
+        return self.table.converted_mana_costs[self.row]
+
+    @property
+    def rarity(self) -> Rarity:
+        return rarities[self.table.rarities[self.row]]
+
+    @property
+    def rating(self) -> Decimal:
+        return self.table.rating(self.row)
+
+    @property
+    def guild(self) -> Optional[Guild]:
+        guild = self.table.guilds[self.row]
+        return None if guild == no_guild else guilds[guild]
+
+    @property
+    def image_url(self) -> Optional[ParseResult]:
+        image_url = self.table.image_urls[self.row]
+        return None if image_url is None else urlparse(image_url)
+
+    @property
+    def archetypes(self) -> AbstractSet[Archetype]:
+        archetype_mask = self.table.archetypes[self.row]
+        return frozenset(archetype for bit, archetype in enumerate(archetypes) if archetype_mask & (1 << bit))
+
+    def to_card(self) -> Card:
+        """
+        :return: A standalone copy of this card
+        """
+        return Card(faces=self.faces, converted_mana_cost=self.converted_mana_cost, rarity=self.rarity,
+                    rating=self.rating, guild=self.guild, image_url=self.image_url, archetypes=self.archetypes)
+
+    def __repr__(self) -> str:
+        return f'CardView({self.to_card()!r})'
+
+
+def compact_set_info(set_info: SetInfo) -> SetInfo:
+    """
+    :param set_info: A set whose cards are stored as :class:`algorithm.Card` objects
+    :return: The same set with its cards stored in a :class:`CardTable`
+    """
+    if isinstance(set_info.cards, CardTable):
+        return set_info
+    return set_info._replace(cards=CardTable(set_info.cards))
+
+
+def compact_set_infos(set_infos: Mapping[SetId, SetInfo]) -> Dict[SetId, SetInfo]:
+    return {set_id: compact_set_info(set_info) for set_id, set_info in set_infos.items()}
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+"""
+Castability
+
+Penalizes decks which cannot cast their spells on curve. For every colored requirement of a card face's mana cost
+(such as the {R}{R} of {2}{R}{R}), the probability of having drawn enough lands producing that color by the turn
+matching the face's mana value is the hypergeometric tail probability
+
+    P(at least ``needed`` sources among ``7 + turn - 1`` cards drawn from a deck with ``sources`` such lands)
+
+computed exactly and memoized per (deck size, sources, draws). A card counts as castable on curve with the
+probability of its least likely requirement (of its best face), and the penalty is the expected number of spells
+which are not.
+"""
+
+import math
+from functools import lru_cache
+from typing import *
+
+from algorithm import CardFace, CardId, Count, Deck, DeckEvaluation, ManaColor, SetId, SetInfo, evaluate_deck, \
+    summarize_deck
+
+# Cards in the opening hand (the first turn draws nothing when on the play)
+opening_hand_size = 7
+
+
+class FaceRequirements(NamedTuple):
+    turn: int
+    # The colors which satisfy each requirement, and how many such sources are needed
+    requirements: Sequence[Tuple[FrozenSet[ManaColor], Count]]
+
+
+@lru_cache(maxsize=None)
+def hypergeometric_tail(population: int, successes: int, draws: int) -> Tuple[float, ...]:
+    """
+    :param population: The deck size
+    :param successes: The sources in the deck
+    :param draws: The cards drawn
+    :return: The probability of drawing at least k sources, for k from 0 to the most that can be drawn
+    """
+    if not 0 <= successes <= population or not 0 <= draws <= population:
+        raise ValueError(f'Cannot draw {draws} cards with {successes} sources from a deck of {population}')
+
+    # Exact integer counts of the ways to draw exactly k sources, summed from the top
+    ways = [math.comb(successes, k) * math.comb(population - successes, draws - k)
+            for k in range(min(successes, draws) + 1)]
+    total_ways = math.comb(population, draws)
+    tail: List[float] = []
+    cumulative = 0
+    for k in reversed(range(len(ways))):
+        cumulative += ways[k]
+        tail.append(cumulative / total_ways)
+    return tuple(reversed(tail))
+
+
+def probability_at_least(population: int, successes: int, draws: int, needed: int) -> float:
+    """
+    :return: The probability of drawing at least ``needed`` of ``successes`` sources in ``draws`` cards
+    """
+    tail = hypergeometric_tail(population, successes, min(draws, population))
+    return tail[needed] if needed < len(tail) else 0.
+
+
+def face_requirements(card_faces: Iterable[CardFace]) -> Tuple[FaceRequirements, ...]:
+    """
+    :param card_faces: The faces of a card
+    :return: The colored requirements of each face (generic mana, ``ManaColor.ANY``, needs no particular source)
+    """
+    faces: List[FaceRequirements] = []
+    for face in card_faces:
+        mana_value = sum(face.mana_cost.values())
+        requirements = tuple((frozenset(mana_colors), mana_quantity)
+                             for mana_colors, mana_quantity in face.mana_cost.items()
+                             if mana_quantity > 0 and ManaColor.ANY not in mana_colors)
+        faces.append(FaceRequirements(turn=max(mana_value, 1), requirements=requirements))
+    return tuple(faces)
+
+
+class CastabilityEvaluator:
+    """
+    Computes castability penalties, remembering the requirements and land colors of every card seen
+    """
+
+    def __init__(self, set_infos: Mapping[SetId, SetInfo]):
+        self.set_infos = set_infos
+        # None for spells
+        self._land_colors: Dict[CardId, Optional[FrozenSet[ManaColor]]] = {}
+        self._requirements: Dict[CardId, Tuple[FaceRequirements, ...]] = {}
+
+    def _describe(self, card_id: CardId):
+        set_id, card_number = card_id
+        set_info = self.set_infos[set_id]
+        card = set_info.cards[card_number]
+
+        lands = [set_info.card_types.lands[card_number, face_index]
+                 for face_index, _ in enumerate(card.faces)
+                 if (card_number, face_index) in set_info.card_types.lands]
+        if lands:
+            self._land_colors[card_id] = frozenset().union(*(land.possible_colors for land in lands))
+        else:
+            self._land_colors[card_id] = None
+            self._requirements[card_id] = face_requirements(card.faces)
+
+    def land_colors(self, card_id: CardId) -> Optional[FrozenSet[ManaColor]]:
+        """
+        :param card_id: A card
+        :return: The colors the card produces as a land, or None for spells
+        """
+        if card_id not in self._land_colors:
+            self._describe(card_id)
+        return self._land_colors[card_id]
+
+    def requirement_colors(self, card_id: CardId) -> Set[FrozenSet[ManaColor]]:
+        """
+        :param card_id: A spell
+        :return: The colors satisfying each colored requirement of any of its faces
+        """
+        if card_id not in self._land_colors:
+            self._describe(card_id)
+        return {mana_colors for face in self._requirements[card_id] for mana_colors, _ in face.requirements}
+
+    def probability(self, card_id: CardId, deck_size: int, sources: Mapping[FrozenSet[ManaColor], int]) -> float:
+        """
+        :param card_id: A spell
+        :param deck_size: The number of cards in the deck
+        :param sources: The lands of the deck producing any of the colors of each of the spell's
+            :meth:`requirement_colors`
+        :return: The probability of the spell being castable on curve (on the play)
+        """
+        if card_id not in self._land_colors:
+            self._describe(card_id)
+        best_probability = 0.
+        for face in self._requirements[card_id]:
+            draws = opening_hand_size + face.turn - 1
+            probability = 1.
+            for mana_colors, needed in face.requirements:
+                probability = min(probability, probability_at_least(deck_size, sources[mana_colors], draws, needed))
+            best_probability = max(best_probability, probability)
+        return best_probability
+
+    def probabilities(self, deck: Deck) -> Dict[CardId, float]:
+        """
+        :param deck: The deck
+        :return: The probability of each spell being castable on curve (on the play)
+        """
+        deck_size = sum(deck.values())
+        land_colors: List[Tuple[FrozenSet[ManaColor], Count]] = []
+        spells: List[CardId] = []
+        for card_id, card_quantity in deck.items():
+            if card_quantity <= 0:
+                continue
+            colors = self.land_colors(card_id)
+            if colors is None:
+                spells.append(card_id)
+            else:
+                land_colors.append((colors, card_quantity))
+
+        sources: Dict[FrozenSet[ManaColor], int] = {}
+        for card_id in spells:
+            for mana_colors in self.requirement_colors(card_id):
+                if mana_colors not in sources:
+                    sources[mana_colors] = sum(quantity for colors, quantity in land_colors if colors & mana_colors)
+        return {card_id: self.probability(card_id, deck_size, sources) for card_id in spells}
+
+    def penalty(self, deck: Deck) -> float:
+        """
+        :param deck: The deck
+        :return: The expected number of spells which cannot be cast on curve
+        """
+        return math.fsum(deck[card_id] * (1 - probability) for card_id, probability in self.probabilities(deck).items())
+
+
+def evaluate_deck_castability(deck: Deck, set_infos: Mapping[SetId, SetInfo]) -> DeckEvaluation:
+    """
+    Like ``evaluate_deck(summarize_deck(deck, set_infos))``, with the castability penalty filled in
+    """
+    return evaluate_deck(summarize_deck(deck, set_infos))._replace(
+        castability_penalty=CastabilityEvaluator(set_infos).penalty(deck))
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+"""
+Deck search
+
+Finds a deck within a sealed pool which minimizes the summed :class:`algorithm.DeckEvaluation`
+using simulated annealing over single-card swaps.
+"""
+
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import *
+
+from yaml import safe_load
+
+from algorithm import CardId, Count, Deck, DeckEvaluation, ManaColor, SetId, SetInfo, basic_land_info, \
+    generate_booster_pack
+from evaluation_cache import EvaluationCache
+from incremental_evaluation import IncrementalDeckEvaluator
+from pareto import DeckFront
+
+Pool = Mapping[CardId, Count]
+
+# Basic lands are unlimited in sealed play
+basic_land_ids: Tuple[CardId, ...] = tuple((None, card_number) for card_number in sorted(basic_land_info.cards.keys()))
+
+
+class SearchResult(NamedTuple):
+    deck: Deck
+    evaluation: DeckEvaluation
+    iterations: int
+    elapsed_seconds: float
+
+
+def generate_sealed_pool(set_id: SetId, set_info: SetInfo, packs: int = 6) -> Dict[CardId, Count]:
+    """
+    Opens booster packs to form a sealed pool
+
+    :param set_id: The set the booster packs are from
+    :param set_info: Information about that set
+    :param packs: The number of booster packs to open
+    :return: The quantity of each card in the pool
+    """
+    pool: DefaultDict[CardId, Count] = defaultdict(int)
+    for _ in range(packs):
+        for card_number in generate_booster_pack(set_info):
+            pool[set_id, card_number] += 1
+
+    return pool
+
+
+def load_pool(pool_file: TextIO) -> Dict[CardId, Count]:
+    """
+    Reads a pool from YAML in the same card layout as ``test_algorithm_cases.yml``::
+
+        cards:
+          - set: RNA
+            card_number: 5
+            quantity: 2
+
+    :param pool_file: The file to read
+    :return: The quantity of each card in the pool
+    """
+    pool: DefaultDict[CardId, Count] = defaultdict(int)
+    for card in safe_load(pool_file)['cards']:
+        pool[card['set'], int(card['card_number'])] += int(card.get('quantity', 1))
+
+    return pool
+
+
+def format_deck(deck: Deck, set_infos: Mapping[SetId, SetInfo]) -> Iterator[str]:
+    """
+    Lists a deck in a human-readable form
+
+    :param deck: The deck to list
+    :param set_infos: Information about the sets of which the deck is drawn
+    :return: One line per card
+    """
+    for (set_id, card_number), card_quantity in sorted(deck.items(), key=lambda item: (item[0][0] or '', item[0][1])):
+        card = set_infos[set_id].cards[card_number]
+        card_name = ' // '.join(face.name for face in card.faces)
+        yield f'{card_quantity:2d}x {card_name} ({set_id or "Basic"} #{card_number})'
+
+
+def is_land(card_id: CardId, set_infos: Mapping[SetId, SetInfo]) -> bool:
+    set_id, card_number = card_id
+    set_info = set_infos[set_id]
+    return any((card_number, face_index) in set_info.card_types.lands
+               for face_index, _ in enumerate(set_info.cards[card_number].faces))
+
+
+def add_basic_lands(deck: MutableMapping[CardId, Count], set_infos: Mapping[SetId, SetInfo], land_count: int):
+    """
+    Adds basic lands in proportion to the colored mana symbols of the cards already in the deck
+
+    :param deck: The deck to complete
+    :param set_infos: Information about the sets of which the deck is drawn
+    :param land_count: The number of basic lands to add
+    """
+    basic_land_colors = {next(iter(land.possible_colors)): (None, card_number)
+                         for (card_number, _), land in basic_land_info.card_types.lands.items()}
+    color_weights: Counter[ManaColor] = Counter()
+    for (set_id, card_number), card_quantity in deck.items():
+        for face in set_infos[set_id].cards[card_number].faces:
+            for mana_colors, mana_quantity in face.mana_cost.items():
+                for mana_color in mana_colors & basic_land_colors.keys():
+                    color_weights[mana_color] += card_quantity * mana_quantity / len(mana_colors)
+
+    total_weight = sum(color_weights.values())
+    if total_weight == 0:
+        deck[basic_land_ids[0]] = deck.get(basic_land_ids[0], 0) + land_count
+        return
+
+    # Largest remainder apportionment
+    quotas = {mana_color: land_count * weight / total_weight for mana_color, weight in color_weights.items()}
+    allocation = {mana_color: int(quota) for mana_color, quota in quotas.items()}
+    remaining = land_count - sum(allocation.values())
+    for mana_color in sorted(quotas, key=lambda color: quotas[color] - allocation[color], reverse=True)[:remaining]:
+        allocation[mana_color] += 1
+    for mana_color, quantity in allocation.items():
+        if quantity:
+            card_id = basic_land_colors[mana_color]
+            deck[card_id] = deck.get(card_id, 0) + quantity
+
+
+def initial_deck(pool: Pool, set_infos: Mapping[SetId, SetInfo], deck_size: int = 40, land_count: int = 17) -> Deck:
+    """
+    Builds a reasonable starting point: the best-rated spells of the pool plus basic lands in proportion to the
+    spells' colored mana symbols
+
+    :param pool: The cards available
+    :param set_infos: Information about the sets of which the pool is drawn
+    :param deck_size: The number of cards in the deck
+    :param land_count: The number of basic lands to add
+    :return: The deck
+    """
+    spell_copies = [card_id
+                    for card_id, card_quantity in pool.items()
+                    if not is_land(card_id, set_infos)
+                    for _ in range(card_quantity)]
+    spell_copies.sort(key=lambda card_id: set_infos[card_id[0]].cards[card_id[1]].rating, reverse=True)
+    spell_copies = spell_copies[:deck_size - land_count]
+
+    deck: Counter[CardId] = Counter(spell_copies)
+    add_basic_lands(deck, set_infos, deck_size - len(spell_copies))
+    return deck
+
+
+def random_deck(pool: Pool, set_infos: Mapping[SetId, SetInfo], rng: random.Random, deck_size: int = 40,
+                land_count: int = 17) -> Deck:
+    """
+    Builds a random starting point: random spells of the pool plus basic lands in proportion to the
+    spells' colored mana symbols
+
+    :param pool: The cards available
+    :param set_infos: Information about the sets of which the pool is drawn
+    :param rng: The source of randomness
+    :param deck_size: The number of cards in the deck
+    :param land_count: The number of basic lands to add
+    :return: The deck
+    """
+    spell_copies = [card_id
+                    for card_id, card_quantity in pool.items()
+                    if not is_land(card_id, set_infos)
+                    for _ in range(card_quantity)]
+    spell_copies = rng.sample(spell_copies, k=min(len(spell_copies), deck_size - land_count))
+
+    deck: Counter[CardId] = Counter(spell_copies)
+    add_basic_lands(deck, set_infos, deck_size - len(spell_copies))
+    return deck
+
+
+def anneal_deck(pool: Pool, set_infos: Mapping[SetId, SetInfo], deck_size: int = 40,
+                iterations: Optional[int] = None, time_limit: Optional[float] = None,
+                initial_temperature: float = 10., final_temperature: float = .01,
+                seed: Optional[int] = None, starting_deck: Optional[Deck] = None,
+                castability: bool = False, pareto_front: Optional[DeckFront] = None,
+                use_evaluation_cache: bool = True) -> SearchResult:
+    """
+    Searches for the deck with the lowest total penalty using simulated annealing.
+    Every move swaps one card of the deck with a card from the pool (or a basic land),
+    so the deck keeps its size throughout the search
+
+    :param pool: The cards available (basic lands are always available)
+    :param set_infos: Information about the sets of which the pool is drawn
+    :param deck_size: The number of cards in the deck
+    :param iterations: The number of candidate decks to evaluate (proposals which would not change the deck are redrawn)
+    :param time_limit: The number of seconds to search for (used when ``iterations`` is not given)
+    :param initial_temperature: Temperature at the start of the search
+    :param final_temperature: Temperature at the end of the search
+    :param seed: Seeds the search for reproducibility
+    :param starting_deck: Where to start the search (defaults to :func:`initial_deck`)
+    :param castability: Whether to also minimize the castability penalty (see :mod:`castability`)
+    :param pareto_front: Receives every deck evaluated, to keep the decks with the best trade-offs between penalties
+    :param use_evaluation_cache: Whether to remember the evaluations of the decks seen during the search
+        (see :class:`evaluation_cache.EvaluationCache`), so that revisited decks are not evaluated again
+    :return: The best deck found
+    """
+    if iterations is None and time_limit is None:
+        raise ValueError('Either an iteration budget or a time limit is required')
+
+    rng = random.Random(seed)
+    if starting_deck is None:
+        starting_deck = initial_deck(pool, set_infos, deck_size=deck_size)
+
+    evaluator = IncrementalDeckEvaluator(set_infos, starting_deck, castability=castability)
+    if use_evaluation_cache:
+        # Looked up by the key the evaluator keeps up to date, so lookups do not hash the whole deck
+        evaluation_cache = EvaluationCache(set_infos)
+
+        def evaluate() -> DeckEvaluation:
+            return evaluation_cache.evaluate(evaluator.deck, key=evaluator.deck_key, compute=evaluator.evaluation)
+    else:
+        evaluate = evaluator.evaluation
+
+    # Copies still available in the pool (basic lands are unlimited)
+    remaining: Dict[CardId, Count] = {card_id: card_quantity - starting_deck.get(card_id, 0)
+                                      for card_id, card_quantity in pool.items()}
+    if any(card_quantity < 0 for card_quantity in remaining.values()):
+        raise ValueError('The starting deck uses cards that are not in the pool')
+    candidates: Tuple[CardId, ...] = (*remaining.keys(), *basic_land_ids)
+
+    # One entry per copy so that every copy in the deck is equally likely to be swapped out
+    deck_slots: List[CardId] = [card_id
+                                for card_id, card_quantity in starting_deck.items()
+                                for _ in range(card_quantity)]
+
+    current_penalty = sum(evaluator.evaluation())
+    best_deck, best_evaluation, best_penalty = dict(evaluator.deck), evaluator.evaluation(), current_penalty
+    if pareto_front is not None:
+        pareto_front.add_deck(best_evaluation, evaluator.deck)
+
+    temperature_ratio = final_temperature / initial_temperature
+    temperature = initial_temperature
+    start_time = time.perf_counter()
+    iteration = 0
+    while True:
+        # Update temperature according to the fraction of the budget which has been spent
+        if iterations is not None:
+            if iteration >= iterations:
+                break
+            progress = iteration / iterations
+        elif iteration % 256 == 0:
+            progress = (time.perf_counter() - start_time) / time_limit
+            if progress >= 1:
+                break
+        else:
+            progress = None
+        if progress is not None:
+            temperature = initial_temperature * temperature_ratio ** progress
+        iteration += 1
+
+        # Propose a swap, redrawing no-ops so that every iteration evaluates a candidate deck
+        # (a different basic land can always be added)
+        while True:
+            slot = rng.randrange(len(deck_slots))
+            removed_card_id = deck_slots[slot]
+            added_card_id = rng.choice(candidates)
+            if added_card_id != removed_card_id and remaining.get(added_card_id, 1) > 0:
+                break
+
+        evaluator.swap(removed_card_id, added_card_id)
+        evaluation = evaluate()
+        penalty = sum(evaluation)
+        if pareto_front is not None:
+            pareto_front.add_deck(evaluation, evaluator.deck)
+
+        delta = penalty - current_penalty
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            # Accept
+            evaluator.clear_history()
+            current_penalty = penalty
+            deck_slots[slot] = added_card_id
+            if removed_card_id in remaining:
+                remaining[removed_card_id] += 1
+            if added_card_id in remaining:
+                remaining[added_card_id] -= 1
+
+            if penalty < best_penalty:
+                best_deck, best_evaluation, best_penalty = dict(evaluator.deck), evaluation, penalty
+        else:
+            # Reject
+            evaluator.undo()
+
+    return SearchResult(deck=best_deck, evaluation=best_evaluation, iterations=iteration,
+                        elapsed_seconds=time.perf_counter() - start_time)
+
+
+# Set by _initialize_worker in each worker process so that set_infos are only transferred once per worker
+_worker_set_infos: Optional[Mapping[SetId, SetInfo]] = None
+
+
+def _initialize_worker(set_infos: Mapping[SetId, SetInfo]):
+    global _worker_set_infos
+    _worker_set_infos = set_infos
+
+
+def _search_restart(pool: Pool, set_infos: Mapping[SetId, SetInfo], restart_seed: str,
+                    search_options: Mapping[str, Any]) -> SearchResult:
+    rng = random.Random(restart_seed)
+    starting_deck = random_deck(pool, set_infos, rng, deck_size=search_options.get('deck_size', 40))
+    return anneal_deck(pool, set_infos, seed=rng.getrandbits(64), starting_deck=starting_deck, **search_options)
+
+
+def _search_restart_in_worker(pool: Pool, restart_seed: str, search_options: Mapping[str, Any]) -> SearchResult:
+    return _search_restart(pool, _worker_set_infos, restart_seed, search_options)
+
+
+def deck_key(deck: Deck) -> FrozenSet[Tuple[CardId, Count]]:
+    return frozenset((card_id, card_quantity) for card_id, card_quantity in deck.items() if card_quantity)
+
+
+def result_order(result: SearchResult) -> Tuple[float, Sequence[str]]:
+    # Break ties between equally good decks deterministically, regardless of completion order
+    return sum(result.evaluation), sorted(map(repr, deck_key(result.deck)))
+
+
+def parallel_search(pool: Pool, set_infos: Mapping[SetId, SetInfo], restarts: int, workers: Optional[int] = None,
+                    top_k: int = 1, seed: Optional[int] = None, **search_options) -> List[SearchResult]:
+    """
+    Runs independent annealing searches from random starting decks across a process pool
+    and merges their results.
+    Each restart is seeded from ``seed`` and its restart number, so results do not depend on the number of workers
+
+    :param pool: The cards available (basic lands are always available)
+    :param set_infos: Information about the sets of which the pool is drawn
+    :param restarts: The number of independent searches
+    :param workers: The number of processes (defaults to the number of CPUs; 1 runs in this process)
+    :param top_k: The number of distinct decks to keep
+    :param seed: Seeds the searches for reproducibility
+    :param search_options: Passed on to :func:`anneal_deck` (iteration or time budget per restart, etc.)
+    :return: The best distinct decks found, best first
+    """
+    # parse_cards_csv returns a defaultdict with an unpicklable default factory
+    set_infos = dict(set_infos)
+    pool = dict(pool)
+    if seed is None:
+        # Unseeded searches differ from run to run, like unseeded restarts of anneal_deck
+        seed = random.SystemRandom().getrandbits(64)
+    restart_seeds = (f'{seed}/{restart}' for restart in range(restarts))
+
+    best_results: Dict[FrozenSet[Tuple[CardId, Count]], SearchResult] = {}
+
+    def merge(result: SearchResult):
+        key = deck_key(result.deck)
+        if key not in best_results:
+            best_results[key] = result
+            if len(best_results) > top_k:
+                worst_key = max(best_results, key=lambda other_key: result_order(best_results[other_key]))
+                del best_results[worst_key]
+
+    if workers == 1:
+        for restart_seed in restart_seeds:
+            merge(_search_restart(pool, set_infos, restart_seed, search_options))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker,
+                                 initargs=(set_infos,)) as executor:
+            futures = [executor.submit(_search_restart_in_worker, pool, restart_seed, search_options)
+                       for restart_seed in restart_seeds]
+            for future in as_completed(futures):
+                merge(future.result())
+
+    return sorted(best_results.values(), key=result_order)
@@ -1,11 +1,62 @@
 #!/usr/bin/env python3
 
+"""
+Download a local copy of the MTG database
+
+Sets are downloaded concurrently (one set per worker thread, which bounds the number of open connections).
+Raw API responses can be cached on disk; cached pages are refreshed with conditional requests
+(``If-None-Match``/``If-Modified-Since``), so unchanged pages are not downloaded again.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Mapping, Any
+from typing import Mapping, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
 
 from mtgsdk import Card
+from mtgsdk.config import __endpoint__ as default_endpoint
 from yaml import safe_load, safe_dump
 
+from algorithm import Keyword
+from atomic_file import atomic_write
+
+user_agent = 'Mozilla/5.0'
+
+reminder_text_re = re.compile(r'\([^)]*\)')
+
+
+def parse_keywords(text: Optional[str]) -> List[str]:
+    """
+    Finds the keyword abilities of a card (lines such as "Flying, vigilance" or "Equip {2}")
+
+    :param text: The card's rules text
+    :return: The names of the keywords, such as "First strike"
+    """
+    keywords = set()
+    for line in (text or '').splitlines():
+        line = reminder_text_re.sub('', line).strip().lower()
+        line_keywords = set()
+        for ability in line.split(','):
+            ability = ability.strip()
+            for keyword in Keyword:
+                keyword_name = keyword.name.replace('_', ' ').lower()
+                # Some keywords take an argument ("Enchant creature", "Scry 2")
+                if ability == keyword_name or ability.startswith(keyword_name + ' '):
+                    line_keywords.add(keyword)
+                    break
+            else:
+                break  # Not a keyword line
+        else:
+            keywords.update(line_keywords)
+
+    return sorted(keyword.name.replace('_', ' ').capitalize() for keyword in keywords)
+
 
 def generate_card_entry(card: Card) -> Mapping[str, Any]:
     entry = {
@@ -52,6 +103,10 @@ def generate_card_entry(card: Card) -> Mapping[str, Any]:
         except ValueError:
             pass
 
+        entry.update({
+            'Keywords': parse_keywords(card.text),
+        })
+
     elif 'Sorcery' in card_type:
         pass
 
@@ -61,32 +116,178 @@ def generate_card_entry(card: Card) -> Mapping[str, Any]:
     return entry
 
 
+class ResponseCache:
+    """
+    Raw API responses on disk, one JSON file per URL, along with the validators needed to refresh them
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, url: str) -> Path:
+        return self.directory / f'{hashlib.sha256(url.encode("utf-8")).hexdigest()}.json'
+
+    def read(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        :param url: The requested URL
+        :return: The cached entry (with ``body``, ``etag`` and ``last_modified`` keys), if any
+        """
+        try:
+            with open(self.path(url)) as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('url') == url else None
+
+    def write(self, url: str, body: Any, etag: Optional[str], last_modified: Optional[str]):
+        with atomic_write(self.path(url)) as response_file:
+            json.dump({
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'body': body,
+            }, response_file)
+
+
+def fetch_json(url: str, cache: Optional[ResponseCache] = None, timeout: float = 30.) -> Any:
+    """
+    GETs a JSON document, revalidating the cached copy if there is one
+
+    :param url: The URL to request
+    :param cache: Where raw responses are cached
+    :param timeout: Seconds to wait for the server
+    :return: The parsed response
+    """
+    headers = {'User-Agent': user_agent}
+    cached = cache.read(url) if cache is not None else None
+    if cached is not None:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    try:
+        with urlopen(Request(url, headers=headers), timeout=timeout) as response:
+            body = json.loads(response.read().decode('utf-8'))
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+    except HTTPError as error:
+        if error.code == 304 and cached is not None:
+            logging.debug('Not modified: %s', url)
+            return cached['body']
+        raise
+
+    if cache is not None:
+        cache.write(url, body, etag, last_modified)
+    return body
+
+
+def download_set(set_code: str, endpoint: str = default_endpoint, cache: Optional[ResponseCache] = None,
+                 timeout: float = 30.) -> Dict[int, Mapping[str, Any]]:
+    """
+    Downloads every card of a set, page by page (like ``Card.where(set=..., language='English').iter()``)
+
+    :param set_code: The code of the set to download
+    :param endpoint: The base URL of the API
+    :param cache: Where raw responses are cached
+    :param timeout: Seconds to wait for each page
+    :return: The entry of each card, by card number
+    """
+    cards: Dict[int, Mapping[str, Any]] = {}
+    page = 1
+    while True:
+        url = f'{endpoint}/{Card.RESOURCE}?{urlencode({"set": set_code, "language": "English", "page": page})}'
+        response = fetch_json(url, cache, timeout)[Card.RESOURCE]
+        if not response:
+            return cards
+
+        for card in map(Card, response):
+            cards[int(card.number)] = generate_card_entry(card)
+        page += 1
+
+
+def download_sets(set_codes: Iterable[str], endpoint: str = default_endpoint, cache: Optional[ResponseCache] = None,
+                  connections: int = 8, timeout: float = 30.) \
+        -> Iterator[Tuple[str, Optional[Dict[int, Mapping[str, Any]]], Optional[Exception]]]:
+    """
+    Downloads many sets concurrently, yielding each one as soon as it is complete
+
+    :param set_codes: The codes of the sets to download
+    :param endpoint: The base URL of the API
+    :param cache: Where raw responses are cached
+    :param connections: The maximum number of simultaneous requests
+    :param timeout: Seconds to wait for each page
+    :return: (set code, card entries, None) for each downloaded set, or (set code, None, error) if it failed
+    """
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        futures = {executor.submit(download_set, set_code, endpoint, cache, timeout): set_code
+                   for set_code in set_codes}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as error:
+                yield futures[future], None, error
+
+
+def dump_card_db(card_db: Mapping[str, Any]) -> str:
+    return safe_dump(card_db, indent=2, width=120)
+
+
 if __name__ == '__main__':
     import argparse
+    import sys
 
     parser = argparse.ArgumentParser(description='Download a local copy of the MTG database')
-    parser.add_argument('set', metavar='SET_CODE', type=str,
-                        help='The code of the set to download')
+    parser.add_argument('sets', metavar='SET_CODE', type=str, nargs='+',
+                        help='The codes of the sets to download')
     parser.add_argument('--db-file', '-o', metavar='DATABASE_FILE', type=Path, default='card_db.yml',
-                        help='The code of the set to download')
+                        help='The database to add the sets to (default: %(default)s)')
+    parser.add_argument('--db-dir', metavar='DATABASE_DIR', type=Path,
+                        help='Write each set to its own file in this directory instead of to --db-file')
+    parser.add_argument('--cache-dir', metavar='CACHE_DIR', type=Path,
+                        help='Cache raw API responses here and only download pages that have changed')
+    parser.add_argument('--connections', metavar='N', type=int, default=8,
+                        help='The maximum number of simultaneous requests (default: %(default)s)')
+    parser.add_argument('--endpoint', metavar='URL', default=default_endpoint,
+                        help='The base URL of the API (default: %(default)s)')
     args = parser.parse_args()
 
-    with open(args.db_file) as in_file:
-        card_db = safe_load(in_file)
+    response_cache = ResponseCache(args.cache_dir) if args.cache_dir is not None else None
+    if args.db_dir is not None:
+        args.db_dir.mkdir(parents=True, exist_ok=True)
+        card_db = None
+    else:
         try:
-            assert isinstance(card_db, dict)
-
-        except AssertionError:
+            with open(args.db_file) as in_file:
+                card_db = safe_load(in_file)
+        except FileNotFoundError:
+            card_db = None
+        if not isinstance(card_db, dict):
             card_db = {}
 
-    with open(args.db_file, 'w') as out_file:
-        mtg_set: str = args.set.upper()
+    failed = False
+    for mtg_set, cards, error in download_sets((set_code.upper() for set_code in args.sets), args.endpoint,
+                                               response_cache, args.connections):
+        if error is not None:
+            print(f'Could not download {mtg_set}: {error}', file=sys.stderr)
+            failed = True
+            continue
 
-        card_db.update({
+        print(f'Downloaded {mtg_set} ({len(cards)} cards)', file=sys.stderr)
+        set_entry = {
             mtg_set: {
-                'Cards': {int(card.number): generate_card_entry(card)
-                          for card in Card.where(set=mtg_set, language='English').iter()},
+                'Cards': cards,
             },
-        })
+        }
+        if args.db_dir is not None:
+            with atomic_write(args.db_dir / f'{mtg_set}.yml') as db_file:
+                db_file.write(dump_card_db(set_entry))
+        else:
+            card_db.update(set_entry)
+
+    if args.db_dir is None:
+        with atomic_write(args.db_file) as db_file:
+            db_file.write(dump_card_db(card_db))
 
-        safe_dump(card_db, out_file, indent=2, width=120)
+    sys.exit(1 if failed else 0)
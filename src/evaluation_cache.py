@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+"""
+Memoized deck evaluation
+
+Decks are plain mutable mappings, so they cannot be used as dictionary keys directly.
+:func:`canonical_deck_key` reduces a deck to a 128-bit key, the XOR of a hash of each of its card counts, and
+:class:`EvaluationCache` keeps the evaluations of recently seen decks in a bounded least-recently-used cache which
+can be shared between threads and saved between runs.
+Because the hashes are combined with XOR, :class:`incremental_evaluation.IncrementalDeckEvaluator` keeps the key of
+its deck up to date card by card instead of hashing the whole deck for every lookup.
+"""
+
+import hashlib
+import logging
+import pickle
+import struct
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import *
+
+from algorithm import CardId, Count, Deck, DeckEvaluation, SetId, SetInfo, evaluate_deck, summarize_deck
+from atomic_file import atomic_write
+
+DeckKey = bytes
+
+cache_magic = b'MTGEVALS'
+# Increment whenever the deck key or the evaluation changes
+cache_format_version = 2
+
+# Magic, format version, length of the caller's fingerprint
+cache_header = struct.Struct(f'<{len(cache_magic)}sHH')
+
+
+@lru_cache(maxsize=None)
+def card_count_key(card_id: CardId, card_quantity: Count) -> int:
+    """
+    :param card_id: A card
+    :param card_quantity: How many copies of it a deck holds
+    :return: A 128-bit hash of the card count (0 for zero copies), to be combined with XOR into a deck key
+    """
+    if not card_quantity:
+        return 0
+    set_id, card_number = card_id
+    digest = hashlib.blake2b(repr((set_id or '', card_number, card_quantity)).encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def deck_key_bytes(key: int) -> DeckKey:
+    """
+    :param key: The XOR of the :func:`card_count_key` of every card count of a deck
+    :return: The deck's key
+    """
+    return key.to_bytes(16, 'little')
+
+
+def canonical_deck_key(deck: Deck) -> DeckKey:
+    """
+    Computes a hashable key which is equal for decks with the same card counts, in whatever order they were added
+
+    :param deck: The deck
+    :return: The 128-bit XOR of the BLAKE2b digests of the deck's card counts
+    """
+    key = 0
+    for card_id, card_quantity in deck.items():
+        key ^= card_count_key(card_id, card_quantity)
+    return deck_key_bytes(key)
+
+
+class CacheStatistics(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+
+class EvaluationCache:
+    """
+    A thread-safe LRU cache in front of :func:`algorithm.summarize_deck` and :func:`algorithm.evaluate_deck`.
+    Evaluations are computed outside the lock, so concurrent misses on the same deck may both compute it
+    """
+
+    def __init__(self, set_infos: Mapping[SetId, SetInfo], max_entries: int = 1 << 16):
+        """
+        :param set_infos: Information about the sets of which the decks are drawn
+        :param max_entries: The least recently used evaluations are evicted beyond this many
+        (each entry takes a few hundred bytes)
+        """
+        if max_entries < 1:
+            raise ValueError('The cache must hold at least one entry')
+
+        self.set_infos = set_infos
+        self.max_entries = max_entries
+        self._entries: OrderedDict[DeckKey, DeckEvaluation] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, deck: Deck) -> bool:
+        key = canonical_deck_key(deck)
+        with self._lock:
+            return key in self._entries
+
+    def evaluate(self, deck: Deck, key: Optional[DeckKey] = None,
+                 compute: Optional[Callable[[], DeckEvaluation]] = None) -> DeckEvaluation:
+        """
+        Like ``evaluate_deck(summarize_deck(deck, set_infos))``, but memoized
+
+        :param deck: The deck to evaluate
+        :param key: The deck's :func:`canonical_deck_key`, if already known
+        :param compute: Evaluates the deck on a miss instead (every evaluation in a cache must be computed alike)
+        :return: The deck's penalties
+        """
+        if key is None:
+            key = canonical_deck_key(deck)
+        with self._lock:
+            try:
+                evaluation = self._entries[key]
+            except KeyError:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return evaluation
+
+        evaluation = evaluate_deck(summarize_deck(deck, self.set_infos)) if compute is None else compute()
+        self._store(key, evaluation)
+        return evaluation
+
+    def _store(self, key: DeckKey, evaluation: DeckEvaluation):
+        with self._lock:
+            self._entries[key] = evaluation
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        with self._lock:
+            return CacheStatistics(hits=self._hits, misses=self._misses, evictions=self._evictions,
+                                   entries=len(self._entries))
+
+    def clear(self):
+        """
+        Drops every entry and resets the statistics
+        """
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def save(self, cache_path: Path, fingerprint: bytes = b''):
+        """
+        Atomically writes the cached evaluations (least recently used first)
+
+        :param cache_path: The cache file
+        :param fingerprint: Identifies the card data the evaluations were computed from
+        (e.g. the SHA-256 of the ratings list); :meth:`load` ignores files with another fingerprint
+        """
+        cache_path = Path(cache_path)
+        with self._lock:
+            entries = [(key, tuple(evaluation)) for key, evaluation in self._entries.items()]
+
+        with atomic_write(cache_path, 'wb') as cache_file:
+            cache_file.write(cache_header.pack(cache_magic, cache_format_version, len(fingerprint)))
+            cache_file.write(fingerprint)
+            pickle.dump(entries, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, cache_path: Path, fingerprint: bytes = b'') -> int:
+        """
+        Adds the evaluations saved by :meth:`save` (if the file is current)
+
+        :param cache_path: The cache file
+        :param fingerprint: Must match the fingerprint the file was saved with
+        :return: The number of evaluations loaded
+        """
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                magic, version, fingerprint_length = cache_header.unpack(cache_file.read(cache_header.size))
+                if (magic, version) != (cache_magic, cache_format_version) or \
+                        cache_file.read(fingerprint_length) != fingerprint:
+                    return 0
+                entries = pickle.load(cache_file)
+
+        except (OSError, struct.error, pickle.UnpicklingError, EOFError) as error:
+            logging.debug('Ignoring evaluation cache "%s": %s', cache_path, error)
+            return 0
+
+        for key, evaluation in entries:
+            self._store(key, DeckEvaluation(*evaluation))
+        return len(entries)
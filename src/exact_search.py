@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+"""
+Exact deck search
+
+Finds the deck of a given size with the lowest total :class:`algorithm.DeckEvaluation` penalty that can be built from
+a sealed pool (plus unlimited basic lands), using depth-first branch-and-bound:
+
+- Pool cards which contribute identically to every penalty are merged into one class, and the search branches on
+  how many copies of each class to play rather than on individual copies
+- Basic lands are interchangeable apart from their color, so they are not branched on: once the pool cards are
+  decided, the remaining slots are filled with the best split of basic land colors (see :mod:`mana_base`)
+- Each node is pruned when a lower bound on its best completion (built from admissible bounds on the individual
+  penalties) is no better than the best deck found so far
+"""
+
+import math
+import time
+from collections import defaultdict
+from typing import *
+
+from algorithm import Archetype, CardId, Count, Deck, DeckEvaluation, SetId, SetInfo
+from deck_search import Pool, anneal_deck
+from incremental_evaluation import CardDelta, IncrementalDeckEvaluator, archetypes, compute_card_delta, \
+    fraction_units, mana_colors
+from mana_base import basic_lands_by_color, best_basic_land_split, land_ratio_penalty
+
+bomb_index = archetypes.index(Archetype.BOMB)
+removal_index = archetypes.index(Archetype.REMOVAL)
+evasive_index = archetypes.index(Archetype.EVASIVE)
+mana_fixing_index = archetypes.index(Archetype.MANA_FIXING)
+
+
+class ExactResult(NamedTuple):
+    deck: Deck
+    evaluation: DeckEvaluation
+    # The best possible total penalty is at least this (equal to the deck's total penalty when proven optimal)
+    lower_bound: float
+    optimal: bool
+    nodes: int
+    elapsed_seconds: float
+
+    @property
+    def gap(self) -> float:
+        return sum(self.evaluation) - self.lower_bound
+
+
+class CardClass(NamedTuple):
+    delta: CardDelta
+    card_ids: Sequence[CardId]
+    quantities: Sequence[Count]
+
+
+class _Stop(Exception):
+    pass
+
+
+def group_pool(pool: Pool, set_infos: Mapping[SetId, SetInfo]) -> List[CardClass]:
+    """
+    Merges pool cards which contribute identically to the deck summary
+
+    :param pool: The cards available
+    :param set_infos: Information about the sets of which the pool is drawn
+    :return: The classes, most promising first
+    """
+    classes: DefaultDict[CardDelta, List[Tuple[CardId, Count]]] = defaultdict(list)
+    for card_id, card_quantity in pool.items():
+        if card_quantity > 0:
+            classes[compute_card_delta(card_id, set_infos)].append((card_id, card_quantity))
+
+    def promise(delta: CardDelta) -> Tuple:
+        # Cards that reduce the archetype penalty first, duds last
+        return (-len(set(delta.archetype_indices) & {bomb_index, removal_index, evasive_index, mana_fixing_index}),
+                delta.is_dud)
+
+    return [CardClass(delta=delta, card_ids=tuple(card_id for card_id, _ in members),
+                      quantities=tuple(card_quantity for _, card_quantity in members))
+            for delta, members in sorted(classes.items(), key=lambda item: promise(item[0]))]
+
+
+def exact_deck_search(pool: Pool, set_infos: Mapping[SetId, SetInfo], deck_size: int = 40,
+                      time_limit: Optional[float] = None, node_limit: Optional[int] = None,
+                      initial_iterations: int = 5000, seed: Optional[int] = 0) -> ExactResult:
+    """
+    Finds the deck with the lowest total penalty by branch-and-bound.
+    When stopped early by a limit, the best deck found so far is returned along with a lower bound on the optimum
+
+    :param pool: The cards available (basic lands are always available)
+    :param set_infos: Information about the sets of which the pool is drawn
+    :param deck_size: The number of cards in the deck
+    :param time_limit: Stop after this many seconds
+    :param node_limit: Stop after exploring this many nodes
+    :param initial_iterations: Iterations of :func:`deck_search.anneal_deck` used to find a starting incumbent
+    :param seed: Seeds the search for the starting incumbent
+    :return: The best deck found and the optimality gap
+    """
+    start_time = time.perf_counter()
+    classes = group_pool(pool, set_infos)
+    class_count = len(classes)
+
+    # Copies of helpful archetypes available from each class onwards
+    def suffix_counts(archetype_index: int) -> List[int]:
+        counts = [0] * (class_count + 1)
+        for index in reversed(range(class_count)):
+            counts[index] = counts[index + 1] + \
+                (sum(classes[index].quantities) if archetype_index in classes[index].delta.archetype_indices else 0)
+        return counts
+
+    remaining_bombs = suffix_counts(bomb_index)
+    remaining_removals = suffix_counts(removal_index)
+    remaining_evasive = suffix_counts(evasive_index)
+    remaining_mana_fixing = suffix_counts(mana_fixing_index)
+
+    # Running counts of the pool cards chosen so far
+    archetype_counts = [0] * len(archetypes)
+    mana_symbol_units = [0] * len(mana_colors)
+    mana_symbol_mentions = [0] * len(mana_colors)
+    land_units = [0] * len(mana_colors)
+    state = {'cards': 0, 'duds': 0}
+
+    evaluator = IncrementalDeckEvaluator(set_infos)
+
+    # Incumbent
+    if initial_iterations:
+        incumbent = anneal_deck(pool, set_infos, deck_size=deck_size, iterations=initial_iterations, seed=seed)
+        best = {'deck': incumbent.deck, 'evaluation': incumbent.evaluation, 'penalty': sum(incumbent.evaluation)}
+    else:
+        best = {'deck': None, 'evaluation': None, 'penalty': math.inf}
+
+    nodes = 0
+    open_bounds: List[float] = []
+
+    def apply(card_class: CardClass, quantity: int):
+        delta = card_class.delta
+        state['cards'] += quantity
+        for color_index, units in delta.land_units:
+            land_units[color_index] += quantity * units
+        for color_index, units in delta.mana_symbol_units:
+            mana_symbol_units[color_index] += quantity * units
+            mana_symbol_mentions[color_index] += quantity
+        for archetype_index in delta.archetype_indices:
+            archetype_counts[archetype_index] += quantity
+        if delta.is_dud:
+            state['duds'] += quantity
+
+        # Spread the copies over the class members
+        for card_id, card_quantity in zip(card_class.card_ids, card_class.quantities):
+            if quantity == 0:
+                break
+            if quantity > 0:
+                used = min(quantity, card_quantity)
+                evaluator.add(card_id, used)
+                quantity -= used
+            else:
+                held = evaluator.deck.get(card_id, 0)
+                used = min(-quantity, held)
+                if used:
+                    evaluator.remove(card_id, used)
+                quantity += used
+
+    def lower_bound(class_index: int) -> float:
+        slots = deck_size - state['cards']
+
+        # Deck size and deck color: the deck color penalty is at least 2
+        bound = (40 - deck_size) ** 2 + 2
+
+        # Land ratio: basic lands can bring the land count anywhere from its current value up to the deck size
+        land_count = sum(land_units) / fraction_units
+        bound += land_ratio_penalty(min(max(land_count, 16 / 40 * deck_size), land_count + slots), deck_size)
+
+        # Archetypes: at best, every remaining slot goes to each missing archetype
+        if archetype_counts[bomb_index] == 0 and (remaining_bombs[class_index] == 0 or slots == 0):
+            bound += 10
+        bound += 10 * max(0, 2 - archetype_counts[removal_index] - min(remaining_removals[class_index], slots))
+        bound += 10 * max(0, 2 - archetype_counts[evasive_index] - min(remaining_evasive[class_index], slots))
+        bound += 5 * state['duds']
+
+        # Colors are never removed, so the color identity can only grow
+        colors = sum(1 for mentions in mana_symbol_mentions if mentions)
+        if colors > 1:
+            bound += 10 * max(0, 2 * colors - archetype_counts[mana_fixing_index] -
+                              min(remaining_mana_fixing[class_index], slots))
+
+        return bound
+
+    def complete_with_basic_lands():
+        basic_land_count = deck_size - state['cards']
+        if (sum(mana_symbol_units) == 0 and any(mana_symbol_mentions)) or deck_size == 0:
+            return  # Cannot be evaluated
+
+        _, split = best_basic_land_split(mana_symbol_units, mana_symbol_mentions, land_units, basic_land_count)
+        for color_index, quantity in enumerate(split):
+            if quantity:
+                evaluator.add(basic_lands_by_color[color_index], quantity)
+        try:
+            evaluation = evaluator.evaluation()
+        except ZeroDivisionError:
+            evaluation = None
+        for color_index, quantity in enumerate(split):
+            if quantity:
+                evaluator.remove(basic_lands_by_color[color_index], quantity)
+
+        if evaluation is not None and sum(evaluation) < best['penalty']:
+            deck = dict(evaluator.deck)
+            for color_index, quantity in enumerate(split):
+                if quantity:
+                    deck[basic_lands_by_color[color_index]] = quantity
+            best.update(deck=deck, evaluation=evaluation, penalty=sum(evaluation))
+
+    def search(class_index: int):
+        nonlocal nodes
+        nodes += 1
+        if (node_limit is not None and nodes > node_limit) or \
+                (time_limit is not None and nodes % 1024 == 0 and time.perf_counter() - start_time > time_limit):
+            raise _Stop()
+
+        bound = lower_bound(class_index)
+        if bound >= best['penalty']:
+            return
+
+        slots = deck_size - state['cards']
+        if class_index == class_count or slots == 0:
+            complete_with_basic_lands()
+            return
+
+        open_bounds.append(bound)
+        card_class = classes[class_index]
+        for quantity in reversed(range(min(sum(card_class.quantities), slots) + 1)):
+            apply(card_class, quantity)
+            try:
+                search(class_index + 1)
+            finally:
+                apply(card_class, -quantity)
+        open_bounds.pop()
+
+    try:
+        search(0)
+        optimal = True
+        final_lower_bound = best['penalty']
+    except _Stop:
+        optimal = False
+        # Every unexplored node descends from a node on the current path
+        final_lower_bound = min(best['penalty'], *open_bounds) if open_bounds else best['penalty']
+
+    if best['deck'] is None:
+        raise ValueError('No deck could be evaluated')
+
+    return ExactResult(deck=best['deck'], evaluation=best['evaluation'], lower_bound=final_lower_bound,
+                       optimal=optimal, nodes=nodes, elapsed_seconds=time.perf_counter() - start_time)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+"""
+Genetic deck search
+
+Evolves a population of decks built from a sealed pool. The population is an integer count matrix with one row per
+deck and one column per card of the pool (plus the basic lands), so every generation is scored by a single call of
+:func:`batch_evaluation.evaluate_decks` instead of one :func:`algorithm.summarize_deck` per deck.
+
+Both operators keep every deck at the deck size and within the copies available:
+
+- Crossover keeps the cards both parents share and fills the remaining slots with copies drawn at random from the
+  cards only one parent plays
+- Mutation swaps single copies out of the deck for copies of cards with copies left in the pool
+"""
+
+import random
+import time
+from typing import *
+
+import numpy as np
+
+from algorithm import CardId, Deck, DeckEvaluation, SetId, SetInfo, evaluate_deck, summarize_deck
+from batch_evaluation import FeatureMatrix, card_features, evaluate_decks
+from deck_search import Pool, basic_land_ids, random_deck
+from pareto import DeckFront
+
+
+class GenerationStatistics(NamedTuple):
+    generation: int
+    best_penalty: float
+    mean_penalty: float
+    distinct_decks: int
+    elapsed_seconds: float
+
+
+class GeneticResult(NamedTuple):
+    deck: Deck
+    evaluation: DeckEvaluation
+    # One entry per generation, the initial population included
+    generations: Sequence[GenerationStatistics]
+    elapsed_seconds: float
+
+
+def compile_pool(pool: Pool, set_infos: Mapping[SetId, SetInfo],
+                 deck_size: int = 40) -> Tuple[FeatureMatrix, np.ndarray]:
+    """
+    Compiles the cards of a pool and the basic lands into a feature matrix
+
+    :param pool: The cards available
+    :param set_infos: Information about the sets of which the pool is drawn
+    :param deck_size: The number of cards in the deck (the number of basic lands available of each color)
+    :return: The feature matrix and the number of copies available of each card
+    """
+    card_ids: List[CardId] = [card_id for card_id, card_quantity in pool.items()
+                              if card_quantity > 0 and card_id not in basic_land_ids]
+    limits = [pool[card_id] for card_id in card_ids]
+    card_ids.extend(basic_land_ids)
+    limits.extend([deck_size] * len(basic_land_ids))
+
+    features = np.array([card_features(card_number, set_infos[set_id]) for set_id, card_number in card_ids])
+    feature_matrix = FeatureMatrix(card_ids=card_ids,
+                                   card_indices={card_id: index for index, card_id in enumerate(card_ids)},
+                                   features=features)
+    return feature_matrix, np.array(limits)
+
+
+def total_penalties(evaluations: DeckEvaluation) -> np.ndarray:
+    """
+    :param evaluations: Each penalty as an array with one value per deck (see :func:`batch_evaluation.evaluate_decks`)
+    :return: The total penalty of each deck (infinite for decks which cannot be evaluated)
+    """
+    penalties = np.sum(evaluations, axis=0)
+    return np.where(np.isnan(penalties), np.inf, penalties)
+
+
+def sample_columns(weights: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    :param weights: Non-negative weights with one row per deck and at least one positive weight per row
+    :return: A column of each row, drawn in proportion to the weights
+    """
+    cumulative = np.cumsum(weights, axis=1)
+    targets = rng.random(len(weights)) * cumulative[:, -1]
+    return (cumulative <= targets[:, np.newaxis]).sum(axis=1)
+
+
+def crossover(parents: np.ndarray, other_parents: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Keeps the copies both parents play and fills the deck with copies only one of them plays
+
+    :param parents: Count matrix of the first parents
+    :param other_parents: Count matrix of the second parents (of the same deck size)
+    :param rng: The source of randomness
+    :return: Count matrix of the children, as large as their parents and using no card more often than either
+    """
+    shared = np.minimum(parents, other_parents)
+    differing = np.maximum(parents, other_parents) - shared
+    missing = parents.sum(axis=1) - shared.sum(axis=1)
+    children = shared.copy()
+    for row in np.flatnonzero(missing):
+        children[row] += rng.multivariate_hypergeometric(differing[row], missing[row])
+    return children
+
+
+def mutate(deck_counts: np.ndarray, limits: np.ndarray, mutation_rate: float,
+           rng: np.random.Generator) -> np.ndarray:
+    """
+    Swaps copies of cards in some decks for copies left in the pool
+
+    :param deck_counts: Count matrix of the decks (modified in place)
+    :param limits: The number of copies available of each card
+    :param mutation_rate: The expected number of swaps per deck
+    :param rng: The source of randomness
+    :return: The count matrix
+    """
+    swaps = rng.poisson(mutation_rate, len(deck_counts))
+    for swap in range(swaps.max(initial=0)):
+        rows = np.flatnonzero(swaps > swap)
+        removed = sample_columns(deck_counts[rows], rng)
+        deck_counts[rows, removed] -= 1
+        # Any card with copies left but the one just removed, so that every swap changes the deck
+        available = deck_counts[rows] < limits
+        available[np.arange(len(rows)), removed] = False
+        added = sample_columns(available, rng)
+        deck_counts[rows, added] += 1
+    return deck_counts
+
+
+def genetic_search(pool: Pool, set_infos: Mapping[SetId, SetInfo], deck_size: int = 40, population_size: int = 200,
+                   generations: Optional[int] = None, time_limit: Optional[float] = None, elite: int = 4,
+                   mutation_rate: float = 1., tournament_size: int = 3, seed: Optional[int] = None,
+                   on_generation: Optional[Callable[[GenerationStatistics], None]] = None,
+                   pareto_front: Optional[DeckFront] = None) -> GeneticResult:
+    """
+    Searches for the deck with the lowest total penalty by evolving a population of decks
+
+    :param pool: The cards available (basic lands are always available)
+    :param set_infos: Information about the sets of which the pool is drawn
+    :param deck_size: The number of cards in the deck
+    :param population_size: The number of decks in each generation
+    :param generations: The number of generations to evolve
+    :param time_limit: The number of seconds to search for (used when ``generations`` is not given)
+    :param elite: The number of best decks carried over unchanged into the next generation
+    :param mutation_rate: The expected number of card swaps per child
+    :param tournament_size: The number of decks competing for each parent
+    :param seed: Seeds the search for reproducibility
+    :param on_generation: Called with the statistics of each generation as soon as it is scored
+    :param pareto_front: Receives every deck of every generation, to keep the decks with the best trade-offs between
+        penalties
+    :return: The best deck found and the convergence of the population
+    """
+    if generations is None and time_limit is None:
+        raise ValueError('Either a generation budget or a time limit is required')
+    if not 0 <= elite < population_size:
+        raise ValueError(f'Cannot keep {elite} elite decks in a population of {population_size}')
+
+    start_time = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    deck_rng = random.Random(seed)
+
+    feature_matrix, limits = compile_pool(pool, set_infos, deck_size=deck_size)
+    card_indices = feature_matrix.card_indices
+
+    population = np.zeros((population_size, len(limits)), dtype=int)
+    for row in range(population_size):
+        for card_id, card_quantity in random_deck(pool, set_infos, deck_rng, deck_size=deck_size).items():
+            population[row, card_indices[card_id]] += card_quantity
+
+    statistics: List[GenerationStatistics] = []
+    generation = 0
+    while True:
+        evaluations = evaluate_decks(population, feature_matrix)
+        penalties = total_penalties(evaluations)
+        if pareto_front is not None:
+            for row in np.flatnonzero(np.isfinite(penalties)):
+                evaluation = DeckEvaluation(*(float(penalty[row]) for penalty in evaluations))
+                deck_counts = population[row]
+                pareto_front.add_deck(evaluation, deck_factory=lambda: dict(zip(feature_matrix.card_ids,
+                                                                                deck_counts.tolist())))
+        order = np.argsort(penalties, kind='stable')
+        population, penalties = population[order], penalties[order]
+
+        finite_penalties = penalties[np.isfinite(penalties)]
+        generation_statistics = GenerationStatistics(
+            generation=generation,
+            best_penalty=float(penalties[0]),
+            mean_penalty=float(finite_penalties.mean()) if finite_penalties.size else float('inf'),
+            distinct_decks=len(np.unique(population, axis=0)),
+            elapsed_seconds=time.perf_counter() - start_time)
+        statistics.append(generation_statistics)
+        if on_generation is not None:
+            on_generation(generation_statistics)
+
+        generation += 1
+        if generations is not None:
+            if generation > generations:
+                break
+        elif generation_statistics.elapsed_seconds >= time_limit:
+            break
+
+        # Tournament selection (the population is sorted, so the lowest index wins)
+        children = population_size - elite
+        parents = rng.integers(population_size, size=(2, children, tournament_size)).min(axis=2)
+        offspring = crossover(population[parents[0]], population[parents[1]], rng)
+        mutate(offspring, limits, mutation_rate, rng)
+        population = np.concatenate((population[:elite], offspring))
+
+    best_deck = {card_id: int(card_quantity)
+                 for card_id, card_quantity in zip(feature_matrix.card_ids, population[0]) if card_quantity}
+    return GeneticResult(deck=best_deck, evaluation=evaluate_deck(summarize_deck(best_deck, set_infos)),
+                         generations=statistics, elapsed_seconds=time.perf_counter() - start_time)
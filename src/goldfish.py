@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+"""
+Goldfish simulation
+
+Plays a deck against an opponent who does nothing ("goldfishing") to measure how quickly it deploys its curve,
+which the static :class:`algorithm.DeckSummary` cannot capture. Thousands of shuffles are simulated at once with
+NumPy: every simulation is a row of the state arrays and every copy of a card is a column.
+
+Each turn (on the play: no draw on the first turn) the player draws, plays the earliest drawn land in hand, then
+casts spells from hand greedily, most expensive first, while they have enough lands in play for the spell's mana
+value and enough sources of each of its colors. Colored mana is not tracked land by land, and split mana symbols
+count as generic mana.
+"""
+
+from typing import *
+
+import numpy as np
+
+from algorithm import CardId, Deck, ManaColor, SetId, SetInfo
+
+mana_colors: Tuple[ManaColor, ...] = tuple(ManaColor)
+
+opening_hand_size = 7
+
+
+class CompiledDeck(NamedTuple):
+    # One entry per copy
+    card_ids: Sequence[CardId]
+    is_land: np.ndarray  # (copies,) bool
+    land_colors: np.ndarray  # (copies, colors) bool
+    mana_values: np.ndarray  # (copies,) int
+    color_requirements: np.ndarray  # (copies, colors) int
+
+
+class GoldfishResult(NamedTuple):
+    simulations: int
+    # Per turn, averaged over simulations
+    mean_mana_spent: np.ndarray
+    mean_lands_in_play: np.ndarray
+    # Fraction of simulations whose first spell is cast on each turn (the last entry: never)
+    first_spell_turns: np.ndarray
+    # Per card, the fraction of simulations in which a copy is first cast on each turn (the last entry: never)
+    first_play_turns: Mapping[CardId, np.ndarray]
+
+
+def compile_deck(deck: Deck, set_infos: Mapping[SetId, SetInfo]) -> CompiledDeck:
+    """
+    Describes every copy of a card in the deck by the arrays the simulation needs
+
+    :param deck: The deck
+    :param set_infos: Information about the sets of which the deck is drawn
+    :return: The compiled deck
+    """
+    card_ids: List[CardId] = []
+    is_land: List[bool] = []
+    land_colors: List[List[bool]] = []
+    mana_values: List[int] = []
+    color_requirements: List[List[int]] = []
+
+    for card_id, card_quantity in sorted(deck.items(), key=lambda item: (item[0][0] or '', item[0][1])):
+        set_id, card_number = card_id
+        set_info = set_infos[set_id]
+        card = set_info.cards[card_number]
+
+        lands = [set_info.card_types.lands[card_number, face_index]
+                 for face_index, _ in enumerate(card.faces)
+                 if (card_number, face_index) in set_info.card_types.lands]
+        colors = frozenset().union(*(land.possible_colors for land in lands))
+
+        # Spells are cast with their cheapest face
+        face = min(card.faces, key=lambda card_face: sum(card_face.mana_cost.values()))
+        requirements = [0] * len(mana_colors)
+        for face_colors, mana_quantity in face.mana_cost.items():
+            if len(face_colors) == 1 and ManaColor.ANY not in face_colors:
+                requirements[mana_colors.index(next(iter(face_colors)))] += mana_quantity
+        mana_value = card.converted_mana_cost if len(card.faces) == 1 else sum(face.mana_cost.values())
+
+        for _ in range(card_quantity):
+            card_ids.append(card_id)
+            is_land.append(bool(lands))
+            land_colors.append([mana_color in colors for mana_color in mana_colors])
+            mana_values.append(mana_value)
+            color_requirements.append(requirements)
+
+    return CompiledDeck(card_ids=card_ids,
+                        is_land=np.array(is_land, dtype=bool),
+                        land_colors=np.array(land_colors, dtype=bool).reshape((len(card_ids), len(mana_colors))),
+                        mana_values=np.array(mana_values, dtype=int),
+                        color_requirements=np.array(color_requirements, dtype=int).reshape((len(card_ids),
+                                                                                            len(mana_colors))))
+
+
+def simulate_goldfish(deck: Deck, set_infos: Mapping[SetId, SetInfo], turns: int = 8, simulations: int = 10000,
+                      seed: Optional[int] = None, on_the_play: bool = True) -> GoldfishResult:
+    """
+    Plays many shuffles of a deck at once
+
+    :param deck: The deck
+    :param set_infos: Information about the sets of which the deck is drawn
+    :param turns: The number of turns to play
+    :param simulations: The number of shuffles
+    :param seed: Seeds the shuffles for reproducibility
+    :param on_the_play: Whether the first turn skips its draw
+    :return: Mana spent, lands played and when spells are first cast
+    """
+    compiled = compile_deck(deck, set_infos)
+    copies = len(compiled.card_ids)
+    cards_seen = opening_hand_size + turns - (1 if on_the_play else 0)
+    if cards_seen > copies:
+        raise ValueError(f'A deck of {copies} cards runs out within {turns} turns')
+
+    rng = np.random.default_rng(seed)
+    # positions[s, i]: when copy i is drawn in simulation s
+    positions = rng.permuted(np.tile(np.arange(copies), (simulations, 1)), axis=1)
+
+    played = np.zeros((simulations, copies), dtype=bool)
+    lands_in_play = np.zeros(simulations, dtype=int)
+    sources = np.zeros((simulations, len(mana_colors)), dtype=int)
+    # turns + 1 (never) until cast
+    first_cast_turn = np.full((simulations, copies), turns + 1)
+
+    mana_spent = np.zeros((simulations, turns), dtype=int)
+    lands_per_turn = np.zeros((simulations, turns), dtype=int)
+
+    land_columns = np.flatnonzero(compiled.is_land)
+    # Greedy casting order: most expensive first
+    spell_columns = np.flatnonzero(~compiled.is_land)
+    spell_columns = spell_columns[np.argsort(-compiled.mana_values[spell_columns], kind='stable')]
+    simulation_indices = np.arange(simulations)
+
+    for turn in range(1, turns + 1):
+        drawn = positions < opening_hand_size + turn - (1 if on_the_play else 0)
+        in_hand = drawn & ~played
+
+        # Land drop: the earliest drawn land in hand
+        if land_columns.size:
+            land_positions = np.where(in_hand[:, land_columns], positions[:, land_columns], copies)
+            earliest = land_positions.argmin(axis=1)
+            has_land = land_positions[simulation_indices, earliest] < copies
+            land_played = land_columns[earliest[has_land]]
+            played[simulation_indices[has_land], land_played] = True
+            lands_in_play += has_land
+            sources[has_land] += compiled.land_colors[land_played]
+
+        # Spells
+        available_mana = lands_in_play.copy()
+        for column in spell_columns:
+            castable = in_hand[:, column] & (compiled.mana_values[column] <= available_mana) & \
+                (sources >= compiled.color_requirements[column]).all(axis=1)
+            available_mana -= np.where(castable, compiled.mana_values[column], 0)
+            played[:, column] |= castable
+            first_cast_turn[castable, column] = turn
+
+        mana_spent[:, turn - 1] = lands_in_play - available_mana
+        lands_per_turn[:, turn - 1] = lands_in_play
+
+    # Distributions over the turn of first cast (index turns: never)
+    first_spell = first_cast_turn[:, spell_columns].min(axis=1) if spell_columns.size \
+        else np.full(simulations, turns + 1)
+    first_spell_turns = np.bincount(first_spell - 1, minlength=turns + 1) / simulations
+
+    spell_copies: Dict[CardId, List[int]] = {}
+    for column in sorted(spell_columns):
+        spell_copies.setdefault(compiled.card_ids[column], []).append(column)
+    first_play_turns: Dict[CardId, np.ndarray] = {}
+    for card_id, columns in spell_copies.items():
+        first_play = first_cast_turn[:, columns].min(axis=1)
+        first_play_turns[card_id] = np.bincount(first_play - 1, minlength=turns + 1) / simulations
+
+    return GoldfishResult(simulations=simulations,
+                          mean_mana_spent=mana_spent.mean(axis=0),
+                          mean_lands_in_play=lands_per_turn.mean(axis=0),
+                          first_spell_turns=first_spell_turns,
+                          first_play_turns=first_play_turns)
+
+
+if __name__ == '__main__':
+    import argparse
+    from pathlib import Path
+
+    from deck_search import format_deck, load_pool
+    from lazy_loading import LazySetInfos
+
+    parser = argparse.ArgumentParser(description='Measure how quickly a deck deploys its curve against no opponent')
+    parser.add_argument('cards', metavar='RATING', type=Path, nargs='+',
+                        help='Ratings lists as CSVs, or directories of them')
+    parser.add_argument('--deck', metavar='DECK_FILE', type=argparse.FileType('r'), required=True,
+                        help='A YAML file listing the deck (in the format of --pool of algorithm.py)')
+    parser.add_argument('--turns', metavar='N', type=int, default=8,
+                        help='The number of turns to play (default: %(default)s)')
+    parser.add_argument('--simulations', metavar='N', type=int, default=10000,
+                        help='The number of shuffles to play (default: %(default)s)')
+    parser.add_argument('--draw', dest='on_the_play', action='store_false',
+                        help='Play on the draw (draw on the first turn)')
+    parser.add_argument('--seed', type=int,
+                        help='Seeds the shuffles for reproducibility')
+    args = parser.parse_args()
+
+    with args.deck as deck_file:
+        goldfish_deck = load_pool(deck_file)
+    deck_set_infos = LazySetInfos(args.cards).subset({set_id for set_id, _ in goldfish_deck})
+
+    result = simulate_goldfish(goldfish_deck, deck_set_infos, turns=args.turns, simulations=args.simulations,
+                               seed=args.seed, on_the_play=args.on_the_play)
+
+    print(f'{"Turn":>4} {"Mana spent":>10} {"Lands":>6} {"First spell":>11}')
+    for turn_index in range(args.turns):
+        print(f'{turn_index + 1:>4} {result.mean_mana_spent[turn_index]:>10.2f} '
+              f'{result.mean_lands_in_play[turn_index]:>6.2f} {result.first_spell_turns[turn_index]:>11.1%}')
+    print(f'Never cast a spell: {result.first_spell_turns[-1]:.1%}')
+    print()
+
+    print('Turn of first cast (median, or - if cast in fewer than half of the games):')
+    for goldfish_card_id, distribution in result.first_play_turns.items():
+        cumulative = np.cumsum(distribution[:-1])
+        median = f'{np.searchsorted(cumulative, .5) + 1}' if cumulative[-1] >= .5 else '-'
+        card_line = next(format_deck({goldfish_card_id: goldfish_deck[goldfish_card_id]}, deck_set_infos))
+        print(f'  {median:>2} {card_line}')
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+
+"""
+Incremental deck evaluation
+
+Keeps the running counts behind a :class:`algorithm.DeckSummary` so that adding, removing or swapping a card
+only touches that card's contribution instead of re-summarizing the whole deck.
+The optional castability penalty is kept the same way: the sources of each set of colors the spells require and the
+probability of each spell, which is only recomputed once an edit changes its sources (or the deck size).
+"""
+
+import math
+import operator
+from collections import defaultdict
+from itertools import accumulate
+from typing import *
+
+from algorithm import Archetype, CardId, Count, Deck, DeckEvaluation, DeckSummary, Index, ManaColor, SetId, SetInfo, \
+    converted_mana_cost_buckets, evaluate_deck
+from castability import CastabilityEvaluator
+from evaluation_cache import DeckKey, card_count_key, deck_key_bytes
+
+# Fractional counts (dual lands, split mana symbols) are kept as integers in units of 1 / fraction_units.
+# This keeps long sequences of additions and removals exact.
+# Divisible by every possible number of colors in a land or mana symbol (1 through len(ManaColor))
+fraction_units = 840
+
+mana_colors: Tuple[ManaColor, ...] = tuple(ManaColor)
+archetypes: Tuple[Archetype, ...] = tuple(Archetype)
+
+
+class CardDelta(NamedTuple):
+    land_units: Sequence[Tuple[Index, int]]
+    mana_symbol_units: Sequence[Tuple[Index, int]]
+    converted_mana_cost_index: Optional[Index]
+    archetype_indices: Sequence[Index]
+    is_dud: bool
+
+
+class Move(NamedTuple):
+    card_id: CardId
+    quantity: Count  # Negative for removals
+
+
+def compute_card_delta(card_id: CardId, set_infos: Mapping[SetId, SetInfo]) -> CardDelta:
+    """
+    Computes how a single copy of a card changes the deck counts
+
+    :param card_id: The card to describe
+    :param set_infos: Information about the set of which this card is drawn
+    :return: The card's contribution in integer units
+    """
+    set_id, card_number = card_id
+    contribution = set_infos[set_id].contributions[card_number]
+
+    # Every fraction in a contribution is a multiple of 1 / fraction_units, so rounding is exact
+    return CardDelta(land_units=tuple((mana_colors.index(mana_color), round(land_count * fraction_units))
+                                      for mana_color, land_count in contribution.land_counts),
+                     mana_symbol_units=tuple((mana_colors.index(mana_color), round(mana_symbol_count * fraction_units))
+                                             for mana_color, mana_symbol_count in contribution.mana_symbol_counts),
+                     converted_mana_cost_index=contribution.converted_mana_cost_index,
+                     archetype_indices=tuple(archetypes.index(archetype) for archetype in contribution.archetypes),
+                     is_dud=contribution.is_dud)
+
+
+class IncrementalDeckEvaluator:
+    """
+    A deck that can be edited one card at a time while keeping its summary and evaluation up to date.
+
+    The summary and evaluation are identical to ``summarize_deck(evaluator.deck, set_infos)`` and
+    ``evaluate_deck(...)`` of it, but each edit costs time proportional to the size of the edited card
+    rather than the size of the deck.
+    """
+
+    def __init__(self, set_infos: Mapping[SetId, SetInfo], deck: Deck = None, castability: bool = False):
+        """
+        :param set_infos: Information about the sets of which the deck is drawn
+        :param deck: The starting deck
+        :param castability: Whether to compute the optional castability penalty (see :mod:`castability`)
+        """
+        self.set_infos = set_infos
+        self._castability = CastabilityEvaluator(set_infos) if castability else None
+        self._card_deltas: Dict[CardId, CardDelta] = {}
+
+        # Deck counts
+        self._deck: Dict[CardId, Count] = {}
+        # XOR of the card_count_key of every card count
+        self._deck_key: int = 0
+        self._total_cards: int = 0
+        self._land_units: List[int] = [0] * len(mana_colors)
+        self._mana_symbol_units: List[int] = [0] * len(mana_colors)
+        # Copies of cards mentioning each color in their mana cost (a {0} cost still mentions a color)
+        self._mana_symbol_mentions: List[int] = [0] * len(mana_colors)
+        self._converted_mana_cost_counts: List[int] = [0] * converted_mana_cost_buckets
+        self._archetype_counts: List[int] = [0] * len(archetypes)
+        self._dud_count: int = 0
+
+        # Castability: lands producing any color of each required set of colors, the spells requiring each set,
+        # and the copies of every spell in the deck expected not to be castable on curve
+        # (None until computed for the current copies, sources and deck size)
+        self._sources: Dict[FrozenSet[ManaColor], int] = {}
+        self._spells_requiring: Dict[FrozenSet[ManaColor], Set[CardId]] = {}
+        self._spell_penalties: Dict[CardId, Optional[float]] = {}
+        self._penalty_deck_size: int = 0
+        # Whether land colors overlap required colors (intersecting the sets would hash every color)
+        self._overlaps: Dict[Tuple[FrozenSet[ManaColor], FrozenSet[ManaColor]], bool] = {}
+
+        self._history: List[Sequence[Move]] = []
+        self._evaluation: Optional[DeckEvaluation] = None
+
+        if deck is not None:
+            for card_id, card_quantity in deck.items():
+                self._apply(card_id, card_quantity)
+
+    @property
+    def deck(self) -> Deck:
+        """
+        The current deck. Do not mutate it; use :meth:`add`, :meth:`remove` or :meth:`swap` instead
+        """
+        return self._deck
+
+    @property
+    def deck_key(self) -> DeckKey:
+        """
+        The :func:`evaluation_cache.canonical_deck_key` of the current deck, kept up to date by every edit
+        """
+        return deck_key_bytes(self._deck_key)
+
+    @property
+    def total_cards(self) -> int:
+        return self._total_cards
+
+    def add(self, card_id: CardId, quantity: Count = 1):
+        """
+        Adds copies of a card to the deck
+
+        :param card_id: The card to add
+        :param quantity: How many copies to add
+        """
+        self._apply(card_id, quantity)
+        self._history.append((Move(card_id, quantity),))
+
+    def remove(self, card_id: CardId, quantity: Count = 1):
+        """
+        Removes copies of a card from the deck
+
+        :param card_id: The card to remove
+        :param quantity: How many copies to remove
+        """
+        self._apply(card_id, -quantity)
+        self._history.append((Move(card_id, -quantity),))
+
+    def swap(self, removed_card_id: CardId, added_card_id: CardId, quantity: Count = 1):
+        """
+        Replaces copies of one card with copies of another as a single undoable edit
+
+        :param removed_card_id: The card to remove
+        :param added_card_id: The card to add
+        :param quantity: How many copies to replace
+        """
+        self._apply(removed_card_id, -quantity)
+        try:
+            self._apply(added_card_id, quantity)
+        except Exception:
+            self._apply(removed_card_id, quantity)
+            raise
+        self._history.append((Move(removed_card_id, -quantity), Move(added_card_id, quantity)))
+
+    def undo(self):
+        """
+        Reverts the most recent :meth:`add`, :meth:`remove` or :meth:`swap`
+        """
+        try:
+            moves = self._history.pop()
+        except IndexError:
+            raise ValueError('Nothing to undo') from None
+
+        for card_id, quantity in reversed(moves):
+            self._apply(card_id, -quantity)
+
+    def clear_history(self):
+        """
+        Forgets every edit so far, making them permanent (keeps long searches from accumulating history)
+        """
+        self._history.clear()
+
+    def summary(self) -> DeckSummary:
+        """
+        Consolidates the running counts like :func:`algorithm.summarize_deck` would
+
+        :return: A summary of the deck's attributes
+        """
+        land_counts = {mana_color: units / fraction_units
+                       for mana_color, units in zip(mana_colors, self._land_units)
+                       if units > 0}
+        mana_symbol_counts = {mana_color: units / fraction_units
+                              for mana_color, units, mentions
+                              in zip(mana_colors, self._mana_symbol_units, self._mana_symbol_mentions)
+                              if mentions > 0}
+        converted_mana_cost_counts = self._converted_mana_cost_counts
+
+        # Summarize mana curve
+        total_converted_mana_cost_count = sum(converted_mana_cost_counts)
+        converted_mana_cost_pmf: Iterator[float] = (count / total_converted_mana_cost_count
+                                                    for count in converted_mana_cost_counts)
+        converted_mana_cost_cdf = tuple(accumulate(converted_mana_cost_pmf, operator.add))
+
+        # Summarize land percentage
+        total_land_count = sum(self._land_units) / fraction_units
+        total_land_ratio = total_land_count / self._total_cards
+
+        # Summarize land color percentage
+        total_mana_symbol_count = sum(self._mana_symbol_units) / fraction_units
+        mana_symbol_pmf: Dict[ManaColor, float] = {color: count / total_mana_symbol_count
+                                                   for color, count in mana_symbol_counts.items()}
+
+        land_color_pmf: Dict[ManaColor, float] = {color: count / total_land_count
+                                                  for color, count in land_counts.items()}
+
+        # Summarize color identity
+        deck_color_identity = set(mana_symbol_pmf.keys())
+        dominant_mana_colors: Set[ManaColor] = {mana_color
+                                                for mana_color, probability_mass in mana_symbol_pmf.items()
+                                                if probability_mass >= 0.05}
+        splash_mana_colors = deck_color_identity - dominant_mana_colors
+
+        archetype_counts: DefaultDict[Archetype, int] = defaultdict(int, (
+            (archetype, count)
+            for archetype, count in zip(archetypes, self._archetype_counts)
+            if count > 0))
+
+        return DeckSummary(total_cards=self._total_cards,
+                           converted_mana_cost_cdf=converted_mana_cost_cdf,
+                           total_land_ratio=total_land_ratio,
+                           mana_symbol_pmf=mana_symbol_pmf, land_color_pmf=land_color_pmf,
+                           color_identity=deck_color_identity,
+                           dominant_mana_colors=dominant_mana_colors, splash_mana_colors=splash_mana_colors,
+                           archetype_counts=archetype_counts, dud_count=self._dud_count)
+
+    def evaluation(self) -> DeckEvaluation:
+        """
+        Evaluates the current deck (cached until the next edit)
+
+        :return: The same penalties as :func:`algorithm.evaluate_deck` (and the castability penalty, if requested)
+        """
+        if self._evaluation is None:
+            self._evaluation = evaluate_deck(self.summary())
+            if self._castability is not None:
+                self._evaluation = self._evaluation._replace(castability_penalty=self._castability_penalty())
+        return self._evaluation
+
+    def _castability_penalty(self) -> float:
+        """
+        :return: The same penalty as :meth:`castability.CastabilityEvaluator.penalty`
+        """
+        spell_penalties = self._spell_penalties
+        if self._penalty_deck_size != self._total_cards:
+            # Every probability depends on the deck size
+            self._penalty_deck_size = self._total_cards
+            spell_penalties.update(dict.fromkeys(spell_penalties))
+
+        for card_id, penalty in spell_penalties.items():
+            if penalty is None:
+                probability = self._castability.probability(card_id, self._total_cards, self._sources)
+                spell_penalties[card_id] = self._deck[card_id] * (1 - probability)
+        return math.fsum(spell_penalties.values())
+
+    def _overlap(self, land_colors: FrozenSet[ManaColor], mana_colors: FrozenSet[ManaColor]) -> bool:
+        try:
+            return self._overlaps[land_colors, mana_colors]
+        except KeyError:
+            overlap = self._overlaps[land_colors, mana_colors] = bool(land_colors & mana_colors)
+            return overlap
+
+    def _apply_castability(self, card_id: CardId, old_quantity: Count, new_quantity: Count):
+        land_colors = self._castability.land_colors(card_id)
+        if land_colors is not None:
+            # The spells requiring any color the land produces have new sources
+            for mana_colors, spells in self._spells_requiring.items():
+                if self._overlap(land_colors, mana_colors):
+                    self._sources[mana_colors] += new_quantity - old_quantity
+                    for spell_id in spells:
+                        self._spell_penalties[spell_id] = None
+            return
+
+        if old_quantity == 0:
+            # A new spell may require new sets of colors
+            for mana_colors in self._castability.requirement_colors(card_id):
+                if mana_colors not in self._sources:
+                    sources = 0
+                    for other_card_id, card_quantity in self._deck.items():
+                        other_land_colors = self._castability.land_colors(other_card_id)
+                        if other_land_colors is not None and self._overlap(other_land_colors, mana_colors):
+                            sources += card_quantity
+                    self._sources[mana_colors] = sources
+                    self._spells_requiring[mana_colors] = set()
+                self._spells_requiring[mana_colors].add(card_id)
+        elif new_quantity == 0:
+            for mana_colors in self._castability.requirement_colors(card_id):
+                self._spells_requiring[mana_colors].discard(card_id)
+            del self._spell_penalties[card_id]
+            return
+        self._spell_penalties[card_id] = None
+
+    def _apply(self, card_id: CardId, quantity: Count):
+        if quantity == 0:
+            return
+
+        old_quantity = self._deck.get(card_id, 0)
+        new_quantity = old_quantity + quantity
+        if new_quantity < 0:
+            raise ValueError(f'Cannot remove {-quantity} copies of card {card_id}; '
+                             f'the deck only has {old_quantity}')
+
+        try:
+            delta = self._card_deltas[card_id]
+        except KeyError:
+            delta = self._card_deltas[card_id] = compute_card_delta(card_id, self.set_infos)
+
+        if new_quantity == 0:
+            del self._deck[card_id]
+        else:
+            self._deck[card_id] = new_quantity
+        self._deck_key ^= card_count_key(card_id, old_quantity) ^ card_count_key(card_id, new_quantity)
+
+        self._total_cards += quantity
+        for color_index, units in delta.land_units:
+            self._land_units[color_index] += quantity * units
+        for color_index, units in delta.mana_symbol_units:
+            self._mana_symbol_units[color_index] += quantity * units
+            self._mana_symbol_mentions[color_index] += quantity
+        if delta.converted_mana_cost_index is not None:
+            self._converted_mana_cost_counts[delta.converted_mana_cost_index] += quantity
+        for archetype_index in delta.archetype_indices:
+            self._archetype_counts[archetype_index] += quantity
+        if delta.is_dud:
+            self._dud_count += quantity
+        if self._castability is not None:
+            self._apply_castability(card_id, old_quantity, new_quantity)
+
+        self._evaluation = None
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+"""
+Opt-in hot path instrumentation
+
+:func:`enable` replaces the hot path functions of :mod:`algorithm` (wherever they have been imported) with wrappers
+that count calls and time them; :func:`disable` puts the originals back.
+While disabled, nothing is wrapped, so instrumentation costs nothing.
+Only calls made in this process are recorded (not those in worker processes).
+"""
+
+import cProfile
+import inspect
+import json
+import math
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from types import ModuleType
+from typing import *
+
+import algorithm
+
+default_functions = (
+    (algorithm, 'parse_cards_csv'),
+    (algorithm, 'summarize_deck'),
+    (algorithm, 'evaluate_deck'),
+    (algorithm, 'generate_booster_pack'),
+)
+
+# Durations are bucketed on a log scale with this many buckets per doubling (about 9% resolution)
+buckets_per_octave = 8
+
+reported_percentiles = (50, 90, 99)
+
+
+class FunctionStatistics:
+    """
+    Call count, cumulative time and a log-scale histogram of call durations
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.total_seconds = 0.
+        self.max_seconds = 0.
+        self.histogram: DefaultDict[int, int] = defaultdict(int)
+
+    def record(self, seconds: float):
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        nanoseconds = max(seconds * 1e9, 1.)
+        self.histogram[round(math.log2(nanoseconds) * buckets_per_octave)] += 1
+
+    def percentile(self, percentile: float) -> float:
+        """
+        :param percentile: Between 0 and 100
+        :return: An estimate of the call duration (in seconds) at this percentile
+        """
+        rank = percentile / 100 * self.calls
+        seen = 0
+        for bucket in sorted(self.histogram.keys()):
+            seen += self.histogram[bucket]
+            if seen >= rank:
+                return 2 ** (bucket / buckets_per_octave) / 1e9
+        return self.max_seconds
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'total_seconds': self.total_seconds,
+            'mean_seconds': self.total_seconds / self.calls if self.calls else None,
+            **{f'p{percentile}_seconds': self.percentile(percentile) if self.calls else None
+               for percentile in reported_percentiles},
+            'max_seconds': self.max_seconds,
+        }
+
+
+statistics: Dict[str, FunctionStatistics] = {}
+
+# Maps each installed wrapper to the function it wraps
+_originals: Dict[Callable, Callable] = {}
+
+
+def _replace_references(replacements: Mapping[Callable, Callable]):
+    for module in tuple(sys.modules.values()):
+        module_globals = getattr(module, '__dict__', None)
+        if not isinstance(module_globals, dict):
+            continue
+        for attribute, value in tuple(module_globals.items()):
+            try:
+                module_globals[attribute] = replacements[value]
+            except (KeyError, TypeError):
+                pass
+
+
+def _instrument(name: str, function: Callable) -> Callable:
+    function_statistics = statistics.setdefault(name, FunctionStatistics())
+
+    if inspect.isgeneratorfunction(function):
+        # Time the whole iteration, not just the creation of the generator
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return (yield from function(*args, **kwargs))
+            finally:
+                function_statistics.record(time.perf_counter() - start_time)
+    else:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                function_statistics.record(time.perf_counter() - start_time)
+
+    return wrapper
+
+
+def is_enabled() -> bool:
+    return bool(_originals)
+
+
+def enable(functions: Iterable[Tuple[ModuleType, str]] = default_functions):
+    """
+    Starts instrumenting functions.
+    Every module-level reference to each function is replaced, including ``from algorithm import ...`` copies in
+    modules that have already been imported (import the modules that use these functions before enabling)
+
+    :param functions: The (module, function name) pairs to instrument
+    """
+    if is_enabled():
+        raise RuntimeError('Instrumentation is already enabled')
+
+    wrappers = {}
+    for module, name in functions:
+        original = getattr(module, name)
+        wrappers[original] = _instrument(name, original)
+
+    _replace_references(wrappers)
+    _originals.update((wrapper, original) for original, wrapper in wrappers.items())
+
+
+def disable():
+    """
+    Restores the original functions everywhere, including modules imported while enabled
+    (the collected statistics are kept)
+    """
+    _replace_references(_originals)
+    _originals.clear()
+
+
+def reset():
+    statistics.clear()
+
+
+def report() -> Dict[str, Dict[str, Any]]:
+    """
+    :return: The statistics of every instrumented function, JSON-serializable
+    """
+    return {name: function_statistics.to_json() for name, function_statistics in statistics.items()}
+
+
+def dump(file: TextIO):
+    json.dump(report(), file, indent=2)
+    file.write('\n')
+
+
+@contextmanager
+def instrumented(functions: Iterable[Tuple[ModuleType, str]] = default_functions):
+    enable(functions)
+    try:
+        yield statistics
+    finally:
+        disable()
+
+
+@contextmanager
+def profiled(profile_path: str):
+    """
+    Runs the enclosed block under cProfile and saves the profile (view it with ``python -m pstats``)
+
+    :param profile_path: Where to save the profile
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+
+
+@contextmanager
+def traced_memory(file: TextIO = sys.stderr, limit: int = 10):
+    """
+    Traces memory allocations in the enclosed block and prints the peak and the largest allocation sites
+
+    :param file: Where to print the report
+    :param limit: The number of allocation sites to print
+    """
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        _, peak_memory = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        print(f'Peak traced memory: {peak_memory / 1024:.1f} KiB', file=file)
+        for statistic in snapshot.statistics('lineno')[:limit]:
+            print(f'  {statistic}', file=file)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+"""
+Lazy multi-set loading
+
+:class:`LazySetInfos` indexes many ratings lists up front (reading only the set column) and parses a set's files
+the first time the set is looked up, e.g. by ``set_infos[set_id]`` in :func:`algorithm.summarize_deck`.
+Files are loaded through :func:`card_cache.load_cards_csv`, so unchanged files come from their compiled caches,
+and independent files can be loaded in parallel worker processes with :meth:`LazySetInfos.preload`.
+With ``compact=True``, each set's cards are stored in a :class:`card_table.CardTable` once materialized.
+"""
+
+import csv
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import *
+
+from algorithm import SetId, SetInfo, add_card, basic_land_info, create_set_info, get_card_type_infos
+from card_cache import load_cards_csv
+from card_table import compact_set_info
+
+
+def find_csv_files(paths: Iterable[Union[str, Path]]) -> List[Path]:
+    """
+    :param paths: Ratings lists, or directories to search (recursively) for them
+    :return: The ratings lists, in a stable order
+    """
+    csv_paths: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            csv_paths.extend(sorted(path.rglob('*.csv')))
+        else:
+            csv_paths.append(path)
+    return csv_paths
+
+
+def index_csv_file(csv_path: Path) -> Set[SetId]:
+    """
+    :param csv_path: A ratings list, with a header row
+    :return: The sets with cards in the file
+    """
+    with open(csv_path, newline='') as cards_file:
+        cards_csv: Iterator[List[str]] = csv.reader(cards_file)
+        _ = next(cards_csv, None)  # Skip header row
+        return {row[0] for row in cards_csv if row}
+
+
+def merge_set_infos(parts: Sequence[SetInfo]) -> SetInfo:
+    """
+    Combines the cards of a set that is spread over several files (later parts win for duplicate card numbers)
+    """
+    if len(parts) == 1:
+        return parts[0]
+
+    set_info = create_set_info()
+    for part in parts:
+        for card_number, card in part.cards.items():
+            add_card(set_info, card_number, card, get_card_type_infos(part, card_number))
+    return set_info
+
+
+class LazySetInfos(Mapping[SetId, SetInfo]):
+    """
+    A read-only mapping of every set in many ratings lists, parsing each set's files on first access.
+    Safe to share between threads
+    """
+
+    def __init__(self, paths: Iterable[Union[str, Path]], use_cache: bool = True, include_basic_lands: bool = True,
+                 compact: bool = False):
+        """
+        :param paths: Ratings lists, or directories of them
+        :param use_cache: Whether to read and write the compiled cache of each file
+        :param include_basic_lands: Whether to map None to ``basic_land_info``
+        :param compact: Whether to store the cards of each set column by column (see :mod:`card_table`),
+            which takes less memory
+        """
+        self.csv_paths = find_csv_files(paths)
+        self.use_cache = use_cache
+        self.compact = compact
+
+        self._files_by_set: Dict[SetId, List[Path]] = {}
+        for csv_path in self.csv_paths:
+            for set_id in index_csv_file(csv_path):
+                self._files_by_set.setdefault(set_id, []).append(csv_path)
+        if include_basic_lands:
+            self._files_by_set[None] = []
+
+        self._set_infos: Dict[SetId, SetInfo] = {None: basic_land_info} if include_basic_lands else {}
+        self._file_set_infos: Dict[Path, Dict[SetId, SetInfo]] = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, set_id: SetId) -> SetInfo:
+        try:
+            return self._set_infos[set_id]
+        except KeyError:
+            pass
+
+        csv_paths = self._files_by_set[set_id]
+        with self._lock:
+            for csv_path in csv_paths:
+                if csv_path not in self._file_set_infos:
+                    self._file_set_infos[csv_path] = load_cards_csv(csv_path, use_cache=self.use_cache)
+            return self._materialize(set_id)
+
+    def _materialize(self, set_id: SetId) -> SetInfo:
+        try:
+            return self._set_infos[set_id]
+        except KeyError:
+            set_info = merge_set_infos([self._file_set_infos[csv_path][set_id]
+                                        for csv_path in self._files_by_set[set_id]])
+            if self.compact:
+                set_info = compact_set_info(set_info)
+            self._set_infos[set_id] = set_info
+
+            # Files whose sets are all materialized are no longer needed
+            for csv_path in self._files_by_set[set_id]:
+                if all(file_set_id in self._set_infos for file_set_id in self._file_set_infos[csv_path]):
+                    del self._file_set_infos[csv_path]
+            return set_info
+
+    def __iter__(self) -> Iterator[SetId]:
+        return iter(self._files_by_set)
+
+    def __len__(self) -> int:
+        return len(self._files_by_set)
+
+    def __contains__(self, set_id: object) -> bool:
+        return set_id in self._files_by_set
+
+    def is_loaded(self, set_id: SetId) -> bool:
+        return set_id in self._set_infos
+
+    def loaded(self) -> Dict[SetId, SetInfo]:
+        """
+        :return: The sets materialized so far (a plain dict, e.g. to send to worker processes)
+        """
+        with self._lock:
+            return dict(self._set_infos)
+
+    def subset(self, set_ids: Iterable[SetId]) -> Dict[SetId, SetInfo]:
+        """
+        :param set_ids: The sets to materialize
+        :return: Just these sets (and basic lands, if included) as a plain dict
+        """
+        subset = {set_id: self[set_id] for set_id in set_ids}
+        if None in self._files_by_set:
+            subset[None] = self[None]
+        return subset
+
+    def preload(self, set_ids: Optional[Iterable[SetId]] = None, workers: Optional[int] = None):
+        """
+        Materializes sets ahead of time, parsing their files in parallel
+
+        :param set_ids: The sets to load (defaults to every set)
+        :param workers: The number of processes (defaults to the number of CPUs; 1 loads in this process)
+        """
+        set_ids = list(self._files_by_set if set_ids is None else set_ids)
+        with self._lock:
+            set_ids = [set_id for set_id in set_ids if set_id not in self._set_infos]
+            csv_paths = sorted({csv_path for set_id in set_ids for csv_path in self._files_by_set[set_id]
+                                if csv_path not in self._file_set_infos})
+            load = partial(load_cards_csv, use_cache=self.use_cache)
+            if workers == 1 or len(csv_paths) <= 1:
+                file_set_infos = map(load, csv_paths)
+                self._file_set_infos.update(zip(csv_paths, file_set_infos))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    self._file_set_infos.update(zip(csv_paths, executor.map(load, csv_paths)))
+
+            for set_id in set_ids:
+                self._materialize(set_id)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""
+Mana base solver
+
+Completes the spells of a deck with the best basic lands. Given the other cards, the basic land count decides every
+penalty of :func:`algorithm.evaluate_deck` except the mana symbol penalty, which only depends on how the basic lands
+are split between the five colors. The split is found exactly, by dynamic programming over the colors of the
+spells (colors no spell mentions are never compared, so any surplus goes to one of them at no cost).
+Spell lists which would leave the deck outside the 16 to 18 lands per 40 cards of the land ratio penalty are
+rejected, with the number of cards to cut or add.
+"""
+
+import math
+from typing import *
+
+from algorithm import CardId, Count, Deck, DeckEvaluation, Index, SetId, SetInfo, basic_land_info
+from incremental_evaluation import IncrementalDeckEvaluator, compute_card_delta, fraction_units, mana_colors
+
+# The basic land of each color, keyed by the color's index in mana_colors
+basic_lands_by_color: Dict[Index, CardId] = {
+    mana_colors.index(next(iter(land.possible_colors))): (None, card_number)
+    for (card_number, _), land in basic_land_info.card_types.lands.items()
+}
+
+
+class ManaBase(NamedTuple):
+    deck: Deck
+    basic_lands: Mapping[CardId, Count]
+    evaluation: DeckEvaluation
+
+
+def land_ratio_penalty(land_count: float, deck_size: int) -> float:
+    """
+    The land ratio penalty of :func:`algorithm.evaluate_deck`
+    """
+    total_land_ratio = land_count / deck_size
+    penalty = 0 if 16 / 40 <= total_land_ratio <= 18 / 40 else 20 * abs(17 / 40 - total_land_ratio)
+    if total_land_ratio >= .75:
+        penalty *= 1000
+    return penalty
+
+
+def land_window(deck_size: int) -> Tuple[int, int]:
+    """
+    :param deck_size: The number of cards in the deck
+    :return: The fewest and the most lands without a land ratio penalty
+    """
+    return math.ceil(16 / 40 * deck_size), math.floor(18 / 40 * deck_size)
+
+
+def best_basic_land_split(mana_symbol_units: Sequence[int], mana_symbol_mentions: Sequence[int],
+                          nonbasic_land_units: Sequence[int], basic_land_count: int) -> Tuple[float, Sequence[int]]:
+    """
+    Splits basic lands between the five colors to minimize the mana symbol penalty of :func:`algorithm.evaluate_deck`
+    (the only penalty which depends on the colors of the basic lands)
+
+    :param mana_symbol_units: Mana symbols of the rest of the deck per color (in fractional units)
+    :param mana_symbol_mentions: Copies of cards mentioning each color in their mana cost
+    :param nonbasic_land_units: Land counts of the rest of the deck per color (in fractional units)
+    :param basic_land_count: The number of basic lands to split
+    :return: The mana symbol penalty and the number of basic lands of each color (indexed like ``mana_colors``)
+    """
+    total_mana_symbols = sum(mana_symbol_units)
+    total_lands = sum(nonbasic_land_units) + basic_land_count * fraction_units
+
+    # Colors which are in both the mana symbol and the land distributions are compared
+    fixed_penalty = 0.
+    if total_lands:
+        for color_index, land_units in enumerate(nonbasic_land_units):
+            if land_units and mana_symbol_mentions[color_index] and color_index not in basic_lands_by_color:
+                fixed_penalty += abs(mana_symbol_units[color_index] / total_mana_symbols - land_units / total_lands)
+
+    compared_colors = [color_index for color_index in basic_lands_by_color if mana_symbol_mentions[color_index]]
+    free_colors = [color_index for color_index in basic_lands_by_color if not mana_symbol_mentions[color_index]]
+
+    # best[k]: the lowest penalty of the compared colors so far using k basic lands
+    best = [0.] + [math.inf] * basic_land_count
+    choices: List[List[int]] = []
+    for color_index in compared_colors:
+        mana_symbol_mass = mana_symbol_units[color_index] / total_mana_symbols
+        land_units = nonbasic_land_units[color_index]
+        costs = [abs(mana_symbol_mass - (land_units + quantity * fraction_units) / total_lands)
+                 if land_units or quantity else 0.
+                 for quantity in range(basic_land_count + 1)]
+
+        new_best = [math.inf] * (basic_land_count + 1)
+        choice = [0] * (basic_land_count + 1)
+        for total in range(basic_land_count + 1):
+            for quantity in range(total + 1):
+                cost = best[total - quantity] + costs[quantity]
+                if cost < new_best[total]:
+                    new_best[total], choice[total] = cost, quantity
+        best = new_best
+        choices.append(choice)
+
+    # Lands of a color no spell mentions cost nothing, so that color takes whatever the compared colors leave
+    if free_colors:
+        used = min(range(basic_land_count + 1), key=best.__getitem__)
+    else:
+        used = basic_land_count
+
+    # Reconstruct
+    split = [0] * len(mana_colors)
+    if free_colors:
+        split[free_colors[0]] = basic_land_count - used
+    remaining = used
+    for color_index, choice in zip(reversed(compared_colors), reversed(choices)):
+        split[color_index] = choice[remaining]
+        remaining -= choice[remaining]
+
+    return fixed_penalty + best[used], split
+
+
+def solve_mana_base(spells: Deck, set_infos: Mapping[SetId, SetInfo], deck_size: int = 40,
+                    basic_land_counts: Optional[Iterable[int]] = None) -> ManaBase:
+    """
+    Completes a deck with the basic lands which minimize its total penalty
+
+    :param spells: The rest of the deck (nonbasic lands included; any basic lands are replaced)
+    :param set_infos: Information about the sets of which the deck is drawn
+    :param deck_size: The number of cards in the completed deck
+    :param basic_land_counts: The numbers of basic lands to consider (defaults to filling the deck to ``deck_size``,
+        which must leave it with as many lands as the land ratio penalty allows)
+    :return: The completed deck, its basic lands and its evaluation
+    """
+    spells = {card_id: quantity for card_id, quantity in spells.items()
+              if quantity > 0 and card_id not in basic_lands_by_color.values()}
+    spell_count = sum(spells.values())
+    if spell_count > deck_size:
+        raise ValueError(f'{spell_count} cards do not fit in a deck of {deck_size}')
+
+    mana_symbol_units = [0] * len(mana_colors)
+    mana_symbol_mentions = [0] * len(mana_colors)
+    land_units = [0] * len(mana_colors)
+    for card_id, quantity in spells.items():
+        delta = compute_card_delta(card_id, set_infos)
+        for color_index, units in delta.land_units:
+            land_units[color_index] += quantity * units
+        for color_index, units in delta.mana_symbol_units:
+            mana_symbol_units[color_index] += quantity * units
+            mana_symbol_mentions[color_index] += quantity
+
+    if basic_land_counts is None:
+        basic_land_count = deck_size - spell_count
+        land_count = sum(land_units) / fraction_units + basic_land_count
+        fewest_lands, most_lands = land_window(deck_size)
+        if not fewest_lands <= land_count <= most_lands:
+            change = f'cut {math.ceil(fewest_lands - land_count)}' if land_count < fewest_lands \
+                else f'add {math.ceil(land_count - most_lands)}'
+            raise ValueError(f'Completing {spell_count} cards with {basic_land_count} basic lands gives '
+                             f'{land_count:g} lands, but a deck of {deck_size} needs {fewest_lands} to {most_lands}: '
+                             f'{change} nonland cards')
+        basic_land_counts = (basic_land_count,)
+
+    evaluator = IncrementalDeckEvaluator(set_infos, spells)
+    best: Optional[ManaBase] = None
+    for basic_land_count in basic_land_counts:
+        if basic_land_count < 0:
+            raise ValueError(f'Cannot complete {spell_count} cards with {basic_land_count} basic lands')
+
+        try:
+            _, split = best_basic_land_split(mana_symbol_units, mana_symbol_mentions, land_units, basic_land_count)
+        except ZeroDivisionError:
+            continue  # No lands at all, or only colorless mana symbols of mentioned colors
+        basic_lands = {basic_lands_by_color[color_index]: quantity
+                       for color_index, quantity in enumerate(split) if quantity}
+
+        for card_id, quantity in basic_lands.items():
+            evaluator.add(card_id, quantity)
+        try:
+            evaluation = evaluator.evaluation()
+        except ZeroDivisionError:
+            evaluation = None
+        for card_id, quantity in basic_lands.items():
+            evaluator.remove(card_id, quantity)
+
+        if evaluation is not None and (best is None or sum(evaluation) < sum(best.evaluation)):
+            best = ManaBase(deck={**spells, **basic_lands}, basic_lands=basic_lands, evaluation=evaluation)
+
+    if best is None:
+        raise ValueError('No completion of the deck could be evaluated')
+    return best
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+"""
+Pareto front of decks
+
+Keeps the decks which no other deck beats on every :class:`algorithm.DeckEvaluation` penalty, so that players can
+trade the mana curve off against color consistency or archetype coverage instead of relying on the summed penalty.
+
+The front is stored in an ND-tree: every node bounds the points below it by their ideal point (the component-wise
+minimum) and nadir point (the component-wise maximum). A new point is rejected as soon as a node's nadir weakly
+dominates it, removes whole subtrees whose ideal it weakly dominates, and only compares itself with the points of
+the nodes whose bounds overlap it, so inserting into a front of thousands of decks touches a few small leaves
+rather than every deck. The bounds are widened on insertion but not narrowed on removal, which keeps them valid.
+"""
+
+import operator
+from typing import *
+
+from algorithm import Deck, DeckEvaluation, SetId, SetInfo
+
+Objectives = Sequence[float]
+T = TypeVar('T')
+
+
+def weakly_dominates(first: Objectives, second: Objectives) -> bool:
+    """
+    :return: Whether ``first`` is no worse than ``second`` in every objective (all minimized)
+    """
+    return all(map(operator.le, first, second))
+
+
+class _Node(Generic[T]):
+    __slots__ = ('ideal', 'nadir', 'entries', 'children')
+
+    def __init__(self, entries: List[Tuple[Objectives, T]]):
+        self.entries = entries
+        self.children: List[_Node[T]] = []
+        self.ideal = [min(values) for values in zip(*(point for point, _ in entries))]
+        self.nadir = [max(values) for values in zip(*(point for point, _ in entries))]
+
+    def is_empty(self) -> bool:
+        return not self.entries and not self.children
+
+    def iterate(self) -> Iterator[Tuple[Objectives, T]]:
+        yield from self.entries
+        for child in self.children:
+            yield from child.iterate()
+
+
+class ParetoFront(Generic[T]):
+    """
+    The non-dominated points seen so far (all objectives are minimized), each with an item such as a deck.
+    Of several points with the same objectives, only one is kept
+    """
+
+    def __init__(self, max_leaf_size: int = 20, branching: int = 8):
+        """
+        :param max_leaf_size: The number of points a leaf holds before it is split
+        :param branching: The number of children a split leaf gets
+        """
+        if max_leaf_size < branching or branching < 2:
+            raise ValueError(f'Cannot split leaves of {max_leaf_size} points into {branching} children')
+        self.max_leaf_size = max_leaf_size
+        self.branching = branching
+        self._root: Optional[_Node[T]] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Tuple[Objectives, T]]:
+        """
+        :return: The points of the front and their items, in no particular order
+        """
+        if self._root is not None:
+            yield from self._root.iterate()
+
+    def is_dominated(self, point: Objectives) -> bool:
+        """
+        :return: Whether a point of the front weakly dominates ``point`` (so adding it would not change the front)
+        """
+        return self._root is not None and self._is_dominated(self._root, point)
+
+    def _is_dominated(self, node: _Node[T], point: Objectives) -> bool:
+        if weakly_dominates(node.nadir, point):
+            return True
+        if not weakly_dominates(node.ideal, point):
+            return False
+        if node.children:
+            return any(self._is_dominated(child, point) for child in node.children)
+        return any(weakly_dominates(other_point, point) for other_point, _ in node.entries)
+
+    def add(self, point: Objectives, item: T) -> bool:
+        """
+        Adds a point to the front unless a point of the front weakly dominates it,
+        removing the points it dominates
+
+        :param point: The objectives
+        :param item: Kept with the point
+        :return: Whether the point was added
+        """
+        point = tuple(point)
+        if self._root is not None:
+            if not self._update(self._root, point):
+                return False
+            if self._root.is_empty():
+                self._root = None
+
+        if self._root is None:
+            self._root = _Node([(point, item)])
+        else:
+            self._insert(self._root, point, item)
+        self._size += 1
+        return True
+
+    def _remove_subtree(self, node: _Node[T]):
+        self._size -= sum(1 for _ in node.iterate())
+        node.entries, node.children = [], []
+
+    def _update(self, node: _Node[T], point: Objectives) -> bool:
+        """
+        Removes the points ``point`` dominates from the subtree
+
+        :return: False if a point of the subtree weakly dominates ``point``
+        """
+        if weakly_dominates(node.nadir, point):
+            return False
+        if weakly_dominates(point, node.ideal):
+            self._remove_subtree(node)
+            return True
+        if not weakly_dominates(point, node.nadir) and not weakly_dominates(node.ideal, point):
+            # No point below can dominate or be dominated by the new point
+            return True
+
+        if node.children:
+            for child in node.children:
+                if not self._update(child, point):
+                    return False
+            node.children = [child for child in node.children if not child.is_empty()]
+            if len(node.children) == 1:
+                # Collapse a chain of single children
+                child, = node.children
+                node.entries, node.children = child.entries, child.children
+        else:
+            kept: List[Tuple[Objectives, T]] = []
+            for other_point, other_item in node.entries:
+                if weakly_dominates(other_point, point):
+                    return False
+                if not weakly_dominates(point, other_point):
+                    kept.append((other_point, other_item))
+            self._size -= len(node.entries) - len(kept)
+            node.entries = kept
+        return True
+
+    def _insert(self, node: _Node[T], point: Objectives, item: T):
+        while True:
+            node.ideal = [min(bound, value) for bound, value in zip(node.ideal, point)]
+            node.nadir = [max(bound, value) for bound, value in zip(node.nadir, point)]
+            if not node.children:
+                break
+
+            # Descend into the child whose bounding box is centered closest to the point
+            def distance(child: _Node[T]) -> float:
+                return sum(((low + high) / 2 - value) ** 2 for low, high, value in zip(child.ideal, child.nadir, point))
+
+            node = min(node.children, key=distance)
+
+        node.entries.append((point, item))
+        if len(node.entries) > self.max_leaf_size:
+            self._split(node)
+
+    def _split(self, node: _Node[T]):
+        # Split along the objective in which the leaf's points spread most
+        spreads = [high - low for low, high in zip(node.ideal, node.nadir)]
+        objective = spreads.index(max(spreads))
+        entries = sorted(node.entries, key=lambda entry: entry[0][objective])
+        chunk_size = -(-len(entries) // self.branching)
+        node.children = [_Node(entries[start:start + chunk_size]) for start in range(0, len(entries), chunk_size)]
+        node.entries = []
+
+
+class DeckFront(ParetoFront[Deck]):
+    """
+    A Pareto front of decks over the components of their evaluation
+    """
+
+    def add_deck(self, evaluation: DeckEvaluation, deck: Optional[Deck] = None,
+                 deck_factory: Optional[Callable[[], Deck]] = None) -> bool:
+        """
+        :param evaluation: The deck's penalties
+        :param deck: The deck (copied only when it joins the front)
+        :param deck_factory: Builds the deck instead, only when it joins the front
+        :return: Whether the deck joined the front
+        """
+        if (deck is None) == (deck_factory is None):
+            raise ValueError('Either a deck or a deck factory is required')
+        if self.is_dominated(evaluation):
+            return False
+        if deck is None:
+            deck = deck_factory()
+        return self.add(evaluation, {card_id: card_quantity for card_id, card_quantity in deck.items()
+                                     if card_quantity})
+
+    def to_json(self, set_infos: Mapping[SetId, SetInfo]) -> List[Dict[str, Any]]:
+        """
+        :param set_infos: Information about the sets of which the decks are drawn (for the card names)
+        :return: Every deck of the front with its penalties, lowest total penalty first.
+            Cards are listed like in the pool files of :func:`deck_search.load_pool`
+        """
+        decks: List[Dict[str, Any]] = []
+        for point, deck in self:
+            evaluation = DeckEvaluation(*point)
+            cards: List[Dict[str, Any]] = []
+            for (set_id, card_number), card_quantity in sorted(deck.items(),
+                                                               key=lambda item: (item[0][0] or '', item[0][1])):
+                card = set_infos[set_id].cards[card_number]
+                cards.append({'set': set_id, 'card_number': card_number,
+                              'name': ' // '.join(face.name for face in card.faces), 'quantity': card_quantity})
+            decks.append({'penalties': evaluation._asdict(), 'total_penalty': sum(evaluation), 'cards': cards})
+
+        decks.sort(key=lambda deck_json: deck_json['total_penalty'])
+        return decks
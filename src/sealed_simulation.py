@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+"""
+Monte Carlo sealed event simulation
+
+Opens many sealed pools, builds a deck from each with :func:`deck_search.anneal_deck`
+and reports the distribution of the resulting penalties and how often each card makes the deck.
+Pools are opened inside the worker processes by per-pool streams of a :class:`booster_packs.BoosterPackGenerator`
+and only the resulting decks are sent back, so memory use does not grow with the number of pools.
+"""
+
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import *
+
+import numpy as np
+
+from algorithm import CardId, Deck, DeckEvaluation, SetId, SetInfo
+from booster_packs import BoosterPackGenerator
+from deck_search import anneal_deck, initial_deck
+
+percentiles = (5, 25, 50, 75, 95)
+
+
+class PoolOutcome(NamedTuple):
+    pool: Mapping[CardId, int]
+    deck: Deck
+    evaluation: DeckEvaluation
+
+
+class SimulationStatistics:
+    """
+    Accumulates pool outcomes as they stream in
+    """
+
+    def __init__(self):
+        self.pool_count = 0
+        self.penalties: List[Sequence[float]] = []
+        # Number of pools containing each card, and the number of those pools whose deck plays it
+        self.card_offered: Counter[CardId] = Counter()
+        self.card_included: Counter[CardId] = Counter()
+
+    def add(self, outcome: PoolOutcome):
+        self.pool_count += 1
+        self.penalties.append((*outcome.evaluation, sum(outcome.evaluation)))
+        self.card_offered.update(outcome.pool.keys())
+        self.card_included.update(card_id for card_id in outcome.deck.keys() if card_id in outcome.pool)
+
+    def penalty_percentiles(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: For each penalty (and the total), its mean and percentiles across pools
+        """
+        penalties = np.array(self.penalties, dtype=float).reshape((-1, len(DeckEvaluation._fields) + 1))
+        statistics: Dict[str, Dict[str, float]] = {}
+        for column, penalty_name in enumerate((*DeckEvaluation._fields, 'total_penalty')):
+            values = penalties[:, column]
+            statistics[penalty_name] = {
+                'mean': float(values.mean()),
+                **{f'p{percentile}': float(value)
+                   for percentile, value in zip(percentiles, np.percentile(values, percentiles))},
+            }
+        return statistics
+
+    def inclusion_rates(self, set_infos: Mapping[SetId, SetInfo]) -> List[Dict[str, Any]]:
+        """
+        :param set_infos: Information about the sets of which the pools are drawn
+        :return: For each card that appeared in a pool, how often it was played when available (most played first)
+        """
+        rates = []
+        for card_id, offered in self.card_offered.items():
+            set_id, card_number = card_id
+            rates.append({
+                'set': set_id,
+                'card_number': card_number,
+                'name': ' // '.join(face.name for face in set_infos[set_id].cards[card_number].faces),
+                'pools': offered,
+                'inclusion_rate': self.card_included[card_id] / offered,
+            })
+        rates.sort(key=lambda rate: (-rate['inclusion_rate'], -rate['pools'], rate['card_number']))
+        return rates
+
+    def report(self, set_infos: Mapping[SetId, SetInfo]) -> Dict[str, Any]:
+        return {
+            'pools': self.pool_count,
+            'penalties': self.penalty_percentiles(),
+            'cards': self.inclusion_rates(set_infos),
+        }
+
+
+# Set by _initialize_worker in each worker process so that set_infos are only transferred once per worker
+_worker_set_infos: Optional[Mapping[SetId, SetInfo]] = None
+
+
+def _initialize_worker(set_infos: Mapping[SetId, SetInfo]):
+    global _worker_set_infos
+    _worker_set_infos = set_infos
+
+
+def simulate_pool(set_infos: Mapping[SetId, SetInfo], set_id: SetId, pack_generator: BoosterPackGenerator,
+                  packs: int, iterations: int, use_evaluation_cache: bool = True) -> PoolOutcome:
+    """
+    Opens one sealed pool and builds a deck from it
+
+    :param set_infos: Information about the sets (including basic lands)
+    :param set_id: The set to open booster packs from
+    :param pack_generator: The pool's own stream of booster packs, which also seeds the search
+    :param packs: The number of booster packs in the pool
+    :param iterations: The search budget
+    :param use_evaluation_cache: Whether the search remembers the evaluations of the decks it has seen
+    :return: The pool, the deck built from it and the deck's evaluation
+    """
+    pool: Counter[CardId] = Counter()
+    for card_number in pack_generator.generate(packs).ravel().tolist():
+        pool[set_id, card_number] += 1
+    search_seed = int(pack_generator.rng.integers(1 << 63))
+
+    result = anneal_deck(pool, set_infos, iterations=iterations, seed=search_seed,
+                         starting_deck=initial_deck(pool, set_infos), use_evaluation_cache=use_evaluation_cache)
+    return PoolOutcome(pool=dict(pool), deck=result.deck, evaluation=result.evaluation)
+
+
+def _simulate_pool_in_worker(set_id: SetId, pack_generator: BoosterPackGenerator, packs: int, iterations: int,
+                             use_evaluation_cache: bool) -> PoolOutcome:
+    return simulate_pool(_worker_set_infos, set_id, pack_generator, packs, iterations, use_evaluation_cache)
+
+
+def simulate_sealed(set_infos: Mapping[SetId, SetInfo], set_id: SetId, pools: int, packs: int = 6,
+                    iterations: int = 2000, workers: Optional[int] = None,
+                    seed: Optional[int] = None, use_evaluation_cache: bool = True) -> Iterator[PoolOutcome]:
+    """
+    Simulates many sealed pools, yielding each outcome as soon as it is available (in pool order)
+
+    :param set_infos: Information about the sets (including basic lands)
+    :param set_id: The set to open booster packs from
+    :param pools: The number of pools to simulate
+    :param packs: The number of booster packs per pool
+    :param iterations: The deck search budget per pool
+    :param workers: The number of processes (defaults to the number of CPUs; 1 runs in this process)
+    :param seed: Seeds the simulation for reproducibility
+    :param use_evaluation_cache: Whether each deck search remembers the evaluations of the decks it has seen
+    :return: The outcome of each pool
+    """
+    # parse_cards_csv returns a defaultdict with an unpicklable default factory
+    set_infos = dict(set_infos)
+    # Unseeded simulations differ from run to run. Spawning one stream at a time gives the same streams as
+    # spawning them all at once, without holding every pool's generator
+    root_generator = BoosterPackGenerator(set_infos[set_id], seed=seed)
+    pack_generators = (pack_generator for _ in range(pools) for pack_generator in root_generator.spawn(1))
+
+    if workers == 1:
+        for pack_generator in pack_generators:
+            yield simulate_pool(set_infos, set_id, pack_generator, packs, iterations, use_evaluation_cache)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker,
+                             initargs=(set_infos,)) as executor:
+        # Large enough chunks to amortize inter-process overhead, small enough to keep every worker busy
+        chunk_size = max(1, min(64, pools // (4 * (workers or os.cpu_count() or 1))))
+        yield from executor.map(partial(_simulate_pool_in_worker, set_id, packs=packs, iterations=iterations,
+                                        use_evaluation_cache=use_evaluation_cache),
+                                pack_generators, chunksize=chunk_size)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    from pathlib import Path
+
+    from algorithm import basic_land_info
+    from card_cache import load_cards_csv
+    from card_table import compact_set_infos
+
+    parser = argparse.ArgumentParser(description='Simulate sealed events and report the achievable deck quality')
+    parser.add_argument('cards', metavar='RATING', type=Path,
+                        help='The ratings list as a CSV')
+    parser.add_argument('--set', metavar='SET_CODE', dest='set_id',
+                        help='The set to open booster packs from (default: the alphabetically first set code)')
+    parser.add_argument('--pools', metavar='N', type=int, default=1000,
+                        help='The number of sealed pools to simulate (default: %(default)s)')
+    parser.add_argument('--packs', metavar='N', type=int, default=6,
+                        help='The number of booster packs per pool (default: %(default)s)')
+    parser.add_argument('--iterations', metavar='N', type=int, default=2000,
+                        help='The deck search budget per pool (default: %(default)s)')
+    parser.add_argument('--workers', metavar='N', type=int,
+                        help='The number of processes (default: the number of CPUs)')
+    parser.add_argument('--seed', type=int,
+                        help='Seeds the simulation for reproducibility')
+    parser.add_argument('--no-evaluation-cache', dest='use_evaluation_cache', action='store_false',
+                        help='Evaluate every candidate deck of each search, even decks it has seen before')
+    parser.add_argument('--compact', action='store_true',
+                        help='Store the cards column by column, which takes less memory in every worker')
+    parser.add_argument('--output', '-o', metavar='REPORT_FILE', type=argparse.FileType('w'), default=sys.stdout,
+                        help='Where to write the JSON report (default: standard output)')
+    args = parser.parse_args()
+
+    set_infos = load_cards_csv(args.cards)
+    if args.compact:
+        set_infos = compact_set_infos(set_infos)
+    set_infos.update({
+        None: basic_land_info,
+    })
+    set_id = args.set_id or min(set_id for set_id in set_infos.keys() if set_id is not None)
+
+    statistics = SimulationStatistics()
+    for outcome in simulate_sealed(set_infos, set_id, pools=args.pools, packs=args.packs,
+                                   iterations=args.iterations, workers=args.workers, seed=args.seed,
+                                   use_evaluation_cache=args.use_evaluation_cache):
+        statistics.add(outcome)
+        if statistics.pool_count % 100 == 0:
+            print(f'{statistics.pool_count}/{args.pools} pools', file=sys.stderr)
+
+    with args.output as report_file:
+        json.dump(statistics.report(set_infos), report_file, indent=2)
+        report_file.write('\n')
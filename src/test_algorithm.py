@@ -13,7 +13,6 @@ To run tests without ``pytest``, run::
 
 """
 
-import csv
 import logging
 from collections import defaultdict
 from typing import *
@@ -37,7 +36,9 @@ else:
 
 from yaml import safe_load
 
-from algorithm import Deck, CardId, Rarity, generate_booster_pack, summarize_deck, evaluate_deck, parse_cards_csv, basic_land_info
+from algorithm import Deck, CardId, Rarity, generate_booster_pack, summarize_deck, evaluate_deck, basic_land_info, \
+    compute_card_contribution
+from card_cache import load_cards_csv
 
 
 # Describe test case schema
@@ -58,11 +59,8 @@ class TestFileSchema(NamedTuple):
 
 
 def load_card_csv():
-    # Load in CSV
-    with open('RNA.csv') as cards_csv:
-        cards_csv: Iterator[List[str]] = csv.reader(cards_csv)
-        _ = next(cards_csv)  # Skip header row
-        set_infos = parse_cards_csv(cards_csv)
+    # Load in CSV (through its compiled cache)
+    set_infos = load_cards_csv('RNA.csv')
 
     set_infos.update({
         None: basic_land_info,
@@ -100,6 +98,27 @@ def test_evaluate_deck():
         print()
 
 
+def test_card_contributions():
+    set_infos = load_card_csv()
+    for set_info in set_infos.values():
+        assert set_info.contributions.keys() == set_info.cards.keys()
+
+    # A card (with a Plains, so that there is a land to summarize) summarizes to its contribution
+    for card_number, contribution in set_infos['RNA'].contributions.items():
+        deck_summary = summarize_deck({('RNA', card_number): 1, (None, 1): 1}, set_infos)
+        assert deck_summary.color_identity == {mana_color for mana_color, _ in contribution.mana_symbol_counts}
+        assert deck_summary.dud_count == contribution.is_dud
+
+    # Invalid cards are rejected when loaded
+    card_number, card = next(iter(set_infos['RNA'].cards.items()))
+    try:
+        compute_card_contribution(card_number, card._replace(converted_mana_cost=-1), {})
+    except ValueError:
+        pass
+    else:
+        assert False, 'Expected a ValueError'
+
+
 # noinspection PyArgumentList
 def load_test_cases() -> Iterator[Deck]:
     # Read in test cases
@@ -122,3 +141,4 @@ if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG)
 
     test_evaluate_deck()
+    test_card_contributions()
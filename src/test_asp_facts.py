@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import io
+
+from asp_facts import format_term, generate_facts, write_facts
+from test_algorithm import load_card_csv
+
+
+def test_asp_facts():
+    set_infos = load_card_csv()
+
+    # Both players share the Plains and card 1
+    decks = [
+        ('us', {('RNA', 1): 2, ('RNA', 2): 1, (None, 1): 3}),
+        ('them', {('RNA', 1): 1, (None, 1): 2, ('RNA', 3): 0}),
+    ]
+    facts = list(generate_facts(set_infos, decks))
+
+    assert facts[0] == '#program base.'
+    assert len(facts) == len(set(facts))
+    assert sum(fact.startswith('card((') for fact in facts) == 3
+    assert sum(fact.startswith('set(') for fact in facts) == 2
+    assert 'set("RNA").' in facts and 'set(basic).' in facts
+    assert 'card((basic,1),basic,black).' in facts
+    assert 'land((basic,1),white).' in facts
+    assert 'starting_deck(us,("RNA",1),2).' in facts
+    assert 'starting_deck(them,(basic,1),2).' in facts
+    assert not any('("RNA",3)' in fact for fact in facts)
+    assert facts[-3:] == ['turn(1,us).', 'turn_order(us,them).', 'turn_order(them,us).']
+    assert ['turn(1,us).'] == [fact for fact in generate_facts(set_infos, decks[:1]) if fact.startswith('turn')]
+
+    # Every card of the catalog, each described once
+    out_file = io.StringIO()
+    write_facts(out_file, generate_facts(set_infos, decks, catalog=['RNA']), chunk_size=16)
+    catalog_facts = out_file.getvalue().splitlines()
+    assert catalog_facts[:len(facts)] == facts
+    assert sum(fact.startswith('card(("RNA",') for fact in catalog_facts) == len(set_infos['RNA'].cards)
+
+    assert format_term('us') == 'us'
+    assert format_term('Player "1"') == '"Player \\"1\\""'
+    assert format_term(3) == '3'
+
+    try:
+        import clingo
+    except ImportError:
+        return
+
+    # The facts are valid clingo
+    control = clingo.Control()
+    control.add('base', [], out_file.getvalue())
+    control.ground([('base', [])])
+    cards = [atom for atom in control.symbolic_atoms.by_signature('card', 3)]
+    assert len(cards) == len(set_infos['RNA'].cards) + 1
+
+
+if __name__ == '__main__':
+    test_asp_facts()
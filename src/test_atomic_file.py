@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+from atomic_file import atomic_write
+
+
+def test_atomic_write():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'file.txt'
+
+        # New files get the usual permissions, not the owner-only permissions of temporary files
+        umask = os.umask(0)
+        os.umask(umask)
+        with atomic_write(path) as out_file:
+            out_file.write('old')
+        assert path.read_text() == 'old'
+        assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~umask
+
+        # Replaced files keep their permissions
+        path.chmod(0o640)
+        with atomic_write(path, 'wb') as out_file:
+            out_file.write(b'new')
+        assert path.read_bytes() == b'new'
+        assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+        # Failed writes leave the file alone
+        try:
+            with atomic_write(path) as out_file:
+                out_file.write('partial')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        assert path.read_bytes() == b'new'
+        assert os.listdir(directory) == ['file.txt']
+
+
+if __name__ == '__main__':
+    test_atomic_write()
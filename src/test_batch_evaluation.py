@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import random
+from collections import defaultdict
+from typing import *
+
+from pytest import approx
+
+from algorithm import CardId, evaluate_deck, summarize_deck
+from batch_evaluation import compile_feature_matrix, deck_count_matrix, evaluate_decks
+from test_algorithm import load_card_csv, load_test_cases
+
+
+def generate_random_decks(set_infos, count: int, seed: int = 0) -> Iterator[DefaultDict[CardId, int]]:
+    rng = random.Random(seed)
+    card_ids = [(set_id, card_number)
+                for set_id, set_info in set_infos.items()
+                for card_number in set_info.cards.keys()]
+    for _ in range(count):
+        deck: DefaultDict[CardId, int] = defaultdict(int)
+        for card_id in rng.choices(card_ids, k=rng.randint(20, 60)):
+            deck[card_id] += 1
+        yield deck
+
+
+def test_evaluate_decks_matches_evaluate_deck():
+    set_infos = load_card_csv()
+    feature_matrix = compile_feature_matrix(set_infos)
+
+    decks = [deck for _, deck in load_test_cases()]
+    decks.extend(generate_random_decks(set_infos, count=200))
+
+    batch_evaluation = evaluate_decks(deck_count_matrix(decks, feature_matrix), feature_matrix)
+    for deck_index, deck in enumerate(decks):
+        expected = evaluate_deck(summarize_deck(deck, set_infos))
+        actual = tuple(penalty[deck_index] for penalty in batch_evaluation)
+        assert actual == approx(tuple(expected))
+
+
+if __name__ == '__main__':
+    test_evaluate_decks_matches_evaluate_deck()
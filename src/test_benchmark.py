@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+import random
+from collections import Counter
+from pathlib import Path
+
+from algorithm import parse_cards_csv
+from benchmark import read_csv_rows, synthesize_cards_csv
+
+
+def test_synthesize_cards_csv():
+    template_rows = read_csv_rows(Path('RNA.csv'))
+    rows = synthesize_cards_csv(template_rows, sets=3, cards_per_set=100, rng=random.Random(0))
+    assert len(rows) == 300
+
+    set_infos = parse_cards_csv(rows)
+    assert sorted(set_infos.keys()) == ['S000', 'S001', 'S002']
+    assert all(len(set_info.cards) == 100 for set_info in set_infos.values())
+
+    # Mostly commons, like real sets
+    rarities = Counter(card.rarity for set_info in set_infos.values() for card in set_info.cards.values())
+    assert rarities.most_common(1)[0][0].value == 'Common'
+
+
+if __name__ == '__main__':
+    test_synthesize_cards_csv()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+from collections import Counter
+
+import numpy as np
+
+from algorithm import Rarity
+from booster_packs import BoosterPackGenerator
+from test_algorithm import load_card_csv
+
+
+def test_booster_pack_generator():
+    set_infos = load_card_csv()
+    set_info = set_infos['RNA']
+    generator = BoosterPackGenerator(set_info, seed=0)
+
+    packs = generator.generate(5000)
+    assert packs.shape == (5000, 14)
+    for booster_pack in packs[:500]:
+        assert len(set(booster_pack[1:10])) == 9
+        card_rarities: Counter[Rarity] = Counter(set_info.cards[card_number].rarity for card_number in booster_pack)
+        assert 9 <= card_rarities[Rarity.COMMON] <= 10
+        assert 3 <= card_rarities[Rarity.UNCOMMON] <= 4
+        assert set_info.cards[booster_pack[13]].rarity in {Rarity.RARE, Rarity.MYTHIC_RARE}
+
+    # Rares are seven times as likely as mythic rares (per card)
+    rares = len(set_info.rarities[Rarity.RARE])
+    mythic_rares = len(set_info.rarities[Rarity.MYTHIC_RARE])
+    mythic_rate = np.isin(packs[:, 13], list(set_info.rarities[Rarity.MYTHIC_RARE])).mean()
+    assert abs(mythic_rate - mythic_rares / (7 * rares + mythic_rares)) < 0.02
+
+    # Reproducible, with independent streams
+    assert np.array_equal(BoosterPackGenerator(set_info, seed=0).generate(5000), packs)
+    first_stream, second_stream = BoosterPackGenerator(set_info, seed=0).spawn(2)
+    assert not np.array_equal(first_stream.generate(100), second_stream.generate(100))
+
+
+if __name__ == '__main__':
+    test_booster_pack_generator()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import shutil
+import tempfile
+from pathlib import Path
+
+from card_cache import default_cache_path, load_cards_csv
+
+
+def test_card_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = Path(directory, 'RNA.csv')
+        shutil.copyfile('RNA.csv', csv_path)
+        cache_path = default_cache_path(csv_path)
+
+        parsed = load_cards_csv(csv_path, use_cache=False)
+        assert not cache_path.exists()
+
+        assert load_cards_csv(csv_path) == parsed
+        assert cache_path.exists()
+        cache_modified = cache_path.stat().st_mtime_ns
+
+        # Loaded from the cache
+        assert load_cards_csv(csv_path) == parsed
+        assert cache_path.stat().st_mtime_ns == cache_modified
+
+        # Rebuilt once the CSV changes
+        with open(csv_path) as csv_file:
+            header, first_row, *_ = csv_file
+        with open(csv_path, 'w') as csv_file:
+            csv_file.write(header + first_row)
+        reloaded = load_cards_csv(csv_path)
+        assert set(reloaded['RNA'].cards.keys()) == {1}
+
+        # Corrupt caches are ignored
+        cache_path.write_bytes(b'garbage')
+        assert load_cards_csv(csv_path) == reloaded
+
+
+if __name__ == '__main__':
+    test_card_cache()
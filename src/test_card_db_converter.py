@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import io
+from decimal import Decimal
+from pathlib import Path
+
+from mtgsdk import Card
+from yaml import safe_dump, safe_load
+
+from algorithm import Archetype, Keyword, ManaColor
+from card_db_converter import convert_card_db, iter_card_db, load_ratings, unrated_rating
+from download_card_database import generate_card_entry
+
+
+def downloaded_card_db() -> str:
+    with open('test_download_card_database_responses.yml') as fixtures_file:
+        fixtures = safe_load(fixtures_file)
+
+    card_db = {set_code: {'Cards': {int(card['number']): generate_card_entry(Card(card))
+                                    for page in pages for card in page}}
+               for set_code, pages in fixtures.items()}
+    return safe_dump(card_db, indent=2, width=120)
+
+
+def test_iter_card_db():
+    card_db = downloaded_card_db()
+    entries = list(iter_card_db(io.StringIO(card_db)))
+    assert [(set_code, card_number) for set_code, card_number, _ in entries] == \
+        [(set_code, card_number) for set_code, set_entry in safe_load(card_db).items()
+         for card_number in set_entry['Cards'].keys()]
+    assert entries == [(set_code, card_number, entry) for set_code, set_entry in safe_load(card_db).items()
+                       for card_number, entry in set_entry['Cards'].items()]
+
+    assert list(iter_card_db(io.StringIO(''))) == []
+
+
+def test_convert_card_db():
+    ratings = load_ratings(Path('RNA.csv'))
+    set_infos = convert_card_db(io.StringIO(downloaded_card_db()), ratings)
+    assert set(set_infos.keys()) == {'RNA', 'GRN'}
+
+    rna = set_infos['RNA']
+    assert set(rna.cards.keys()) == {107, 128, 151, 249}
+    assert rna.card_types.lands[249, 0].possible_colors == {ManaColor.WHITE, ManaColor.BLUE}
+    assert rna.card_types.creatures[128, 0].power == 2
+    assert rna.card_types.creatures[128, 0].keywords == set()
+
+    # Ratings are joined in by set and card number
+    assert rna.cards[151].rating == ratings['RNA', 151].rating == Decimal(2)
+    assert rna.cards[151].archetypes == {Archetype.COUNTER}
+    assert rna.contributions[151].is_dud is False
+    assert set_infos['GRN'].cards[243].rating == unrated_rating
+
+    assert Keyword.FLYING in convert_card_db(io.StringIO(safe_dump({'RNA': {'Cards': {1: {
+        'Name': 'Test Angel', 'Rarity': 'Mythic Rare', 'CMC': 4, 'Mana cost': '{2}{W}{W}', 'Type': 'Creature',
+        'Creature power': 4, 'Creature toughness': 4, 'Keywords': ['Flying', 'First strike'],
+    }}}})), {})['RNA'].card_types.creatures[1, 0].keywords
+
+
+if __name__ == '__main__':
+    test_iter_card_db()
+    test_convert_card_db()
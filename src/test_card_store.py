@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import tempfile
+from pathlib import Path
+
+from yaml import safe_load
+
+from algorithm import CardType, ManaColor, Rarity
+from card_store import CardStore
+from test_algorithm import load_card_csv
+
+
+def test_card_store():
+    set_infos = load_card_csv()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store_path = Path(directory, 'cards.sqlite')
+        with CardStore(store_path) as store:
+            store.import_csv(Path('RNA.csv'))
+
+        # Loads the same structures as parse_cards_csv
+        with CardStore(store_path) as store:
+            assert store.set_codes() == ['RNA']
+            loaded = store.load_set_info('RNA')
+            assert loaded == set_infos['RNA']
+
+            # Upserting one set leaves the others alone
+            with open('test_download_card_database_responses.yml') as fixtures_file:
+                fixtures = safe_load(fixtures_file)
+            card_db = {set_code: {'Cards': {int(card['number']): {
+                'Name': card['name'],
+                'Rarity': card['rarity'],
+                'CMC': int(card['cmc']),
+                'Mana cost': card.get('manaCost'),
+                'Type': card['types'][0],
+                **({'Land colors': card['colorIdentity']} if card['types'][0] == 'Land' else {}),
+            } for page in pages for card in page}} for set_code, pages in fixtures.items() if set_code == 'GRN'}
+            store.import_card_db(card_db)
+            assert store.set_codes() == ['GRN', 'RNA']
+            assert store.load_set_info('RNA') == set_infos['RNA']
+
+            grn = store.load_set_info('GRN')
+            assert grn.cards[243].rarity == Rarity.COMMON
+            assert grn.cards[243].faces[0].type == CardType.LAND
+            assert grn.card_types.lands[243, 0].possible_colors == {ManaColor.RED, ManaColor.WHITE}
+
+
+if __name__ == '__main__':
+    test_card_store()
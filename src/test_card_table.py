@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+import pickle
+import random
+from collections import Counter
+
+from algorithm import evaluate_deck, generate_booster_pack, summarize_deck
+from card_table import CardTable, compact_set_infos
+from test_algorithm import load_card_csv, load_test_cases
+
+
+def test_card_table_matches_cards():
+    set_infos = load_card_csv()
+    compact_set_infos_ = compact_set_infos(set_infos)
+
+    for set_id, set_info in set_infos.items():
+        card_table = compact_set_infos_[set_id].cards
+        assert isinstance(card_table, CardTable)
+        assert sorted(card_table.keys()) == sorted(set_info.cards.keys())
+
+        for card_number, card in set_info.cards.items():
+            view = card_table[card_number]
+            assert tuple(view.faces) == tuple(card.faces)
+            assert view.to_card()._replace(faces=tuple(card.faces)) == card._replace(faces=tuple(card.faces))
+
+    # Survives pickling (e.g. into the card cache or worker processes)
+    unpickled = pickle.loads(pickle.dumps(compact_set_infos_))
+    assert unpickled['RNA'].cards[224].faces == compact_set_infos_['RNA'].cards[224].faces
+
+
+def test_compact_set_infos_evaluate_identically():
+    set_infos = load_card_csv()
+    compact_set_infos_ = compact_set_infos(set_infos)
+
+    for _, test_deck in load_test_cases():
+        assert evaluate_deck(summarize_deck(test_deck, compact_set_infos_)) == \
+            evaluate_deck(summarize_deck(test_deck, set_infos))
+
+    random.seed(0)
+    booster_pack = tuple(generate_booster_pack(compact_set_infos_['RNA']))
+    assert len(booster_pack) == 14
+    assert Counter(compact_set_infos_['RNA'].cards[card_number].rarity for card_number in booster_pack) == \
+        Counter(set_infos['RNA'].cards[card_number].rarity for card_number in booster_pack)
+
+
+if __name__ == '__main__':
+    test_card_table_matches_cards()
+    test_compact_set_infos_evaluate_identically()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import math
+
+from algorithm import ManaColor, evaluate_deck, summarize_deck
+from castability import CastabilityEvaluator, evaluate_deck_castability, hypergeometric_tail, probability_at_least
+from deck_search import basic_land_ids
+from incremental_evaluation import IncrementalDeckEvaluator
+from test_algorithm import load_card_csv
+
+
+def test_hypergeometric_tail():
+    for population, successes, draws in ((40, 17, 7), (40, 3, 10), (10, 10, 4), (40, 0, 8)):
+        tail = hypergeometric_tail(population, successes, draws)
+        assert tail[0] == 1
+        for needed in range(len(tail)):
+            expected = sum(math.comb(successes, k) * math.comb(population - successes, draws - k)
+                           for k in range(needed, min(successes, draws) + 1)) / math.comb(population, draws)
+            assert math.isclose(tail[needed], expected)
+        assert probability_at_least(population, successes, draws, len(tail)) == 0
+
+    assert math.isclose(probability_at_least(40, 17, 8, 1), 1 - math.comb(23, 8) / math.comb(40, 8))
+
+
+def test_castability():
+    set_infos = load_card_csv()
+    plains, island, _, mountain, _ = basic_land_ids
+
+    # A spell costing one white mana and some generic mana
+    spell_number, spell = next((card_number, card) for card_number, card in sorted(set_infos['RNA'].cards.items())
+                               if len(card.faces) == 1 and card.faces[0].mana_cost.get(frozenset({ManaColor.WHITE}))
+                               == 1 and len(card.faces[0].mana_cost) == 2)
+    mana_value = sum(spell.faces[0].mana_cost.values())
+    spell_id = ('RNA', spell_number)
+
+    evaluator = CastabilityEvaluator(set_infos)
+    deck = {spell_id: 23, plains: 9, mountain: 8}
+    probability = probability_at_least(40, 9, 7 + mana_value - 1, 1)
+    assert math.isclose(evaluator.probabilities(deck)[spell_id], probability)
+    assert math.isclose(evaluator.penalty(deck), 23 * (1 - probability))
+
+    # More white sources make the spell easier to cast
+    assert evaluator.penalty({spell_id: 23, plains: 17}) < evaluator.penalty(deck)
+    assert evaluator.penalty({spell_id: 23, island: 17}) == 23
+
+    # Optional: the other evaluations leave it at zero
+    assert evaluate_deck(summarize_deck(deck, set_infos)).castability_penalty == 0
+    evaluation = evaluate_deck_castability(deck, set_infos)
+    assert evaluation._replace(castability_penalty=0) == evaluate_deck(summarize_deck(deck, set_infos))
+    assert IncrementalDeckEvaluator(set_infos, deck, castability=True).evaluation() == evaluation
+
+
+if __name__ == '__main__':
+    test_hypergeometric_tail()
+    test_castability()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import random
+
+import deck_search
+from algorithm import evaluate_deck, summarize_deck
+from deck_search import anneal_deck, basic_land_ids, deck_key, generate_sealed_pool, initial_deck, parallel_search
+from pareto import DeckFront
+from test_algorithm import load_card_csv
+
+
+def test_anneal_deck():
+    set_infos = load_card_csv()
+    random.seed(0)
+    pool = generate_sealed_pool('RNA', set_infos['RNA'])
+
+    starting_deck = initial_deck(pool, set_infos)
+    starting_penalty = sum(evaluate_deck(summarize_deck(starting_deck, set_infos)))
+
+    result = anneal_deck(pool, set_infos, iterations=5000, seed=0)
+    assert sum(result.deck.values()) == 40
+    for card_id, card_quantity in result.deck.items():
+        assert card_id in basic_land_ids or card_quantity <= pool[card_id]
+
+    assert result.evaluation == evaluate_deck(summarize_deck(result.deck, set_infos))
+    assert sum(result.evaluation) <= starting_penalty
+
+    # Reproducible, and unchanged by the evaluation cache
+    assert anneal_deck(pool, set_infos, iterations=5000, seed=0).deck == result.deck
+    assert anneal_deck(pool, set_infos, iterations=5000, seed=0, use_evaluation_cache=False).deck == result.deck
+
+    # Every iteration evaluates a candidate deck (the front also receives the starting deck)
+    class CountingFront(DeckFront):
+        evaluated = 0
+
+        def add_deck(self, evaluation, deck):
+            self.evaluated += 1
+            return super().add_deck(evaluation, deck)
+
+    front = CountingFront()
+    assert anneal_deck(pool, set_infos, iterations=5000, seed=0, pareto_front=front).iterations == 5000
+    assert front.evaluated == 5001
+
+
+def test_parallel_search():
+    set_infos = load_card_csv()
+    random.seed(0)
+    pool = generate_sealed_pool('RNA', set_infos['RNA'])
+
+    results = parallel_search(pool, set_infos, restarts=4, workers=2, top_k=3, seed=0, iterations=1000)
+    assert len(results) == 3
+    assert len({deck_key(result.deck) for result in results}) == 3
+    penalties = [sum(result.evaluation) for result in results]
+    assert penalties == sorted(penalties)
+
+    # Independent of the number of workers
+    assert [result.deck for result in parallel_search(pool, set_infos, restarts=4, workers=1, top_k=3, seed=0,
+                                                      iterations=1000)] == [result.deck for result in results]
+
+    # Unseeded searches start from different random decks
+    unseeded_decks = [[deck_key(result.deck) for result in parallel_search(pool, set_infos, restarts=2, workers=1,
+                                                                           top_k=2, iterations=10)]
+                      for _ in range(2)]
+    assert unseeded_decks[0] != unseeded_decks[1]
+
+    # In-process searches keep no reference to the set infos
+    assert deck_search._worker_set_infos is None
+
+
+if __name__ == '__main__':
+    test_anneal_deck()
+    test_parallel_search()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import json
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from yaml import safe_load
+
+from download_card_database import ResponseCache, download_sets
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    Stands in for the MTG API, serving recorded pages with an ETag
+    """
+
+    def __init__(self, fixtures):
+        super().__init__(('127.0.0.1', 0), FixtureHandler)
+        self.fixtures = fixtures
+        self.responses = Counter()
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server_address
+        return f'http://{host}:{port}/v1'
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: value for key, (value, *_) in parse_qs(url.query).items()}
+        if url.path != '/v1/cards' or query.get('language') != 'English':
+            self.send_error(404)
+            return
+
+        pages = self.server.fixtures.get(query['set'], ())
+        page = int(query['page'])
+        body = json.dumps({'cards': pages[page - 1] if page <= len(pages) else []}).encode('utf-8')
+        etag = f'"{query["set"]}-{page}-{len(body)}"'
+
+        if self.headers.get('If-None-Match') == etag:
+            self.server.responses[304] += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.server.responses[200] += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_download_sets():
+    with open('test_download_card_database_responses.yml') as fixtures_file:
+        fixtures = safe_load(fixtures_file)
+
+    server = FixtureServer(fixtures)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(Path(directory))
+
+            downloaded = {set_code: cards
+                          for set_code, cards, error in download_sets(('RNA', 'GRN'), server.endpoint, cache,
+                                                                      connections=2)}
+            assert set(downloaded['RNA'].keys()) == {107, 128, 151, 249}
+            assert downloaded['RNA'][128]['Creature power'] == 2
+            assert downloaded['RNA'][249]['Land colors'] == ['W', 'U']
+            assert set(downloaded['GRN'].keys()) == {243}
+            # Two pages of RNA, one of GRN, plus an empty page ending each set
+            assert server.responses == {200: 5}
+
+            # Unchanged pages are revalidated rather than downloaded again
+            redownloaded = {set_code: cards for set_code, cards, _ in download_sets(('RNA', 'GRN'), server.endpoint,
+                                                                                    cache, connections=2)}
+            assert redownloaded == downloaded
+            assert server.responses == {200: 5, 304: 5}
+
+            # Failures are reported per set
+            server.fixtures = {}
+            (set_code, cards, error), = download_sets(('XYZ',), server.endpoint + '/missing')
+            assert set_code == 'XYZ' and cards is None and error is not None
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    test_download_sets()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import tempfile
+import threading
+from pathlib import Path
+
+from algorithm import evaluate_deck, summarize_deck
+from evaluation_cache import EvaluationCache, canonical_deck_key
+from test_algorithm import load_card_csv
+from test_batch_evaluation import generate_random_decks
+
+
+def test_canonical_deck_key():
+    deck = {('RNA', 1): 2, (None, 3): 17, ('RNA', 40): 1}
+    reordered = {('RNA', 40): 1, ('RNA', 1): 2, (None, 3): 17, ('RNA', 7): 0}
+    assert canonical_deck_key(deck) == canonical_deck_key(reordered)
+    assert canonical_deck_key(deck) != canonical_deck_key({**deck, ('RNA', 1): 3})
+    assert canonical_deck_key({('RNA', 11): 1}) != canonical_deck_key({('RNA', 1): 11})
+
+
+def test_evaluation_cache():
+    set_infos = load_card_csv()
+    decks = list(generate_random_decks(set_infos, 20))
+    cache = EvaluationCache(set_infos, max_entries=10)
+
+    for deck in decks:
+        assert cache.evaluate(deck) == evaluate_deck(summarize_deck(deck, set_infos))
+    assert cache.statistics == (0, 20, 10, 10)
+
+    # The 10 most recent decks are cached
+    for deck in decks[10:]:
+        cache.evaluate(dict(reversed(tuple(deck.items()))))
+    assert cache.statistics.hits == 10
+    assert decks[0] not in cache
+
+    # Shared between threads
+    threads = [threading.Thread(target=lambda: [cache.evaluate(deck) for deck in decks]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    statistics = cache.statistics
+    assert statistics.hits + statistics.misses == 30 + 4 * len(decks)
+    assert statistics.entries == 10
+
+    # Persisted
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = Path(directory, 'evaluations.cache')
+        cache.save(cache_path, fingerprint=b'RNA')
+
+        reloaded = EvaluationCache(set_infos)
+        assert reloaded.load(cache_path, fingerprint=b'other') == 0
+        assert reloaded.load(cache_path, fingerprint=b'RNA') == 10
+        assert all(deck in reloaded for deck in decks if deck in cache)
+
+        cache_path.write_bytes(b'garbage')
+        assert EvaluationCache(set_infos).load(cache_path) == 0
+
+
+if __name__ == '__main__':
+    test_canonical_deck_key()
+    test_evaluation_cache()
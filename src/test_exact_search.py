@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+import itertools
+import math
+import random
+
+from algorithm import evaluate_deck, summarize_deck
+from deck_search import generate_sealed_pool
+from exact_search import basic_lands_by_color, exact_deck_search
+from test_algorithm import load_card_csv
+
+
+def brute_force_penalty(pool, set_infos, deck_size):
+    card_ids = sorted(pool.keys())
+    best_penalty = math.inf
+    for quantities in itertools.product(*(range(pool[card_id] + 1) for card_id in card_ids)):
+        basic_land_count = deck_size - sum(quantities)
+        if basic_land_count < 0:
+            continue
+        spells = {card_id: quantity for card_id, quantity in zip(card_ids, quantities) if quantity}
+        # Every split of the basic lands between the five colors
+        for dividers in itertools.combinations(range(basic_land_count + 4), 4):
+            split = [right - left - 1 for left, right in zip((-1, *dividers), (*dividers, basic_land_count + 4))]
+            deck = dict(spells)
+            for color_index, quantity in zip(sorted(basic_lands_by_color.keys()), split):
+                if quantity:
+                    deck[basic_lands_by_color[color_index]] = quantity
+            try:
+                penalty = sum(evaluate_deck(summarize_deck(deck, set_infos)))
+            except ZeroDivisionError:
+                continue
+            best_penalty = min(best_penalty, penalty)
+    return best_penalty
+
+
+def test_exact_deck_search():
+    set_infos = load_card_csv()
+    random.seed(0)
+    sealed_pool = generate_sealed_pool('RNA', set_infos['RNA'])
+
+    # A pool small enough to enumerate
+    pool = {card_id: min(card_quantity, 2) for card_id, card_quantity in sorted(sealed_pool.items())[10:16]}
+    result = exact_deck_search(pool, set_infos, deck_size=9, initial_iterations=0)
+    assert result.optimal
+    assert sum(result.deck.values()) == 9
+    assert result.evaluation == evaluate_deck(summarize_deck(result.deck, set_infos))
+    assert math.isclose(sum(result.evaluation), brute_force_penalty(pool, set_infos, 9))
+    assert result.gap == 0
+
+
+def test_exact_deck_search_limit():
+    set_infos = load_card_csv()
+    random.seed(0)
+    pool = generate_sealed_pool('RNA', set_infos['RNA'])
+
+    result = exact_deck_search(pool, set_infos, node_limit=2000, initial_iterations=1000)
+    assert not result.optimal
+    assert sum(result.deck.values()) == 40
+    assert 0 < result.lower_bound <= sum(result.evaluation)
+    assert result.gap >= 0
+
+
+if __name__ == '__main__':
+    test_exact_deck_search()
+    test_exact_deck_search_limit()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import math
+import random
+
+import numpy as np
+
+from algorithm import evaluate_deck, summarize_deck
+from deck_search import basic_land_ids, generate_sealed_pool
+from genetic_search import compile_pool, crossover, genetic_search, mutate
+from test_algorithm import load_card_csv
+
+
+def test_operators():
+    set_infos = load_card_csv()
+    random.seed(0)
+    pool = generate_sealed_pool('RNA', set_infos['RNA'])
+    _, limits = compile_pool(pool, set_infos)
+    rng = np.random.default_rng(0)
+
+    # Random decks within the pool
+    decks = np.array([rng.multivariate_hypergeometric(np.minimum(limits, 3), 40) for _ in range(50)])
+    children = crossover(decks[:25], decks[25:], rng)
+    assert np.all(children.sum(axis=1) == 40)
+    assert np.all(children <= np.maximum(decks[:25], decks[25:]))
+    assert np.all(children >= np.minimum(decks[:25], decks[25:]))
+
+    mutate(children, limits, 3., rng)
+    assert np.all(children.sum(axis=1) == 40)
+    assert np.all((0 <= children) & (children <= limits))
+
+    # Every swap changes the deck: with two cards, each one moves a copy to the other card
+    # (mutate draws the number of swaps of each deck first, so the same seed gives the same numbers)
+    swaps = np.random.default_rng(1).poisson(1., 1000)
+    mutated = mutate(np.ones((1000, 2), dtype=int), np.array([2, 2]), 1., np.random.default_rng(1))
+    assert np.all(mutated[:, 0] % 2 != swaps % 2)
+
+
+def test_genetic_search():
+    set_infos = load_card_csv()
+    random.seed(0)
+    pool = generate_sealed_pool('RNA', set_infos['RNA'])
+
+    result = genetic_search(pool, set_infos, population_size=50, generations=30, seed=0)
+    assert sum(result.deck.values()) == 40
+    assert all(card_quantity <= pool.get(card_id, 0) or card_id in basic_land_ids
+               for card_id, card_quantity in result.deck.items())
+    assert result.evaluation == evaluate_deck(summarize_deck(result.deck, set_infos))
+
+    # One entry per generation, the best deck never lost
+    assert [statistics.generation for statistics in result.generations] == list(range(31))
+    best_penalties = [statistics.best_penalty for statistics in result.generations]
+    assert all(later <= earlier for earlier, later in zip(best_penalties, best_penalties[1:]))
+    assert math.isclose(best_penalties[-1], sum(result.evaluation))
+
+    # Seeded searches are reproducible
+    assert genetic_search(pool, set_infos, population_size=50, generations=30, seed=0).deck == result.deck
+
+
+if __name__ == '__main__':
+    test_operators()
+    test_genetic_search()
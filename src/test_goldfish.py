@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+import math
+
+import numpy as np
+
+from algorithm import ManaColor
+from deck_search import basic_land_ids
+from goldfish import simulate_goldfish
+from test_algorithm import load_card_csv
+
+
+def test_simulate_goldfish():
+    set_infos = load_card_csv()
+    plains, island, _, _, _ = basic_land_ids
+
+    # Only lands: one land drop per turn, no mana spent
+    result = simulate_goldfish({plains: 40}, set_infos, turns=6, simulations=100, seed=0)
+    assert np.array_equal(result.mean_lands_in_play, np.arange(1, 7))
+    assert not result.mean_mana_spent.any()
+    assert result.first_spell_turns[-1] == 1 and not result.first_play_turns
+
+    # One-drops of one color
+    spell_number = next(card_number for card_number, card in sorted(set_infos['RNA'].cards.items())
+                        if len(card.faces) == 1 and card.converted_mana_cost == 1
+                        and card.faces[0].mana_cost == {frozenset({ManaColor.WHITE}): 1})
+    spell_id = ('RNA', spell_number)
+    deck = {spell_id: 23, plains: 17}
+    result = simulate_goldfish(deck, set_infos, turns=5, simulations=20000, seed=1)
+
+    # The first turn casts a one-drop exactly when the opening hand has a land and a spell
+    no_land = math.comb(23, 7) / math.comb(40, 7)
+    no_spell = math.comb(17, 7) / math.comb(40, 7)
+    assert math.isclose(result.mean_lands_in_play[0], 1 - no_land, abs_tol=.01)
+    assert math.isclose(result.first_spell_turns[0], 1 - no_land - no_spell, abs_tol=.01)
+    assert np.all(result.mean_mana_spent <= result.mean_lands_in_play)
+    assert math.isclose(result.first_play_turns[spell_id].sum(), 1)
+    assert np.array_equal(result.first_play_turns[spell_id], result.first_spell_turns)
+
+    # The wrong color casts nothing
+    result = simulate_goldfish({spell_id: 23, island: 17}, set_infos, turns=5, simulations=100, seed=1)
+    assert not result.mean_mana_spent.any()
+
+    # Seeded simulations are reproducible
+    first = simulate_goldfish(deck, set_infos, turns=5, simulations=500, seed=2)
+    second = simulate_goldfish(deck, set_infos, turns=5, simulations=500, seed=2)
+    assert np.array_equal(first.mean_mana_spent, second.mean_mana_spent)
+    assert np.array_equal(first.first_spell_turns, second.first_spell_turns)
+
+
+if __name__ == '__main__':
+    test_simulate_goldfish()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import random
+
+from algorithm import evaluate_deck, summarize_deck
+from castability import CastabilityEvaluator
+from evaluation_cache import canonical_deck_key
+from incremental_evaluation import IncrementalDeckEvaluator
+from test_algorithm import load_card_csv, load_test_cases
+
+
+def test_incremental_evaluator_matches_summarize_deck():
+    set_infos = load_card_csv()
+    card_ids = [(set_id, card_number)
+                for set_id, set_info in set_infos.items()
+                for card_number in set_info.cards.keys()]
+    castability = CastabilityEvaluator(set_infos)
+    rng = random.Random(0)
+
+    for _, test_deck in load_test_cases():
+        evaluator = IncrementalDeckEvaluator(set_infos, test_deck)
+        castability_evaluator = IncrementalDeckEvaluator(set_infos, test_deck, castability=True)
+        assert evaluator.summary() == summarize_deck(test_deck, set_infos)
+
+        for _ in range(300):
+            move = rng.randrange(3)
+            if move == 0 or len(evaluator.deck) < 2:
+                card_id = rng.choice(card_ids)
+                evaluator.add(card_id)
+                castability_evaluator.add(card_id)
+            elif move == 1:
+                card_id = rng.choice(tuple(evaluator.deck.keys()))
+                evaluator.remove(card_id)
+                castability_evaluator.remove(card_id)
+            else:
+                removed_card_id, added_card_id = rng.choice(tuple(evaluator.deck.keys())), rng.choice(card_ids)
+                evaluator.swap(removed_card_id, added_card_id)
+                castability_evaluator.swap(removed_card_id, added_card_id)
+
+            deck = dict(evaluator.deck)
+            assert evaluator.summary() == summarize_deck(deck, set_infos)
+            assert evaluator.evaluation() == evaluate_deck(summarize_deck(deck, set_infos))
+            assert evaluator.deck_key == canonical_deck_key(deck)
+            if rng.randrange(2):
+                # Probabilities are also kept across edits which are not evaluated
+                assert castability_evaluator.evaluation() == evaluator.evaluation()._replace(
+                    castability_penalty=castability.penalty(deck))
+
+        for _ in range(300):
+            evaluator.undo()
+            castability_evaluator.undo()
+        assert evaluator.deck == {card_id: quantity for card_id, quantity in test_deck.items() if quantity}
+        assert evaluator.evaluation() == evaluate_deck(summarize_deck(test_deck, set_infos))
+        assert castability_evaluator.evaluation().castability_penalty == castability.penalty(test_deck)
+
+
+if __name__ == '__main__':
+    test_incremental_evaluator_matches_summarize_deck()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+import io
+import json
+
+import algorithm
+import instrumentation
+import test_algorithm
+from test_algorithm import load_card_csv, load_test_cases
+
+
+def test_instrumentation():
+    set_infos = load_card_csv()
+    original_summarize_deck = algorithm.summarize_deck
+    instrumentation.reset()
+
+    with instrumentation.instrumented():
+        # References imported with "from algorithm import ..." are instrumented too
+        assert test_algorithm.summarize_deck is not original_summarize_deck
+
+        for _, test_deck in load_test_cases():
+            test_algorithm.evaluate_deck(test_algorithm.summarize_deck(test_deck, set_infos))
+        booster_pack = tuple(algorithm.generate_booster_pack(set_infos['RNA']))
+
+    # Restored everywhere
+    assert algorithm.summarize_deck is original_summarize_deck
+    assert test_algorithm.summarize_deck is original_summarize_deck
+    assert len(booster_pack) == 14
+
+    statistics_file = io.StringIO()
+    instrumentation.dump(statistics_file)
+    statistics = json.loads(statistics_file.getvalue())
+    assert statistics['summarize_deck']['calls'] == statistics['evaluate_deck']['calls'] == 4
+    assert statistics['generate_booster_pack']['calls'] == 1
+    assert 0 < statistics['summarize_deck']['p50_seconds'] <= statistics['summarize_deck']['p99_seconds']
+
+
+if __name__ == '__main__':
+    test_instrumentation()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import csv
+import random
+import tempfile
+from pathlib import Path
+
+from algorithm import basic_land_info, evaluate_deck, summarize_deck
+from benchmark import synthesize_cards_csv
+from card_table import CardTable
+from lazy_loading import LazySetInfos
+from test_algorithm import load_card_csv, load_test_cases
+
+
+def test_lazy_loading():
+    set_infos = load_card_csv()
+
+    with open('RNA.csv', newline='') as cards_file:
+        header, *rows = csv.reader(cards_file)
+    synthetic_rows = synthesize_cards_csv(rows, sets=2, cards_per_set=30, rng=random.Random(0))
+
+    with tempfile.TemporaryDirectory() as directory:
+        # RNA is split over two files, next to a file of two other sets in a subdirectory
+        files = {
+            Path(directory, 'RNA-1.csv'): rows[:len(rows) // 2],
+            Path(directory, 'RNA-2.csv'): rows[len(rows) // 2:],
+            Path(directory, 'synthetic', 'synthetic.csv'): synthetic_rows,
+        }
+        for csv_path, file_rows in files.items():
+            csv_path.parent.mkdir(exist_ok=True)
+            with open(csv_path, 'w', newline='') as cards_file:
+                csv.writer(cards_file).writerows([header, *file_rows])
+
+        lazy_set_infos = LazySetInfos([directory], use_cache=False)
+        assert set(lazy_set_infos) == {'RNA', 'S000', 'S001', None}
+        assert lazy_set_infos.loaded() == {None: basic_land_info}
+
+        # Only the files with cards of the set are parsed
+        assert lazy_set_infos['RNA'] == set_infos['RNA']
+        assert set(lazy_set_infos.loaded()) == {'RNA', None}
+        assert not lazy_set_infos.is_loaded('S000')
+
+        assert set(lazy_set_infos.subset({'RNA'})) == {'RNA', None}
+
+        lazy_set_infos.preload(workers=2)
+        assert all(map(lazy_set_infos.is_loaded, lazy_set_infos))
+        assert len(lazy_set_infos['S001'].cards) == 30
+
+        eager_set_infos = LazySetInfos([directory], use_cache=False)
+        eager_set_infos.preload(workers=1)
+        assert eager_set_infos.loaded() == lazy_set_infos.loaded()
+        # Parsed files are released once all their sets are materialized
+        assert not eager_set_infos._file_set_infos
+
+        # Compact sets hold the same cards in columnar tables
+        compact_set_infos = LazySetInfos([directory], use_cache=False, compact=True)
+        assert isinstance(compact_set_infos['RNA'].cards, CardTable)
+        for _, test_deck in load_test_cases():
+            assert evaluate_deck(summarize_deck(test_deck, compact_set_infos)) == \
+                evaluate_deck(summarize_deck(test_deck, set_infos))
+
+
+if __name__ == '__main__':
+    test_lazy_loading()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import itertools
+import random
+
+from algorithm import evaluate_deck, summarize_deck
+from deck_search import basic_land_ids, generate_sealed_pool, initial_deck
+from mana_base import basic_lands_by_color, solve_mana_base
+from test_algorithm import load_card_csv
+
+
+def test_solve_mana_base():
+    set_infos = load_card_csv()
+    random.seed(0)
+    pool = generate_sealed_pool('RNA', set_infos['RNA'])
+    spells = {card_id: card_quantity for card_id, card_quantity in initial_deck(pool, set_infos).items()
+              if card_id not in basic_land_ids}
+    basic_land_count = 40 - sum(spells.values())
+
+    result = solve_mana_base(spells, set_infos)
+    assert sum(result.deck.values()) == 40
+    assert sum(result.basic_lands.values()) == basic_land_count
+    assert result.evaluation == evaluate_deck(summarize_deck(result.deck, set_infos))
+
+    # No split of the basic lands between the five colors is better
+    colors = sorted(basic_lands_by_color.keys())
+    best_penalty = min(
+        sum(evaluate_deck(summarize_deck({**spells, **{basic_lands_by_color[color_index]: quantity
+                                                       for color_index, quantity in zip(colors, split)
+                                                       if quantity}}, set_infos)))
+        for split in ([right - left - 1 for left, right in zip((-1, *dividers), (*dividers, basic_land_count + 4))]
+                      for dividers in itertools.combinations(range(basic_land_count + 4), 4)))
+    assert abs(sum(result.evaluation) - best_penalty) < 1e-9
+
+    # Basic lands in the spell list are replaced
+    assert solve_mana_base({**spells, basic_land_ids[0]: 3}, set_infos) == result
+
+    # Choosing the land count as well is never worse
+    flexible = solve_mana_base(spells, set_infos, basic_land_counts=range(14, 21))
+    assert sum(flexible.evaluation) <= sum(result.evaluation)
+
+    # Spell lists which leave too few or too many lands, or do not fit in the deck, are rejected
+    spell_ids = sorted(card_id for card_id in pool if card_id not in spells)
+    for spell_list in ({**spells, **{card_id: 1 for card_id in spell_ids[:basic_land_count - 15]}},
+                       dict(list(spells.items())[:10]),
+                       {**spells, **{card_id: pool[card_id] for card_id in spell_ids}}):
+        try:
+            solve_mana_base(spell_list, set_infos)
+        except ValueError:
+            pass
+        else:
+            assert False, 'Expected a ValueError'
+
+
+if __name__ == '__main__':
+    test_solve_mana_base()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import math
+import random
+
+from algorithm import DeckEvaluation, evaluate_deck, summarize_deck
+from deck_search import anneal_deck, generate_sealed_pool
+from genetic_search import genetic_search
+from pareto import DeckFront, ParetoFront, weakly_dominates
+from test_algorithm import load_card_csv
+
+
+def brute_force_front(points):
+    return {point for point in points
+            if not any(other_point != point and weakly_dominates(other_point, point) for other_point in points)}
+
+
+def test_pareto_front():
+    rng = random.Random(0)
+    for objectives in (2, 3, 6):
+        # Few distinct values so that ties and duplicates occur
+        points = [tuple(rng.randrange(20) for _ in range(objectives)) for _ in range(2000)]
+        front = ParetoFront(max_leaf_size=4, branching=2)
+        for index, point in enumerate(points):
+            dominated = any(weakly_dominates(other_point, point) for other_point, _ in front)
+            assert front.is_dominated(point) == dominated
+            assert front.add(point, index) == (not dominated)
+            assert front.is_dominated(point)
+
+        front_points = [point for point, _ in front]
+        assert len(front_points) == len(front) == len(set(front_points))
+        assert set(front_points) == brute_force_front(set(points))
+        for point, index in front:
+            assert points[index] == point
+
+
+def test_deck_front():
+    set_infos = load_card_csv()
+    random.seed(0)
+    pool = generate_sealed_pool('RNA', set_infos['RNA'])
+
+    front = DeckFront()
+    result = anneal_deck(pool, set_infos, iterations=2000, seed=0, pareto_front=front)
+    assert len(front) > 0
+    for point, deck in front:
+        assert DeckEvaluation(*point) == evaluate_deck(summarize_deck(deck, set_infos))
+    # The deck with the lowest total penalty cannot be dominated
+    assert math.isclose(min(sum(point) for point, _ in front), sum(result.evaluation))
+
+    genetic_front = DeckFront()
+    genetic_result = genetic_search(pool, set_infos, population_size=50, generations=10, seed=0,
+                                    pareto_front=genetic_front)
+    assert math.isclose(min(sum(point) for point, _ in genetic_front), sum(genetic_result.evaluation))
+
+    # Dominated decks are never built
+    def unexpected_deck():
+        raise AssertionError('built a dominated deck')
+
+    worst = DeckEvaluation(*(max(values) + 1 for values in zip(*(point for point, _ in front))))
+    assert not front.add_deck(worst, deck_factory=unexpected_deck)
+
+    decks = front.to_json(set_infos)
+    assert len(decks) == len(front)
+    assert decks[0]['total_penalty'] == min(deck['total_penalty'] for deck in decks)
+    assert set(decks[0]['penalties']) == set(DeckEvaluation._fields)
+    assert sum(card['quantity'] for card in decks[0]['cards']) == 40
+
+
+if __name__ == '__main__':
+    test_pareto_front()
+    test_deck_front()
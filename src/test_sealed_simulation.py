@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import random
+
+from sealed_simulation import SimulationStatistics, simulate_sealed
+from test_algorithm import load_card_csv
+
+
+def test_simulate_sealed():
+    set_infos = load_card_csv()
+
+    outcomes = list(simulate_sealed(set_infos, 'RNA', pools=6, iterations=200, workers=2, seed=0))
+    assert len(outcomes) == 6
+    for outcome in outcomes:
+        assert sum(outcome.pool.values()) == 6 * 14
+        assert sum(outcome.deck.values()) == 40
+
+    # Reproducible regardless of the number of workers
+    assert [outcome.deck for outcome in simulate_sealed(set_infos, 'RNA', pools=6, iterations=200, workers=1,
+                                                        seed=0)] == [outcome.deck for outcome in outcomes]
+
+    # In-process simulations leave the caller's random state alone
+    random.seed(1)
+    expected = random.random()
+    random.seed(1)
+    unseeded_pools = [[outcome.pool for outcome in simulate_sealed(set_infos, 'RNA', pools=1, iterations=10, workers=1)]
+                      for _ in range(2)]
+    assert random.random() == expected
+    # Unseeded simulations open different pools
+    assert unseeded_pools[0] != unseeded_pools[1]
+
+    statistics = SimulationStatistics()
+    for outcome in outcomes:
+        statistics.add(outcome)
+    report = statistics.report(set_infos)
+    assert report['pools'] == 6
+    total_penalty = report['penalties']['total_penalty']
+    assert total_penalty['p5'] <= total_penalty['p50'] <= total_penalty['p95']
+    assert all(0 <= card['inclusion_rate'] <= 1 for card in report['cards'])
+
+
+if __name__ == '__main__':
+    test_simulate_sealed()